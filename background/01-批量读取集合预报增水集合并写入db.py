@@ -11,6 +11,7 @@ from commons.enums import TYGroupTypeEnum
 from db_factory import session_yield_scope
 from models import StationForecastRealdataModel
 from util.file_util import get_grouppath_type
+from util.model_output_parser import STATION_HOUR_COLUMN, StationSurgeMatrix, read_station_surge_dat
 
 
 class StationForecastDataProcessor:
@@ -141,44 +142,40 @@ class StationForecastDataProcessor:
     def _process_single_file_with_pandas(self, file_path, file_name, center_identifier):
         """
             直接使用pd.read_csv的方式读取站点增水文件
+            TODO:[-] 26-10-18 改为使用 read_station_surge_dat(C 引擎)读取为站点增水矩阵，不再使用 python 引擎
         """
         try:
             #
-            df = pd.read_csv(
-                file_path,
-                sep=r'\s+',  # 使用正则表达式匹配一个或多个空白字符
-                encoding='utf-8',
-                engine='python'  # 使用python引擎支持正则表达式
-            )
+            matrix: StationSurgeMatrix = read_station_surge_dat(file_path)
 
-            print(f"文件 {file_name} 读取成功，数据形状: {df.shape}")
-            print(f"列名: {list(df.columns)}")
+            print(f"文件 {file_name} 读取成功，数据形状: {matrix.surge.shape}")
+            print(f"列名: {matrix.station_codes}")
 
             grouppath_type: TYGroupTypeEnum = get_grouppath_type(center_identifier)
             """根据center_identifier-> 集合路径枚举 """
             # 检查数据是否为空
-            if df.empty:
+            if matrix.is_empty:
                 print(f"文件 {file_name} 为空，跳过处理")
                 return False
 
             # TODO:[-] 25-06-19 注意小时列title为 fhour
             # 获取fhour列（第一列）和站点列
-            fhour_column = df.columns[0]  # 第一列是fhour
-            station_columns = df.columns[1:]  # 其余列是站点代码
+            fhour_column = STATION_HOUR_COLUMN  # 第一列是fhour
+            station_columns = matrix.station_codes  # 其余列是站点代码
             # TODO:[*] 25-06-19 先测试使用前5个
             station_columns = station_columns[:5]
 
             print(f"预报时间列: {fhour_column}")
             print(f"站点数量: {len(station_columns)}")
-            print(f"数据行数: {len(df)}")
+            print(f"数据行数: {matrix.surge.shape[0]}")
 
             with session_yield_scope() as session:
                 # 遍历每个站点列
-                for station_code in station_columns:
+                for station_index, station_code in enumerate(station_columns):
                     # 批量插入数据
                     records_to_insert = []
                     # forecast_value = row[station_code]
-                    series_temp = df[station_code]
+                    series_temp = matrix.surge[:, station_index].tolist()
                     forecast_start_ts: int = self.forecast_start_ts
                     forecast_start_arrow: arrow.Arrow = arrow.get(forecast_start_ts)
                     issue_ts: int = self.issue_ts
@@ -10,14 +10,15 @@ from db_factory import session_yield_scope
 from models import Station, StationForecastRealdataModel
 from schemas import StationSurgeFileSchema
 from util.file_util import FileExplorer
+from util.model_output_parser import read_station_surge_dat
 
 READPATH: str = r'E:\01data\99test\flood'
 
 
 def read_dat_2_df(file: pathlib.Path) -> pd.DataFrame:
     try:
-        # 使用pandas直接读取，指定分隔符为空格
-        df = pd.read_csv((file), sep='\s+', header=0)
+        # TODO:[-] 26-10-18 使用 read_station_surge_dat(C 引擎)读取，fhour 作为索引而不再作为站点列
+        df = read_station_surge_dat(file).to_dataframe()
         return df
     except Exception as e:
         print(f"读取文件时出错: {e}")
@@ -1,24 +1,33 @@
-import geopandas as gpd
-from shapely.ops import unary_union
-
-
-def mask_polygon(forecast_file: str, mask_file: str):
-    # 读取 geo_a.json 和 pols.shp 文件
-    gdf_a = gpd.read_file(forecast_file)
-    gdf_mask = gpd.read_file(mask_file)
-
-    # 将掩码中的所有多边形合并为一个整体
-    mask_union = gdf_mask.geometry.unary_union
-
-    # 对 geo_a 中每个几何对象使用差集操作，剔除掉在掩码内部的部分
-    gdf_a['geometry'] = gdf_a['geometry'].apply(lambda geom: geom.difference(mask_union))
-
-    # 如果有空的几何（全被去除的情况），可以选择剔除
-    gdf_a = gdf_a[~gdf_a['geometry'].is_empty]
-
-    # 将结果保存为新的 GeoJSON 文件
-    gdf_a.to_file('geo_a_processed.json', driver='GeoJSON')
-    print("处理完成，结果保存为 geo_a_processed.json")
+from util.geojson_stream import GeoJSONFeatureWriter, iter_geodataframes
+from util.land_mask import TiledLandMask
+
+
+def mask_polygon(forecast_file: str, mask_file: str, out_put_file: str = 'geo_a_processed.json',
+                 grid_size: float = 0.05, cache_dir: str = None, batch_size: int = 10000):
+    """
+        剔除淹没范围中位于掩码内的部分
+        TODO:[-] 26-10-18 掩码合并结果缓存在磁盘并按网格分块建立 STRtree，每个多边形只与相交的掩码块求差集
+        TODO:[-] 26-10-18 按批次流式读取及写入，不再一次性 gpd.read_file
+    @param forecast_file: 淹没范围 geojson
+    @param mask_file: 掩码 shapefile
+    @param out_put_file: 输出 geojson
+    @param grid_size: 掩码分块大小(度)
+    @param cache_dir: 掩码缓存目录，为空时缓存在掩码文件所在目录
+    @param batch_size: 每批处理的 feature 数
+    @return:
+    """
+    land_mask: TiledLandMask = TiledLandMask.from_file(mask_file, grid_size, cache_dir)
+
+    with GeoJSONFeatureWriter(out_put_file) as writer:
+        for gdf_a in iter_geodataframes(forecast_file, batch_size):
+            # 对 geo_a 中每个几何对象使用差集操作，剔除掉在掩码内部的部分
+            gdf_a['geometry'] = land_mask.difference(gdf_a.geometry.values)
+
+            # 如果有空的几何（全被去除的情况），可以选择剔除
+            gdf_a = gdf_a[~gdf_a['geometry'].is_empty]
+            writer.write_geodataframe(gdf_a)
+
+    print(f"处理完成({writer.count})，结果保存为 {out_put_file}")
 
 
 def main():
@@ -1,51 +1,50 @@
+import argparse
+import json
 import pathlib
 
-from shapely.geometry import Polygon, mapping, shape
-import geojson
-
-READPATH: str = r'E:\01data\99test\flood_geo\ningbo_test_250611_masked_gt200.geojson'
+from util.smoothing import chaikin_ring, smooth_feature_collection
 
 
 def chaikin_smoothing(coords, refinements=3):
-    for _ in range(refinements):
-        new_coords = []
-        for i in range(len(coords) - 1):
-            p1 = coords[i]
-            p2 = coords[i + 1]
-            Q = (0.75 * p1[0] + 0.25 * p2[0], 0.75 * p1[1] + 0.25 * p2[1])
-            R = (0.25 * p1[0] + 0.75 * p2[0], 0.25 * p1[1] + 0.75 * p2[1])
-            new_coords.extend([Q, R])
-        # 闭合多边形
-        new_coords.append(new_coords[0])
-        coords = new_coords
-    return coords
-
-
-def smoothed_polygon(json_path: str, out_put_path: str):
+    """
+        TODO:[-] 26-10-18 改为 numpy 向量化实现(见 util/smoothing.py)
+    """
+    return [tuple(temp) for temp in chaikin_ring(coords, refinements).tolist()]
+
+
+def smoothed_polygon(json_path: str, out_put_path: str, refinements: int = 3, max_workers: int = 1) -> str:
+    """
+        平滑 geojson 中的多边形(含内环及 MultiPolygon)
+        TODO:[-] 26-10-18 提取淹没范围时可直接通过 FloodLevelExtractor(smooth_refinements=) 平滑，不再需要单独执行本脚本
+    @param json_path: 输入 geojson
+    @param out_put_path: 输出目录
+    @param refinements: 迭代次数
+    @param max_workers: 进程数
+    @return: 输出文件全路径
+    """
     # 加载 geojson 文件
     with open(json_path, "r") as f:
-        data = geojson.load(f)
+        data = json.load(f)
 
-    # 遍历每个多边形并平滑
-    for feature in data['features']:
-        geom = shape(feature['geometry'])
-        if geom.geom_type == 'Polygon':
-            outer_ring = list(geom.exterior.coords)
-            smoothed_ring = chaikin_smoothing(outer_ring, refinements=3)
-            smoothed_poly = Polygon(smoothed_ring)
-            feature['geometry'] = mapping(smoothed_poly)
+    data = smooth_feature_collection(data, refinements, max_workers)
 
     # 保存结果
-    file_name: str = f'smoothed_output.geojson'
+    file_name: str = f'{pathlib.Path(json_path).stem}_smoothed.geojson'
     out_put_full_path: str = str(pathlib.Path(out_put_path) / file_name)
     with open(out_put_full_path, "w") as f:
-        geojson.dump(data, f)
+        json.dump(data, f)
+    return out_put_full_path
 
 
 def main():
-    out_put_path: str = r'E:\01data\99test\flood_geo_smooted'
+    parser = argparse.ArgumentParser(description='对淹没范围 geojson 进行 Chaikin 平滑')
+    parser.add_argument('json_path', help='输入 geojson')
+    parser.add_argument('out_put_path', help='输出目录')
+    parser.add_argument('--refinements', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
     # 平滑多边形
-    smoothed_polygon(READPATH, out_put_path)
+    print(smoothed_polygon(args.json_path, args.out_put_path, args.refinements, args.workers))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+from typing import List
+
+from util.ddl_util import run_ddl
+
+INDEX_DDL: List[str] = [
+    # mysql 的空间索引要求 geom 为 NOT NULL 且列上指定 SRID(否则优化器不会使用该索引)
+    "ALTER TABLE geo_polygons MODIFY geom POLYGON NOT NULL SRID 4326",
+    "ALTER TABLE geo_polygons ADD SPATIAL INDEX idx_geo_polygons_geom (geom)",
+    "CREATE INDEX idx_geo_polygons_ty_issue ON geo_polygons (ty_code, issue_time)",
+    "ALTER TABLE geo_floodlevel_polygon MODIFY geom POLYGON NOT NULL SRID 4326",
+    "ALTER TABLE geo_floodlevel_polygon ADD SPATIAL INDEX idx_geo_floodlevel_polygon_geom (geom)",
+    "CREATE INDEX idx_floodlevel_ty_issue_level ON geo_floodlevel_polygon (ty_code, issue_time, flood_level)",
+]
+"""+ 26-10-18 多边形表的空间索引及联合索引(models 中 spatial_index=True 及 __table_args__)"""
+
+
+def main():
+    run_ddl(INDEX_DDL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from util.flood_dissolve import DEPTH_CLASS_BREAKS
+from util.flood_level_extractor import FLOOD_LEVEL_THRESHOLDS
+from util.polygon_loader import load_flood_raster
+
+
+def load_flood_raster_to_mysql(read_path: str, ty_code: str, issue_ts: int, mask_file: str = None,
+                               out_dir: str = None):
+    """
+        + 26-10-18 由淹没深度 geotiff 一次完成 分级 -> 矢量化 -> 入库
+        替代 04 -> 05 -> 06 -> 07 的文件往返，同时写入:
+        - geo_polygons: 按淹没深度分级(DEPTH_CLASS_BREAKS)合并的区域
+        - geo_floodlevel_polygon: 各淹没等级(FLOOD_LEVEL_THRESHOLDS: 100|150|200cm)的范围
+        掩码按像元中心点剔除(05 为按多边形求差集)
+    @param read_path: 淹没深度 geotiff(cm)
+    @param ty_code: 台风编号
+    @param issue_ts: 发布时间
+    @param mask_file: 掩码 shapefile，为空时不剔除
+    @param out_dir: 不为空时同时输出 geojson
+    @return:
+    """
+    return load_flood_raster(read_path, ty_code, issue_ts, DEPTH_CLASS_BREAKS, FLOOD_LEVEL_THRESHOLDS,
+                             mask_file=mask_file, out_dir=out_dir)
+
+
+def main():
+    ty_code = "2106"  # 台风编号
+    issue_ts: int = 1747125125
+    read_path: str = r'E:\01data\99test\flood_geo\output_processed.tif'
+    mask_file: str = r'E:\02data\02-qigs_data\01-ningbo\宁波_陆地及海洋外边界_不含岛屿_面.shp'
+    load_flood_raster_to_mysql(read_path, ty_code, issue_ts, mask_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+from typing import List
+
+from util.ddl_util import run_ddl
+
+INDEX_DDL: List[str] = [
+    # 覆盖 (ty_code, issue_time[, station_code]) 的过滤及 (station_code, grouppath_type, forecast_ts) 的排序
+    "CREATE INDEX idx_station_forecast_ty_issue_station ON station_forecast_realdata_user1 "
+    "(ty_code, issue_time, station_code, grouppath_type, forecast_ts)",
+]
+"""+ 26-10-18 站点预报增水表的联合索引(models 中 __table_args__)"""
+
+
+def main():
+    run_ddl(INDEX_DDL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from typing import List
+
+from util.ddl_util import run_ddl
+
+INDEX_DDL: List[str] = [
+    # 按 (台风, 发布时间) 查询集合路径
+    "CREATE INDEX idx_typhoon_grouppath_ty_ts ON typhoon_forecast_grouppath (ty_code, timestamp)",
+    # join 路径点并按 forecast_index 有序读取
+    "CREATE INDEX idx_typhoon_realdata_gp_index ON typhoon_forecast_realdata (gp_id, forecast_index)",
+]
+"""+ 26-10-18 台风集合路径及路径点表的联合索引(models 中 __table_args__)"""
+
+
+def main():
+    run_ddl(INDEX_DDL)
+
+
+if __name__ == "__main__":
+    main()
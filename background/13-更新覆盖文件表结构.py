@@ -0,0 +1,19 @@
+from typing import List
+
+from util.ddl_util import run_ddl
+
+COLUMN_DDL: List[str] = [
+    # 淹没产品目录为 surgeflood_wkdir/user_out/{user_name}/flood_{issue_ts}，超过原先的 50 个字符
+    "ALTER TABLE geo_coverage_files MODIFY relative_path VARCHAR(200) NOT NULL",
+    # geotiff 内部布局(RasterLayoutEnum)，已登记的文件为 DEFAULT_ENUM(-1)
+    "ALTER TABLE geo_coverage_files ADD COLUMN raster_layout INT NOT NULL DEFAULT -1",
+]
+"""+ 26-10-18 geo_coverage_files 的列定义(models 中的 ICoverageFileModel | GeoCoverageFiles)"""
+
+
+def main():
+    run_ddl(COLUMN_DDL)
+
+
+if __name__ == "__main__":
+    main()
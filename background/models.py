@@ -41,7 +41,12 @@ class StationForecastRealdataModel(Base):
         站点预报增水——需要加入用户名——按用户名分表存储
     """
     __tablename__ = "station_forecast_realdata_user1"
-    __table_args__ = {"schema": "sys_flood_nationaldebt"}
+    # + 26-10-18 按批次查询站点集合增水(有序读取，不需要再排序)的联合索引
+    __table_args__ = (
+        Index("idx_station_forecast_ty_issue_station", "ty_code", "issue_time", "station_code", "grouppath_type",
+              "forecast_ts"),
+        {"schema": "sys_flood_nationaldebt"}
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     is_del: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
@@ -129,7 +134,8 @@ class GeoFloodLevelPolygon(Base):
     name: Mapped[Optional[str]] = mapped_column(String(100), comment="多边形名称")
     description: Mapped[Optional[str]] = mapped_column(Text, comment="描述信息")
     properties: Mapped[Optional[str]] = mapped_column(Text, comment="GeoJSON properties 的 JSON 字符串")
-    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, comment="多边形几何数据")
+    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True), nullable=False,
+                                      comment="多边形几何数据")
     flood_level: Mapped[int] = mapped_column(Integer, comment="淹没等级——枚举", default=FloodLevelEnum.GTE100.value)
     gmt_create_time: Mapped[datetime] = mapped_column(
         default=datetime.utcnow(),
@@ -144,6 +150,11 @@ class GeoFloodLevelPolygon(Base):
     issue_time: Mapped[int] = mapped_column(default=Arrow.utcnow().int_timestamp,
                                             comment="发布时间")
 
+    # + 26-10-18 按批次及淹没等级查询的联合索引
+    __table_args__ = (
+        Index("idx_floodlevel_ty_issue_level", "ty_code", "issue_time", "flood_level"),
+    )
+
     def __repr__(self) -> str:
         return f"<GeoFloodLevelPolygon(id={self.id}, ty_code='{self.ty_code}', gp_id='{self.gp_id}')>"
 
@@ -152,7 +163,10 @@ class GeoPolygon(Base):
     """存储 GeoJSON 多边形数据的模型"""
 
     __tablename__ = "geo_polygons"
-    __table_args__ = {"extend_existing": True}  # 允许扩展已定义的表
+    __table_args__ = (
+        Index("idx_geo_polygons_ty_issue", "ty_code", "issue_time"),
+        {"extend_existing": True}  # 允许扩展已定义的表
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     value: Mapped[float] = mapped_column(Float, comment="增水值")
@@ -161,7 +175,8 @@ class GeoPolygon(Base):
     name: Mapped[Optional[str]] = mapped_column(String(100), comment="多边形名称")
     description: Mapped[Optional[str]] = mapped_column(Text, comment="描述信息")
     properties: Mapped[Optional[str]] = mapped_column(Text, comment="GeoJSON properties 的 JSON 字符串")
-    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, comment="多边形几何数据")
+    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True), nullable=False,
+                                      comment="多边形几何数据")
     gmt_create_time: Mapped[datetime] = mapped_column(
         default=datetime.utcnow(),
         comment="创建时间"
@@ -0,0 +1,26 @@
+from typing import List
+
+from sqlalchemy.sql import text
+
+from db_factory import session_yield_scope
+
+
+def run_ddl(statements: List[str]) -> int:
+    """
+        + 26-10-18 依次执行 DDL(每条单独执行)，失败时打印后继续执行下一条
+        用于为已存在的表补充 models 中定义的索引 | 列，新建的表不需要执行
+        重复执行时已存在的索引 | 列会报错(Duplicate key name | Duplicate column name)并被跳过
+        表名不加库名前缀(连接的库见 DATABASES 中的 NAME)
+    @param statements:
+    @return: 执行成功的条数
+    """
+    count: int = 0
+    for ddl in statements:
+        try:
+            with session_yield_scope() as session:
+                session.execute(text(ddl))
+            count += 1
+            print(f'[-] 执行成功: {ddl}')
+        except Exception as e:
+            print(f'[!] 执行失败: {ddl} ERROR:{e}')
+    return count
@@ -0,0 +1,163 @@
+"""
+    + 26-10-18 将逐网格的淹没多边形按淹没深度分级后合并为区域
+    淹没模式按网格逐个输出正方形多边形，直接入库时每个网格为一行；此处:
+    - 由网格中心点得到 (行, 列)，按深度分级(或按淹没等级阈值)写入 uint8 分级数组
+    - rasterio.features.shapes(connectivity=4) 将相邻且同级的网格矢量化为一个区域(保留内环)
+    - 区域再 rasterize 为标签数组，按标签统计每个区域的网格数、面积及最小/最大/平均淹没深度
+    分级数组及标签数组的大小为所有网格的外包矩形
+"""
+from typing import Dict, List, Optional
+
+import geopandas as gpd
+import numpy as np
+from rasterio.features import rasterize, shapes
+from shapely.geometry import shape
+
+from commons.enums import FloodLevelEnum
+from util.flood_grid import FLOOD_DEPTH_FIELD, FLOOD_GRID_UNIT, cells_to_grid, read_cells, read_raster_cells
+from util.flood_level_extractor import FLOOD_LEVEL_THRESHOLDS, classify_depth
+from util.land_mask import TiledLandMask
+
+DEPTH_CLASS_BREAKS: List[float] = [0, 50, 100, 150, 200]
+"""淹没深度分级(cm)，第 k 级为 (breaks[k-1], breaks[k]]，最后一级为 > breaks[-1]"""
+
+EARTH_RADIUS: float = 6371008.8
+"""地球平均半径(m)"""
+
+
+class FloodCellGrid:
+    """
+        逐网格淹没数据(去重后的网格及其所在 (行, 列))
+    """
+
+    def __init__(self, xs: np.ndarray, ys: np.ndarray, values: np.ndarray, resolution: float = FLOOD_GRID_UNIT):
+        """
+        @param xs: 网格中心经度
+        @param ys: 网格中心纬度
+        @param values: 淹没深度(cm)
+        @param resolution: 网格大小(度)
+        """
+        rows, cols, self.height, self.width, self.transform = cells_to_grid(xs, ys, resolution)
+        # 同一位置有多个网格时以最后一个为准(与 cells_to_geotiff 一致)
+        keys: np.ndarray = rows * self.width + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep: np.ndarray = np.sort(len(keys) - 1 - last)
+        self.rows: np.ndarray = rows[keep]
+        self.cols: np.ndarray = cols[keep]
+        self.values: np.ndarray = np.asarray(values, dtype=np.float32)[keep]
+        # 每个网格的面积(km²)，随纬度变化
+        cell_side: float = np.deg2rad(resolution) * EARTH_RADIUS / 1000
+        self.areas: np.ndarray = cell_side * cell_side * np.cos(np.deg2rad(np.asarray(ys, dtype=np.float64)[keep]))
+
+    @classmethod
+    def from_file(cls, read_path: str, value_name: str = FLOOD_DEPTH_FIELD,
+                  resolution: float = FLOOD_GRID_UNIT) -> 'FloodCellGrid':
+        """
+            读取逐网格 geojson
+        """
+        xs, ys, values = read_cells(read_path, value_name)
+        return cls(xs, ys, values, resolution)
+
+    @classmethod
+    def from_geotiff(cls, read_path: str, land_mask: Optional[TiledLandMask] = None,
+                     block_rows: int = 1024) -> 'FloodCellGrid':
+        """
+            + 26-10-18 读取淹没深度 geotiff(只保留有效像元)
+        @param read_path: 淹没深度 geotiff(cm)
+        @param land_mask: 不为空时剔除中心点位于掩码内的像元
+        @param block_rows: 每个窗口的行数
+        @return:
+        """
+        xs, ys, values, resolution = read_raster_cells(read_path, block_rows)
+        if land_mask is not None:
+            keep: np.ndarray = ~land_mask.covers_points(xs, ys)
+            xs, ys, values = xs[keep], ys[keep], values[keep]
+        return cls(xs, ys, values, resolution)
+
+    def dissolve(self, cell_classes: np.ndarray) -> gpd.GeoDataFrame:
+        """
+            将相邻且同级的网格合并为区域
+        @param cell_classes: 每个网格的分级(uint8)，0 为不输出
+        @return: 每个区域一行，列: depth_class | cell_count | area_km2 | min_depth | max_depth | mean_depth | geometry
+        """
+        classes: np.ndarray = np.zeros((self.height, self.width), dtype=np.uint8)
+        classes[self.rows, self.cols] = cell_classes
+        geoms: List[dict] = []
+        region_classes: List[int] = []
+        for geom, val in shapes(classes, mask=classes > 0, connectivity=4, transform=self.transform):
+            geoms.append(geom)
+            region_classes.append(int(val))
+        columns = ['depth_class', 'cell_count', 'area_km2', 'min_depth', 'max_depth', 'mean_depth']
+        if len(geoms) == 0:
+            return gpd.GeoDataFrame(columns=columns, geometry=[], crs='EPSG:4326')
+        # 区域边界均在网格边上，rasterize(按网格中心点)得到的标签与矢量化的区域一一对应
+        labels: np.ndarray = rasterize(((geom, index + 1) for index, geom in enumerate(geoms)),
+                                       out_shape=classes.shape, transform=self.transform, fill=0, dtype='int32')
+        cell_labels: np.ndarray = labels[self.rows, self.cols]
+        valid: np.ndarray = cell_labels > 0
+        stats: Dict[str, np.ndarray] = region_statistics(cell_labels[valid] - 1, self.values[valid],
+                                                         self.areas[valid], len(geoms))
+        # 淹没深度为 float32，保留两位小数
+        for key in ('min_depth', 'max_depth', 'mean_depth'):
+            stats[key] = np.round(stats[key], 2)
+        gdf = gpd.GeoDataFrame({'depth_class': np.asarray(region_classes, dtype=np.int64), **stats},
+                               geometry=[shape(geom) for geom in geoms], crs='EPSG:4326')
+        return gdf[columns + ['geometry']]
+
+
+def region_statistics(labels: np.ndarray, values: np.ndarray, areas: np.ndarray, count: int) -> Dict[
+    str, np.ndarray]:
+    """
+        按区域统计
+    @param labels: 每个网格所属的区域(0 ~ count-1)
+    @param values: 淹没深度
+    @param areas: 网格面积
+    @param count: 区域数
+    @return: cell_count | area_km2 | min_depth | max_depth | mean_depth
+    """
+    cell_count: np.ndarray = np.bincount(labels, minlength=count)
+    order: np.ndarray = np.argsort(labels, kind='stable')
+    sorted_values: np.ndarray = values[order].astype(np.float64)
+    starts: np.ndarray = np.concatenate([[0], np.cumsum(cell_count)[:-1]])
+    # 每个区域至少包含一个网格
+    return {
+        'cell_count': cell_count,
+        'area_km2': np.bincount(labels, weights=areas, minlength=count),
+        'min_depth': np.minimum.reduceat(sorted_values, starts),
+        'max_depth': np.maximum.reduceat(sorted_values, starts),
+        'mean_depth': np.bincount(labels, weights=values.astype(np.float64), minlength=count) / cell_count,
+    }
+
+
+def dissolve_by_depth_class(grid: FloodCellGrid, breaks: Optional[List[float]] = None) -> gpd.GeoDataFrame:
+    """
+        按淹没深度分级合并(各级互不重叠)
+    @param grid:
+    @param breaks: 升序的分级，默认 DEPTH_CLASS_BREAKS，不超过 breaks[0] 的网格不输出
+    @return: 在 dissolve 的基础上增加 depth_lower | depth_upper(最后一级为空)
+    """
+    breaks = sorted(breaks or DEPTH_CLASS_BREAKS)
+    gdf: gpd.GeoDataFrame = grid.dissolve(classify_depth(grid.values, breaks))
+    bounds: List[Optional[float]] = list(breaks) + [None]
+    gdf.insert(1, 'depth_lower', [bounds[index - 1] for index in gdf['depth_class']])
+    gdf.insert(2, 'depth_upper', [bounds[index] for index in gdf['depth_class']])
+    return gdf
+
+
+def dissolve_by_flood_level(grid: FloodCellGrid, thresholds: Optional[Dict[FloodLevelEnum, float]] = None) -> Dict[
+    FloodLevelEnum, gpd.GeoDataFrame]:
+    """
+        按淹没等级阈值合并(与 FloodLevelExtractor 一致，高等级的范围包含在低等级中)
+    @param grid:
+    @param thresholds: 淹没等级 -> 阈值(cm)，默认 FLOOD_LEVEL_THRESHOLDS
+    @return: 淹没等级 -> 在 dissolve 的基础上增加 threshold | flood_level
+    """
+    thresholds = thresholds or FLOOD_LEVEL_THRESHOLDS
+    results: Dict[FloodLevelEnum, gpd.GeoDataFrame] = {}
+    for level, threshold in sorted(thresholds.items(), key=lambda temp: temp[1]):
+        gdf: gpd.GeoDataFrame = grid.dissolve(classify_depth(grid.values, [threshold]))
+        gdf = gdf.drop(columns='depth_class')
+        gdf.insert(0, 'threshold', threshold)
+        gdf.insert(1, 'flood_level', level.value)
+        results[level] = gdf
+    return results
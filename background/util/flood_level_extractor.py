@@ -0,0 +1,187 @@
+"""
+    + 26-10-18 按淹没深度一次性提取各淹没等级的范围
+    - 按行分块(窗口)读取淹没深度 geotiff，每个窗口只分级一次(np.digitize)，各等级均由同一个 uint8 分级数组得到掩码
+    - 各窗口并行矢量化(rasterio.features.shapes)，窗口接缝处被切开的多边形合并(union)后输出
+    - 一次调用输出全部等级的 geojson 及掩码 geotiff(uint8，nodata=0)
+"""
+import json
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+import shapely
+from rasterio.features import shapes
+from rasterio.windows import Window
+from shapely.geometry import mapping, shape
+
+from commons.enums import FloodLevelEnum
+from util.smoothing import smooth_features
+
+FLOOD_LEVEL_THRESHOLDS: Dict[FloodLevelEnum, float] = {
+    FloodLevelEnum.GTE100: 100,
+    FloodLevelEnum.GTE150: 150,
+    FloodLevelEnum.GTE200: 200,
+}
+"""淹没等级 -> 淹没深度阈值(cm)，像元值大于阈值即属于该等级"""
+
+
+def classify_depth(data: np.ndarray, thresholds: List[float], nodata: Optional[float] = None) -> np.ndarray:
+    """
+        将淹没深度分级
+    @param data: 淹没深度
+    @param thresholds: 升序的阈值
+    @param nodata:
+    @return: uint8，0: 不超过任何阈值(或无效值)，k: 超过第 k 个阈值(不超过第 k+1 个)
+    """
+    valid: np.ndarray = np.isfinite(data)
+    if nodata is not None and not np.isnan(nodata):
+        valid &= data != nodata
+    # right=True: 等于阈值的像元不计入该等级(与原 data > threshold 一致)
+    classes: np.ndarray = np.digitize(np.where(valid, data, -np.inf), thresholds, right=True).astype(np.uint8)
+    return classes
+
+
+def _polygonize_window(read_path: str, row_off: int, height: int, thresholds: List[float]) -> Tuple[
+    int, np.ndarray, List[List[dict]]]:
+    """
+        读取窗口并分级、矢量化(在子进程中执行)
+    @return: (row_off, 分级数组, 各等级的 geojson 几何)
+    """
+    with rasterio.open(read_path) as src:
+        window: Window = Window(0, row_off, src.width, height)
+        data: np.ndarray = src.read(1, window=window)
+        transform = src.window_transform(window)
+        nodata = src.nodata
+    classes: np.ndarray = classify_depth(data, thresholds, nodata)
+    level_geoms: List[List[dict]] = []
+    for level_index in range(1, len(thresholds) + 1):
+        mask: np.ndarray = (classes >= level_index).astype(np.uint8)
+        level_geoms.append([geom for geom, _ in shapes(mask, mask=mask, connectivity=4, transform=transform)])
+    return row_off, classes, level_geoms
+
+
+def stitch_polygons(geoms: List[dict], seams: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+        合并窗口接缝处被切开的多边形
+        只有边界落在接缝上的多边形参与 union，其余多边形原样输出
+    @param geoms: geojson 几何
+    @param seams: 接缝的 y 坐标
+    @param tolerance: 判断是否落在接缝上的容差(取半个像元)
+    @return: shapely Polygon 数组
+    """
+    polygons: np.ndarray = np.array([shape(temp) for temp in geoms], dtype=object)
+    if len(polygons) == 0 or len(seams) == 0:
+        return polygons
+    bounds: np.ndarray = shapely.bounds(polygons)
+    on_seam: np.ndarray = np.zeros(len(polygons), dtype=bool)
+    for seam in seams:
+        on_seam |= (np.abs(bounds[:, 1] - seam) < tolerance) | (np.abs(bounds[:, 3] - seam) < tolerance)
+    if not on_seam.any():
+        return polygons
+    merged: np.ndarray = shapely.get_parts(shapely.union_all(polygons[on_seam]))
+    return np.concatenate([polygons[~on_seam], merged])
+
+
+def write_level_geotiff(read_path: str, out_put_path: str, threshold: float, block_rows: int = 1024) -> int:
+    """
+        + 26-10-18 输出单个淹没等级的掩码 geotiff(与 FloodLevelExtractor 的输出一致: uint8，nodata=0)
+    @param read_path: 淹没深度 geotiff(cm)
+    @param out_put_path:
+    @param threshold: 阈值(cm)
+    @param block_rows: 每个窗口的行数
+    @return: 超过阈值的像元数
+    """
+    count: int = 0
+    with rasterio.open(read_path) as src:
+        profile: dict = src.profile.copy()
+        profile.update({'driver': 'GTiff', 'dtype': 'uint8', 'count': 1, 'nodata': 0, 'compress': 'deflate'})
+        with rasterio.open(out_put_path, 'w', **profile) as dst:
+            for row_off in range(0, src.height, block_rows):
+                window: Window = Window(0, row_off, src.width, min(block_rows, src.height - row_off))
+                classes: np.ndarray = classify_depth(src.read(1, window=window), [threshold], src.nodata)
+                count += int(np.count_nonzero(classes))
+                dst.write(classes, 1, window=window)
+    return count
+
+
+class FloodLevelExtractor:
+    """
+        一次性提取各淹没等级的范围
+    """
+
+    def __init__(self, thresholds: Optional[Dict[FloodLevelEnum, float]] = None, block_rows: int = 1024,
+                 max_workers: int = 1, smooth_refinements: int = 0):
+        """
+        @param thresholds: 淹没等级 -> 阈值(cm)，默认 FLOOD_LEVEL_THRESHOLDS
+        @param block_rows: 每个窗口的行数
+        @param max_workers: 并行矢量化(及平滑)的进程数，<=1 时串行
+        @param smooth_refinements: 输出 geojson 前 Chaikin 平滑的迭代次数，0 为不平滑(掩码 geotiff 不受影响)
+        """
+        thresholds = thresholds or FLOOD_LEVEL_THRESHOLDS
+        self.levels: List[Tuple[FloodLevelEnum, float]] = sorted(thresholds.items(), key=lambda temp: temp[1])
+        self.block_rows = block_rows
+        self.max_workers = max_workers
+        self.smooth_refinements = smooth_refinements
+
+    def _windows(self, read_path: str) -> List[Tuple[int, int]]:
+        with rasterio.open(read_path) as src:
+            height: int = src.height
+        return [(row_off, min(self.block_rows, height - row_off)) for row_off in range(0, height, self.block_rows)]
+
+    def _run(self, read_path: str, windows: List[Tuple[int, int]]):
+        thresholds: List[float] = [temp[1] for temp in self.levels]
+        if self.max_workers <= 1 or len(windows) <= 1:
+            for row_off, height in windows:
+                yield _polygonize_window(read_path, row_off, height, thresholds)
+            return
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(_polygonize_window, read_path, row_off, height, thresholds) for
+                       row_off, height in windows]
+            for future in futures:
+                yield future.result()
+
+    def extract(self, read_path: str, out_dir: str, stamp: str) -> Dict[FloodLevelEnum, Tuple[str, str]]:
+        """
+            提取并输出各等级的 geojson 及掩码 geotiff
+        @param read_path: 淹没深度 geotiff(cm)
+        @param out_dir: 输出目录
+        @param stamp: 输出文件名前缀，输出为 {stamp}_gt{阈值}.geojson | .tif
+        @return: 淹没等级 -> (geojson 路径, geotiff 路径)
+        """
+        out_path = pathlib.Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+        windows: List[Tuple[int, int]] = self._windows(read_path)
+        with rasterio.open(read_path) as src:
+            transform = src.transform
+            profile: dict = src.profile.copy()
+        profile.update({'driver': 'GTiff', 'dtype': 'uint8', 'count': 1, 'nodata': 0, 'compress': 'deflate'})
+        paths: Dict[FloodLevelEnum, Tuple[str, str]] = {
+            level: (str(out_path / f'{stamp}_gt{threshold:g}.geojson'), str(out_path / f'{stamp}_gt{threshold:g}.tif'))
+            for level, threshold in self.levels}
+        level_geoms: List[List[dict]] = [[] for _ in self.levels]
+        datasets = [rasterio.open(paths[level][1], 'w', **profile) for level, _ in self.levels]
+        try:
+            for row_off, classes, window_geoms in self._run(read_path, windows):
+                window: Window = Window(0, row_off, classes.shape[1], classes.shape[0])
+                for level_index, dataset in enumerate(datasets):
+                    dataset.write((classes >= level_index + 1).astype(np.uint8), 1, window=window)
+                    level_geoms[level_index].extend(window_geoms[level_index])
+        finally:
+            for dataset in datasets:
+                dataset.close()
+        # 窗口接缝(不含上下边界)的 y 坐标
+        seams: np.ndarray = np.array([(transform * (0, row_off))[1] for row_off, _ in windows[1:]])
+        tolerance: float = abs(transform.e) / 2
+        for level_index, (level, threshold) in enumerate(self.levels):
+            polygons: np.ndarray = stitch_polygons(level_geoms[level_index], seams, tolerance)
+            features: List[dict] = [
+                {'type': 'Feature', 'geometry': mapping(polygon),
+                 'properties': {'threshold': threshold, 'flood_level': level.value}} for polygon in polygons]
+            if self.smooth_refinements > 0:
+                features = smooth_features(features, self.smooth_refinements, self.max_workers)
+            with open(paths[level][0], 'w') as f:
+                json.dump({'type': 'FeatureCollection', 'features': features}, f)
+            print(f'[-] 淹没等级:{level.name} 提取的面({len(features)})已保存到 {paths[level][0]}')
+        return paths
@@ -0,0 +1,187 @@
+"""
+    模式输出文件解析
+    1- 站点增水 .dat : 首行为表头(fhour + 各站点代码)，其余每行为一个预报时次
+        eg:
+            fhour  AOJ   BJC   DLC  ...
+            0      0.12  0.08  0.31 ...
+    2- 台风路径 .txt : YYYYMMDDHH lon lat pres wind (时间为北京时)，可带表头，wind 列可缺省
+        eg:
+            2024090517 112.20000 19.20000 905.00000 26.00000
+    均使用 pandas C 引擎一次性读入为 numpy 数组，时间在 numpy 中统一由北京时转换为世界时
+"""
+import pathlib
+from datetime import datetime, timezone
+from typing import Iterator, List, Union
+
+import numpy as np
+import pandas as pd
+
+CST_OFFSET_HOURS: int = 8
+"""北京时与世界时相差的小时数"""
+
+STATION_HOUR_COLUMN: str = 'fhour'
+"""站点增水文件中的预报时效列名"""
+
+
+def cst_stamp_to_utc_ts(stamps: np.ndarray) -> np.ndarray:
+    """
+        将 YYYYMMDDHH 格式的北京时整数数组转换为世界时时间戳(秒)
+    @param stamps: eg: [2024090517, 2024090518]
+    @return: int64 数组
+    """
+    stamps = np.asarray(stamps, dtype=np.int64)
+    years: np.ndarray = stamps // 1000000
+    months: np.ndarray = stamps // 10000 % 100
+    days: np.ndarray = stamps // 100 % 100
+    hours: np.ndarray = stamps % 100
+    dt64: np.ndarray = ((years - 1970).astype('datetime64[Y]') + (months - 1).astype('timedelta64[M]')).astype(
+        'datetime64[D]') + (days - 1).astype('timedelta64[D]')
+    dt64 = dt64.astype('datetime64[s]') + (hours - CST_OFFSET_HOURS).astype('timedelta64[h]')
+    return dt64.astype(np.int64)
+
+
+def _is_number(val: str) -> bool:
+    try:
+        float(val)
+        return True
+    except ValueError:
+        return False
+
+
+def _read_first_line(file_path: Union[str, pathlib.Path]) -> List[str]:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                return line.split()
+    return []
+
+
+def _read_table(file_path: Union[str, pathlib.Path], skip_rows: int, dtype) -> pd.DataFrame:
+    """
+        使用 C 引擎按空白分隔读取数值表(不含表头)，文件中无数据行时返回空 DataFrame
+    """
+    try:
+        return pd.read_csv(file_path, sep=r'\s+', header=None, skiprows=skip_rows, engine='c', dtype=dtype)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+class StationSurgeMatrix:
+    """
+        站点增水矩阵
+        surge shape:(时次, 站点)
+    """
+    __slots__ = ('station_codes', 'fhours', 'surge')
+
+    def __init__(self, station_codes: List[str], fhours: np.ndarray, surge: np.ndarray):
+        self.station_codes: List[str] = station_codes
+        """站点代码(与 surge 列顺序一致)"""
+        self.fhours: np.ndarray = fhours
+        """预报时效(小时)"""
+        self.surge: np.ndarray = surge
+        """增水 float64 (时次, 站点)"""
+
+    @property
+    def is_empty(self) -> bool:
+        return self.surge.size == 0
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+            转换为以 fhour 为索引，站点代码为列的 DataFrame
+        """
+        return pd.DataFrame(self.surge, index=pd.Index(self.fhours, name=STATION_HOUR_COLUMN),
+                            columns=self.station_codes)
+
+
+class TyTrackPoint:
+    """
+        台风路径中的单个时次
+    """
+    __slots__ = ('ts', 'lon', 'lat', 'bp', 'wind')
+
+    def __init__(self, ts: int, lon: float, lat: float, bp: float, wind: float):
+        self.ts: int = ts
+        """世界时时间戳(秒)"""
+        self.lon: float = lon
+        self.lat: float = lat
+        self.bp: float = bp
+        """中心气压"""
+        self.wind: float = wind
+        """最大风速"""
+
+    @property
+    def forecast_dt(self) -> datetime:
+        return datetime.fromtimestamp(self.ts, tz=timezone.utc)
+
+
+class TyTrackArrays:
+    """
+        台风路径(按列存储)
+    """
+    __slots__ = ('ts', 'lon', 'lat', 'bp', 'wind')
+
+    def __init__(self, ts: np.ndarray, lon: np.ndarray, lat: np.ndarray, bp: np.ndarray, wind: np.ndarray):
+        self.ts: np.ndarray = ts
+        """世界时时间戳(秒) int64"""
+        self.lon: np.ndarray = lon
+        self.lat: np.ndarray = lat
+        self.bp: np.ndarray = bp
+        self.wind: np.ndarray = wind
+
+    @classmethod
+    def empty(cls) -> 'TyTrackArrays':
+        empty: np.ndarray = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype=np.int64), empty, empty, empty, empty)
+
+    @property
+    def forecast_dt(self) -> np.ndarray:
+        """世界时 datetime64[s] 数组"""
+        return self.ts.astype('datetime64[s]')
+
+    def __len__(self) -> int:
+        return self.ts.shape[0]
+
+    def __iter__(self) -> Iterator[TyTrackPoint]:
+        for ts, lon, lat, bp, wind in zip(self.ts.tolist(), self.lon.tolist(), self.lat.tolist(), self.bp.tolist(),
+                                          self.wind.tolist()):
+            yield TyTrackPoint(ts, lon, lat, bp, wind)
+
+
+def read_station_surge_dat(file_path: Union[str, pathlib.Path]) -> StationSurgeMatrix:
+    """
+        读取站点增水 .dat 文件
+        表头中的站点代码保持原样(不会像 pandas 一样对重复列名追加 .1 后缀)
+    @param file_path:
+    @return:
+    """
+    header: List[str] = _read_first_line(file_path)
+    has_hour_column: bool = len(header) > 0 and header[0].lower() == STATION_HOUR_COLUMN
+    station_codes: List[str] = header[1:] if has_hour_column else header
+    values: np.ndarray = _read_table(file_path, 1, np.float64).to_numpy(dtype=np.float64)
+    if values.size == 0:
+        return StationSurgeMatrix(station_codes, np.empty(0, dtype=np.int64),
+                                  np.empty((0, len(station_codes)), dtype=np.float64))
+    if has_hour_column:
+        fhours: np.ndarray = values[:, 0].astype(np.int64)
+        surge: np.ndarray = values[:, 1:]
+    else:
+        fhours = np.arange(values.shape[0], dtype=np.int64)
+        surge = values
+    return StationSurgeMatrix(station_codes, fhours, np.ascontiguousarray(surge))
+
+
+def read_ty_track_txt(file_path: Union[str, pathlib.Path]) -> TyTrackArrays:
+    """
+        读取台风路径 .txt 文件，时间由北京时转换为世界时时间戳
+    @param file_path:
+    @return:
+    """
+    header: List[str] = _read_first_line(file_path)
+    skip_rows: int = 0 if len(header) > 0 and _is_number(header[0]) else 1
+    df: pd.DataFrame = _read_table(file_path, skip_rows, {0: np.int64})
+    if df.empty:
+        return TyTrackArrays.empty()
+    values: np.ndarray = df.iloc[:, 1:].to_numpy(dtype=np.float64)
+    wind: np.ndarray = values[:, 3] if values.shape[1] > 3 else np.full(values.shape[0], np.nan)
+    return TyTrackArrays(cst_stamp_to_utc_ts(df.iloc[:, 0].to_numpy()), values[:, 0], values[:, 1],
+                         values[:, 2], wind)
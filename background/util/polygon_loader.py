@@ -0,0 +1,303 @@
+"""
+    + 26-10-18 淹没范围多边形批量入库
+    - 整列处理几何(shapely 2 数组操作)，不再逐行解析 WKT / 交换坐标 / 逐个 session.add
+    - MultiPolygon 拆分为多个 Polygon(保留内环)，属性相同
+    - 按批次流式读取 geojson(见 util/geojson_stream.py)，内存只与批次大小有关
+    - 逐网格的淹没结果可先按深度分级(或淹没等级)合并为区域后再入库(见 util/flood_dissolve.py)
+    - 淹没深度 geotiff 可直接分级、矢量化后入库(load_flood_raster)
+    - 统一约定: 入库及读取时均以 (lng, lat) 顺序与 mysql 交换，mysql 侧通过 'axis-order=long-lat' 转换为 srid=4326 的原生轴序
+      读取端使用 ST_AsText(geom, 'axis-order=long-lat') 即可得到 (lng, lat)，不再需要逐行交换坐标
+"""
+import json
+import pathlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from sqlalchemy.sql import text
+
+from commons.enums import FloodLevelEnum
+from db_factory import session_yield_scope
+from util.flood_dissolve import FloodCellGrid, dissolve_by_depth_class, dissolve_by_flood_level
+from util.flood_grid import FLOOD_DEPTH_FIELD
+from util.flood_level_extractor import FLOOD_LEVEL_THRESHOLDS
+from util.geojson_stream import GeoJSONFeatureWriter, iter_geodataframes, json_value
+from util.land_mask import TiledLandMask
+
+GEOM_FROM_WKB: str = "ST_GeomFromWKB(:wkb, 4326, 'axis-order=long-lat')"
+"""入库时几何的转换(WKB 为 (lng, lat) 顺序)"""
+
+INSERT_POLYGON_SQL: str = f"""
+    INSERT INTO geo_polygons (ty_code, value, name, description, properties, geom, issue_time, gmt_create_time,
+                              gmt_update_time)
+    VALUES (:ty_code, :value, :name, :description, :properties, {GEOM_FROM_WKB}, :issue_time, :gmt_create_time,
+            :gmt_update_time)
+"""
+
+INSERT_FLOODLEVEL_POLYGON_SQL: str = f"""
+    INSERT INTO geo_floodlevel_polygon (ty_code, value, name, description, properties, geom, issue_time, flood_level,
+                                        gmt_create_time, gmt_update_time)
+    VALUES (:ty_code, :value, :name, :description, :properties, {GEOM_FROM_WKB}, :issue_time, :flood_level,
+            :gmt_create_time, :gmt_update_time)
+"""
+
+DELETE_POLYGON_SQL: str = """
+    DELETE FROM geo_polygons WHERE ty_code = :ty_code AND issue_time = :issue_time
+"""
+
+DELETE_FLOODLEVEL_POLYGON_SQL: str = """
+    DELETE FROM geo_floodlevel_polygon WHERE ty_code = :ty_code AND issue_time = :issue_time AND flood_level = :flood_level
+"""
+
+
+def normalize_polygons(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """
+        整理为 (lng, lat) 顺序的单个 Polygon
+    @param gdf: 一个批次的 feature
+    @return: 保留原始要素序号(index)的 GeoDataFrame
+    """
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+    # MultiPolygon -> Polygon(内环保留在各自的 Polygon 中)
+    gdf = gdf.explode(index_parts=False)
+    gdf = gdf[shapely.get_type_id(gdf.geometry.values) == shapely.GeometryType.POLYGON]
+    # 去掉 z 值，统一为二维坐标
+    gdf = gdf.set_geometry(shapely.force_2d(gdf.geometry.values))
+    return gdf
+
+
+def build_polygon_rows(gdf: gpd.GeoDataFrame, ty_code: str, issue_ts: int, value_name: str,
+                       flood_level: Optional[FloodLevelEnum] = None) -> List[Dict[str, Any]]:
+    """
+        生成批量写入的参数
+        gmt_create_time | gmt_update_time 为 NOT NULL 且默认值只在 ORM 中，此处按批次填写(utc)
+    @param gdf: normalize_polygons 的结果
+    @param ty_code:
+    @param issue_ts:
+    @param value_name: 作为 value 的属性名
+    @param flood_level: 不为空时写入 geo_floodlevel_polygon
+    @return:
+    """
+    wkbs: np.ndarray = shapely.to_wkb(gdf.geometry.values, output_dimension=2)
+    properties_list: List[dict] = gdf.drop(columns=gdf.geometry.name).to_dict('records')
+    now: datetime = datetime.utcnow()
+    rows: List[Dict[str, Any]] = []
+    for idx, wkb, properties in zip(gdf.index, wkbs, properties_list):
+        properties = {key: json_value(val) for key, val in properties.items()}
+        row: Dict[str, Any] = {
+            'ty_code': ty_code,
+            'value': properties.get(value_name),
+            'name': properties.get('name', f"Feature_{idx}"),
+            # 若不存在 description 的话赋值为 value_name
+            'description': properties.get('description', value_name),
+            'properties': json.dumps(properties),
+            'wkb': wkb,
+            'issue_time': issue_ts,
+            'gmt_create_time': now,
+            'gmt_update_time': now,
+        }
+        if flood_level is not None:
+            row['flood_level'] = flood_level.value
+        rows.append(row)
+    return rows
+
+
+def bulk_insert_polygons(session, rows: List[Dict[str, Any]], flood_level: Optional[FloodLevelEnum] = None,
+                         batch_size: int = 1000) -> int:
+    """
+        按批次 executemany 写入
+    @param session:
+    @param rows: build_polygon_rows 的结果
+    @param flood_level: 不为空时写入 geo_floodlevel_polygon，否则写入 geo_polygons
+    @param batch_size: 每批写入的行数
+    @return: 写入的行数
+    """
+    stmt = text(INSERT_FLOODLEVEL_POLYGON_SQL if flood_level is not None else INSERT_POLYGON_SQL)
+    for start in range(0, len(rows), batch_size):
+        session.execute(stmt, rows[start:start + batch_size])
+    return len(rows)
+
+
+def delete_polygons(session, ty_code: str, issue_ts: int, flood_level: Optional[FloodLevelEnum] = None) -> int:
+    """
+        + 26-10-18 删除同一次预报已写入的多边形(重新生成时先删除，保证可重复执行)
+    @param session:
+    @param ty_code:
+    @param issue_ts:
+    @param flood_level: 不为空时删除 geo_floodlevel_polygon 中对应等级的多边形，否则删除 geo_polygons
+    @return: 删除的行数
+    """
+    if flood_level is None:
+        result = session.execute(text(DELETE_POLYGON_SQL), {'ty_code': ty_code, 'issue_time': issue_ts})
+    else:
+        result = session.execute(text(DELETE_FLOODLEVEL_POLYGON_SQL),
+                                 {'ty_code': ty_code, 'issue_time': issue_ts, 'flood_level': flood_level.value})
+    return result.rowcount
+
+
+def load_geojson_polygons(geojson_path: str, ty_code: str, issue_ts: int, value_name: str,
+                          flood_level: Optional[FloodLevelEnum] = None, batch_size: int = 1000) -> int:
+    """
+        读取 geojson 并批量写入 geo_polygons | geo_floodlevel_polygon
+    @param geojson_path:
+    @param ty_code:
+    @param issue_ts:
+    @param value_name:
+    @param flood_level: 为空时写入 geo_polygons
+    @param batch_size: 每批读取及写入的 feature 数
+    @return: 写入的多边形数(MultiPolygon 按拆分后的数量计)
+    """
+    count: int = 0
+    # 单个事务，全部批次写入成功后提交
+    with session_yield_scope() as session:
+        for gdf in iter_geodataframes(geojson_path, batch_size):
+            rows: List[Dict[str, Any]] = build_polygon_rows(normalize_polygons(gdf), ty_code, issue_ts, value_name,
+                                                            flood_level)
+            count += bulk_insert_polygons(session, rows, flood_level, batch_size)
+    print(f"成功导入 {count} 个多边形到数据库")
+    return count
+
+
+def _write_depth_classes(session, gdf: gpd.GeoDataFrame, ty_code: str, issue_ts: int, batch_size: int) -> int:
+    """
+        写入按淹没深度分级合并的区域(geo_polygons)
+        value 为区域内的最大淹没深度，properties 中包含分级、面积及最小/最大/平均淹没深度
+    """
+    gdf['description'] = [f'{lower:g}-{upper:g}cm' if upper is not None and not np.isnan(upper) else f'>{lower:g}cm'
+                          for lower, upper in zip(gdf['depth_lower'], gdf['depth_upper'])]
+    rows: List[Dict[str, Any]] = build_polygon_rows(normalize_polygons(gdf), ty_code, issue_ts, 'max_depth')
+    return bulk_insert_polygons(session, rows, None, batch_size)
+
+
+def _write_flood_levels(session, levels: Dict[FloodLevelEnum, gpd.GeoDataFrame], ty_code: str, issue_ts: int,
+                        batch_size: int) -> Dict[FloodLevelEnum, int]:
+    """
+        写入按淹没等级阈值合并的区域(geo_floodlevel_polygon)
+    """
+    counts: Dict[FloodLevelEnum, int] = {}
+    for level, gdf in levels.items():
+        gdf['description'] = [f'>{threshold:g}cm' for threshold in gdf['threshold']]
+        rows: List[Dict[str, Any]] = build_polygon_rows(normalize_polygons(gdf), ty_code, issue_ts, 'max_depth',
+                                                        level)
+        counts[level] = bulk_insert_polygons(session, rows, level, batch_size)
+    return counts
+
+
+def load_dissolved_depth_classes(cells_path: str, ty_code: str, issue_ts: int, breaks: Optional[List[float]] = None,
+                                 value_name: str = FLOOD_DEPTH_FIELD, batch_size: int = 1000) -> int:
+    """
+        逐网格的淹没 geojson 按淹没深度分级合并为区域后写入 geo_polygons
+    @param cells_path: 逐网格的淹没 geojson
+    @param ty_code:
+    @param issue_ts:
+    @param breaks: 淹没深度分级(cm)，默认 DEPTH_CLASS_BREAKS
+    @param value_name: 网格中淹没深度的属性名
+    @param batch_size:
+    @return: 写入的多边形数
+    """
+    grid: FloodCellGrid = FloodCellGrid.from_file(cells_path, value_name)
+    gdf: gpd.GeoDataFrame = dissolve_by_depth_class(grid, breaks)
+    with session_yield_scope() as session:
+        count: int = _write_depth_classes(session, gdf, ty_code, issue_ts, batch_size)
+    print(f"{len(grid.values)} 个网格合并为 {count} 个多边形并导入数据库")
+    return count
+
+
+def load_dissolved_flood_levels(cells_path: str, ty_code: str, issue_ts: int,
+                                thresholds: Optional[Dict[FloodLevelEnum, float]] = None,
+                                value_name: str = FLOOD_DEPTH_FIELD, batch_size: int = 1000) -> Dict[
+    FloodLevelEnum, int]:
+    """
+        逐网格的淹没 geojson 按淹没等级阈值合并为区域后写入 geo_floodlevel_polygon
+    @param cells_path: 逐网格的淹没 geojson
+    @param ty_code:
+    @param issue_ts:
+    @param thresholds: 淹没等级 -> 阈值(cm)，默认 FLOOD_LEVEL_THRESHOLDS
+    @param value_name: 网格中淹没深度的属性名
+    @param batch_size:
+    @return: 淹没等级 -> 写入的多边形数
+    """
+    grid: FloodCellGrid = FloodCellGrid.from_file(cells_path, value_name)
+    # 单个事务，全部等级写入成功后提交
+    with session_yield_scope() as session:
+        counts: Dict[FloodLevelEnum, int] = _write_flood_levels(session, dissolve_by_flood_level(grid, thresholds),
+                                                                ty_code, issue_ts, batch_size)
+    for level, count in counts.items():
+        print(f"[-] 淹没等级:{level.name} {len(grid.values)} 个网格合并为 {count} 个多边形")
+    return counts
+
+
+def load_flood_raster(read_path: str, ty_code: str, issue_ts: int, breaks: Optional[List[float]] = None,
+                      thresholds: Optional[Dict[FloodLevelEnum, float]] = None, mask_file: Optional[str] = None,
+                      out_dir: Optional[str] = None, stamp: Optional[str] = None, block_rows: int = 1024,
+                      batch_size: int = 1000) -> Tuple[int, Dict[FloodLevelEnum, int]]:
+    """
+        + 26-10-18 由淹没深度 geotiff 一次性生成并写入淹没深度分级范围(geo_polygons)及各淹没等级范围(geo_floodlevel_polygon)
+        替代 04(geojson -> geotiff) -> 05(掩码) -> 06(提取等级) -> 07(入库) 之间的文件往返:
+        按窗口读取有效像元，(可选)按像元中心点剔除掩码内的像元，分级后矢量化并在同一个事务中写入
+    @param read_path: 淹没深度 geotiff(cm)
+    @param ty_code:
+    @param issue_ts:
+    @param breaks: 淹没深度分级(cm)，默认 DEPTH_CLASS_BREAKS
+    @param thresholds: 淹没等级 -> 阈值(cm)，默认 FLOOD_LEVEL_THRESHOLDS
+    @param mask_file: 掩码 shapefile(陆地及海洋外边界)，为空时不剔除
+    @param out_dir: 不为空时同时输出 geojson: {stamp}_bins.geojson | {stamp}_gt{阈值}.geojson
+    @param stamp: 输出文件名前缀，为空时使用 geotiff 文件名
+    @param block_rows: 读取 geotiff 时每个窗口的行数
+    @param batch_size:
+    @return: (淹没深度分级范围的多边形数, 淹没等级 -> 多边形数)
+    """
+    land_mask: Optional[TiledLandMask] = TiledLandMask.from_file(mask_file) if mask_file else None
+    grid: FloodCellGrid = FloodCellGrid.from_geotiff(read_path, land_mask, block_rows)
+    bins: gpd.GeoDataFrame = dissolve_by_depth_class(grid, breaks)
+    levels: Dict[FloodLevelEnum, gpd.GeoDataFrame] = dissolve_by_flood_level(grid, thresholds)
+    if out_dir:
+        out_path = pathlib.Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+        stamp = stamp or pathlib.Path(read_path).stem
+        with GeoJSONFeatureWriter(str(out_path / f'{stamp}_bins.geojson')) as writer:
+            writer.write_geodataframe(bins)
+        for level, gdf in levels.items():
+            threshold: float = (thresholds or FLOOD_LEVEL_THRESHOLDS)[level]
+            with GeoJSONFeatureWriter(str(out_path / f'{stamp}_gt{threshold:g}.geojson')) as writer:
+                writer.write_geodataframe(gdf)
+    # 单个事务，分级范围及全部等级写入成功后提交
+    with session_yield_scope() as session:
+        bin_count: int = _write_depth_classes(session, bins, ty_code, issue_ts, batch_size)
+        level_counts: Dict[FloodLevelEnum, int] = _write_flood_levels(session, levels, ty_code, issue_ts, batch_size)
+    print(f"{len(grid.values)} 个有效像元合并为 {bin_count} 个淹没深度分级多边形，"
+          f"各淹没等级:{ {level.name: count for level, count in level_counts.items()} }")
+    return bin_count, level_counts
+
+
+def replace_depth_class_polygons(gdf: gpd.GeoDataFrame, ty_code: str, issue_ts: int, batch_size: int = 1000) -> int:
+    """
+        + 26-10-18 替换同一次预报的淹没深度分级范围(geo_polygons)，删除及写入在同一个事务中
+    @param gdf: dissolve_by_depth_class 的结果
+    @param ty_code:
+    @param issue_ts:
+    @param batch_size:
+    @return: 写入的多边形数
+    """
+    with session_yield_scope() as session:
+        delete_polygons(session, ty_code, issue_ts)
+        return _write_depth_classes(session, gdf, ty_code, issue_ts, batch_size)
+
+
+def replace_flood_level_polygons(gdf: gpd.GeoDataFrame, ty_code: str, issue_ts: int, flood_level: FloodLevelEnum,
+                                 batch_size: int = 1000) -> int:
+    """
+        + 26-10-18 替换同一次预报单个淹没等级的范围(geo_floodlevel_polygon)，删除及写入在同一个事务中
+    @param gdf: dissolve_by_flood_level 中对应等级的结果
+    @param ty_code:
+    @param issue_ts:
+    @param flood_level:
+    @param batch_size:
+    @return: 写入的多边形数
+    """
+    with session_yield_scope() as session:
+        delete_polygons(session, ty_code, issue_ts, flood_level)
+        return _write_flood_levels(session, {flood_level: gdf}, ty_code, issue_ts, batch_size)[flood_level]
@@ -0,0 +1,93 @@
+"""
+    + 26-10-18 Chaikin 插值平滑(numpy 向量化)
+    每次迭代对环上所有线段同时计算:
+        Q_i = 3/4 * P_i + 1/4 * P_{i+1}
+        R_i = 1/4 * P_i + 3/4 * P_{i+1}
+    外环、内环及 MultiPolygon 的各部分均参与平滑
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from shapely.geometry import mapping, shape
+
+
+def chaikin_ring(coords: np.ndarray, refinements: int = 3) -> np.ndarray:
+    """
+        平滑闭合的环
+    @param coords: (n, 2) 首尾相同的闭合环
+    @param refinements: 迭代次数，每次点数翻倍
+    @return: (m, 2) 首尾相同的闭合环
+    """
+    coords = np.asarray(coords, dtype=np.float64)[:, :2]
+    if len(coords) < 3:
+        return coords
+    for _ in range(refinements):
+        p1: np.ndarray = coords[:-1]
+        p2: np.ndarray = coords[1:]
+        smoothed: np.ndarray = np.empty((len(p1) * 2 + 1, 2), dtype=np.float64)
+        smoothed[0:-1:2] = 0.75 * p1 + 0.25 * p2
+        smoothed[1:-1:2] = 0.25 * p1 + 0.75 * p2
+        # 闭合多边形
+        smoothed[-1] = smoothed[0]
+        coords = smoothed
+    return coords
+
+
+def smooth_geometry(geometry: dict, refinements: int = 3) -> dict:
+    """
+        平滑 geojson 几何(Polygon | MultiPolygon)，其他类型原样返回
+    @param geometry:
+    @param refinements:
+    @return:
+    """
+    geom_type: str = geometry.get('type')
+    if geom_type == 'Polygon':
+        rings = [chaikin_ring(ring, refinements).tolist() for ring in geometry['coordinates']]
+        return {'type': 'Polygon', 'coordinates': rings}
+    if geom_type == 'MultiPolygon':
+        parts = [[chaikin_ring(ring, refinements).tolist() for ring in part] for part in geometry['coordinates']]
+        return {'type': 'MultiPolygon', 'coordinates': parts}
+    return geometry
+
+
+def _smooth_feature(args) -> dict:
+    feature, refinements = args
+    return {**feature, 'geometry': smooth_geometry(feature['geometry'], refinements)}
+
+
+def smooth_features(features: List[dict], refinements: int = 3, max_workers: int = 1,
+                    chunk_size: int = 256) -> List[dict]:
+    """
+        平滑 geojson feature 集合
+    @param features:
+    @param refinements:
+    @param max_workers: 进程数，<=1 时串行
+    @param chunk_size: 每个进程每次处理的 feature 数
+    @return: 与输入顺序一致
+    """
+    args = [(feature, refinements) for feature in features]
+    if max_workers <= 1 or len(features) <= chunk_size:
+        return [_smooth_feature(temp) for temp in args]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_smooth_feature, args, chunksize=chunk_size))
+
+
+def smooth_feature_collection(collection: dict, refinements: int = 3, max_workers: int = 1,
+                              chunk_size: Optional[int] = None) -> dict:
+    """
+        平滑 FeatureCollection
+    """
+    features: List[dict] = smooth_features(collection.get('features', []), refinements, max_workers,
+                                           chunk_size or 256)
+    return {**collection, 'features': features}
+
+
+def smooth_shapes(geoms, refinements: int = 3) -> List:
+    """
+        + 26-10-18 平滑 shapely 几何(如 GeoDataFrame.geometry)
+    @param geoms:
+    @param refinements:
+    @return: shapely 几何列表，与输入顺序一致
+    """
+    return [shape(smooth_geometry(mapping(geom), refinements)) for geom in geoms]
@@ -0,0 +1,136 @@
+"""
+    站点增水入库吞吐量基准测试(rows/sec)
+    对比:
+        legacy: pd.read_csv 读取 + 逐行构建 ORM 对象 + 逐站点提交(原 StationSurgeExecutor._save_dataframe_to_db)
+        bulk:   read_station_surge_dat 读取 + StationSurgeBulkWriter numpy 展开 + executemany 分批写入，每个成员文件提交一次
+    合成数据会先写为临时 .dat 文件，计时包含读取与入库
+    默认使用 sqlite 内存库，可通过 --url 指定 mysql 连接串(如需测试 LOAD DATA 可加 --load-data)
+    运行(在 celery_job_sys 目录下):
+        python -m benchmarks.station_surge_ingest_bench --stations 300 --hours 73
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+from typing import Dict, List
+
+import arrow
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from commons.enums import TYGroupTypeEnum
+from models.models import StationForecastRealdataModel
+from tasks.station_surge_executor import StationSurgeBulkWriter
+from util.model_output_parser import read_station_surge_dat
+
+MEMBER_STAMPS: List[str] = ['center', 'fast', 'left', 'right', 'slow']
+TY_CODE: str = '2106'
+ISSUE_TS: int = 1747125125
+FORECAST_START_TS: int = 1725526800
+
+
+def build_member_files(out_dir: pathlib.Path, count_stations: int, count_hours: int) -> Dict[str, pathlib.Path]:
+    """
+        生成与 .dat 文件结构一致的合成数据(fhour + 各站点列)
+    """
+    rng = np.random.default_rng(42)
+    files: Dict[str, pathlib.Path] = {}
+    station_codes: List[str] = [f'S{index:04d}' for index in range(count_stations)]
+    for stamp in MEMBER_STAMPS:
+        df = pd.DataFrame(rng.normal(0.5, 0.3, size=(count_hours, count_stations)).round(3), columns=station_codes)
+        df.insert(0, 'fhour', np.arange(count_hours))
+        file_path: pathlib.Path = out_dir / f'station_output_{stamp}.dat'
+        df.to_csv(file_path, sep=' ', index=False)
+        files[stamp] = file_path
+    return files
+
+
+def save_by_orm(session_factory: sessionmaker, file_path: pathlib.Path, gp_id: int) -> int:
+    """
+        原入库方式:逐行构建 ORM 对象，逐站点提交
+    """
+    count: int = 0
+    df: pd.DataFrame = pd.read_csv(file_path, sep=r'\s+', header=0)
+    forecast_dt_start = arrow.get(FORECAST_START_TS)
+    with session_factory() as session:
+        for station_code in df.columns:
+            if station_code == 'fhour':
+                continue
+            records: List[StationForecastRealdataModel] = []
+            for index, surge_value in enumerate(df[station_code].tolist()):
+                current_forecast_dt = forecast_dt_start.shift(hours=index)
+                records.append(StationForecastRealdataModel(ty_code=TY_CODE, gp_id=gp_id, station_code=station_code,
+                                                            issue_time=ISSUE_TS,
+                                                            forecast_dt=current_forecast_dt.datetime,
+                                                            forecast_ts=current_forecast_dt.int_timestamp,
+                                                            forecast_index=index, surge=surge_value))
+            session.add_all(records)
+            session.commit()
+            count += len(records)
+    return count
+
+
+def save_by_bulk(session_factory: sessionmaker, writer: StationSurgeBulkWriter, file_path: pathlib.Path, gp_id: int,
+                 stamp: str) -> int:
+    """
+        批量入库方式:每个成员文件一个事务
+    """
+    columns = writer.melt(read_station_surge_dat(file_path), ty_code=TY_CODE, issue_ts=ISSUE_TS,
+                          forecast_ts=FORECAST_START_TS, gp_id=gp_id, grouppath_type=TYGroupTypeEnum[stamp.upper()])
+    session: Session
+    with session_factory() as session:
+        count: int = writer.write(session, columns)
+        session.commit()
+    return count
+
+
+def run_case(engine: Engine, name: str, files: Dict[str, pathlib.Path], use_orm: bool,
+             writer: StationSurgeBulkWriter) -> float:
+    table = StationForecastRealdataModel.__table__
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    start: float = time.perf_counter()
+    count: int = 0
+    for gp_id, (stamp, file_path) in enumerate(files.items()):
+        if use_orm:
+            count += save_by_orm(session_factory, file_path, gp_id)
+        else:
+            count += save_by_bulk(session_factory, writer, file_path, gp_id, stamp)
+    elapsed: float = time.perf_counter() - start
+    rate: float = count / elapsed if elapsed > 0 else float('inf')
+    print(f'[{name:<6}] rows:{count:>8} elapsed:{elapsed:8.3f}s throughput:{rate:12.1f} rows/sec')
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='站点增水入库吞吐量基准测试')
+    parser.add_argument('--url', default='sqlite://', help='数据库连接串，默认为 sqlite 内存库')
+    parser.add_argument('--stations', type=int, default=300)
+    parser.add_argument('--hours', type=int, default=73)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--load-data', action='store_true', help='mysql 下使用 LOAD DATA LOCAL INFILE')
+    args = parser.parse_args()
+
+    connect_args: dict = {'local_infile': True} if args.load_data else {}
+    execution_options: dict = {}
+    if args.url.startswith('sqlite'):
+        # sqlite 不支持 schema，映射为默认 schema
+        execution_options['schema_translate_map'] = {'sys_flood_nationaldebt': None}
+    engine: Engine = create_engine(args.url, connect_args=connect_args).execution_options(**execution_options)
+
+    writer = StationSurgeBulkWriter(batch_size=args.batch_size, use_load_data=args.load_data)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = build_member_files(pathlib.Path(tmp_dir), args.stations, args.hours)
+        print(f'members:{len(files)} stations:{args.stations} hours:{args.hours} url:{args.url}')
+        legacy_rate: float = run_case(engine, 'legacy', files, True, writer)
+        bulk_rate: float = run_case(engine, 'bulk', files, False, writer)
+    print(f'speedup: {bulk_rate / legacy_rate:.1f}x')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+    增水场 nc -> geotiff 转换耗时基准测试
+    对比:
+        serial:   逐个集合成员串行转换(原 SurgeRasterExecutor.batch_nc2tiff)
+        parallel: SurgeRasterConvertEngine 进程池并行转换
+    合成 5 个集合成员的 zmax_{member}.dat.nc (lat/lon 规则网格) 写入临时目录，计时包含读取与写出 geotiff
+    注意:加速比取决于 cpu 核数及磁盘，单核环境下并行不会更快
+    运行(在 celery_job_sys 目录下):
+        python -m benchmarks.surge_raster_convert_bench --lat 1200 --lon 1500 --workers 5
+"""
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+import xarray as xr
+
+from commons.enums import RasterFileType
+from core.raster_engine import SurgeRasterConvertEngine
+from mid_models.mid_models import ForecastSurgeRasterFile
+from util.utils import get_ty_group_enum
+
+MEMBER_STAMPS: List[str] = ['center', 'fast', 'left', 'right', 'slow']
+ISSUE_TS: int = 1747125125
+
+
+def build_member_files(out_dir: pathlib.Path, count_lat: int, count_lon: int) -> List[ForecastSurgeRasterFile]:
+    """
+        生成与模式输出结构一致的合成 nc 文件(变量 zmax，维度 lat/lon)
+    """
+    rng = np.random.default_rng(42)
+    lats: np.ndarray = np.linspace(0, 45, count_lat)
+    lons: np.ndarray = np.linspace(100, 150, count_lon)
+    coverage_files: List[ForecastSurgeRasterFile] = []
+    for stamp in MEMBER_STAMPS:
+        zmax: np.ndarray = rng.normal(0, 0.6, size=(count_lat, count_lon)).astype(np.float32)
+        ds = xr.Dataset({'zmax': (('lat', 'lon'), zmax)}, coords={'lat': lats, 'lon': lons})
+        file_name: str = f'zmax_{stamp}.dat.nc'
+        ds.to_netcdf(out_dir / file_name)
+        coverage_files.append(ForecastSurgeRasterFile(RasterFileType.NETCDF, ISSUE_TS, file_name, '', str(out_dir),
+                                                      get_ty_group_enum(stamp)))
+    return coverage_files
+
+
+def run_case(name: str, engine: SurgeRasterConvertEngine, coverage_files: List[ForecastSurgeRasterFile]) -> float:
+    start: float = time.perf_counter()
+    tiff_files: List[ForecastSurgeRasterFile] = engine.convert(coverage_files)
+    elapsed: float = time.perf_counter() - start
+    print(f'[{name:<8}] files:{len(tiff_files)} elapsed:{elapsed:8.3f}s '
+          f'order:{",".join(temp.file_name.split(".")[0] for temp in tiff_files)}')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增水场 nc -> geotiff 并行转换基准测试')
+    parser.add_argument('--lat', type=int, default=1200)
+    parser.add_argument('--lon', type=int, default=1500)
+    parser.add_argument('--workers', type=int, default=len(MEMBER_STAMPS))
+    parser.add_argument('--gdal-threads', default='1')
+    parser.add_argument('--mp-context', default='spawn')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        coverage_files = build_member_files(pathlib.Path(tmp_dir), args.lat, args.lon)
+        print(f'members:{len(coverage_files)} grid:{args.lat}x{args.lon} workers:{args.workers} '
+              f'cpu:{os.cpu_count()}')
+        serial_elapsed: float = run_case('serial', SurgeRasterConvertEngine(
+            max_workers=1, gdal_num_threads=args.gdal_threads), coverage_files)
+        parallel_elapsed: float = run_case('parallel', SurgeRasterConvertEngine(
+            max_workers=args.workers, gdal_num_threads=args.gdal_threads, mp_context=args.mp_context),
+            coverage_files)
+    print(f'speedup: {serial_elapsed / parallel_elapsed:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import math
 import pathlib
 import subprocess
 import os
@@ -5,15 +6,41 @@ from datetime import datetime
 
 import arrow
 import time
-import asyncio
+from typing import List
 
+from celery import chain, chord, group
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from commons.enums import FloodLevelEnum
 from config.base_config import StoreConfig
 from config.celery_config import celery_app
 from config.config import base_setting
+from config.settings import FLOOD_PRODUCT_OPTIONS, MODEL_OUTPUT_WATCH_OPTIONS
+from db_factory import EngineRegistry
 from schemas import TyphoonPathComplexDetailSchema
+from tasks.flood_product_executor import FloodProductExecutor
 from tasks.station_surge_executor import StationSurgeExecutor
+from tasks.surge_ensemble_executor import SurgeEnsembleExecutor
 from tasks.surge_raster_executor import SurgeRasterExecutor
 from tasks.ty_path_executor import TyphoonPathExecutor, TyphoonGroupPathExecutor
+from util.output_watcher import ModelOutputWatcher, STAGE_GROUP_PATH, STAGE_STATION_SURGE, STAGE_SURGE_RASTER
+
+
+@worker_process_init.connect
+def init_worker_db_engine(**kwargs):
+    """
+        + 26-10-18 prefork 子进程启动时丢弃从父进程继承的连接池，
+        子进程内的 session_yield_scope() 会按需为本进程重新创建一个 engine(每个进程一个连接池)
+    """
+    EngineRegistry.dispose_all(close=False)
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_db_engine(**kwargs):
+    """
+        + 26-10-18 子进程退出时释放本进程的连接池
+    """
+    EngineRegistry.dispose_all()
 
 
 @celery_app.task(name="ty_group")
@@ -68,51 +95,49 @@ def execute_shell_job(params_dict: dict):
         # 3-2: 站点集合增水预报结果
         # 3-3: 增水场(处理流程较多)
 
-        # 在 output 目录执行脚本
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=base_setting.OUTPUT_DIR
-        )
-
-        # TODO:[-] 25-07-23 模型计算+后处理流程
-        # 提供台风路径信息——由前端提交后 fastapi - celery => task
-        was_successful = post_process()
-        """后处理是否后处理是否完成"""
-
-        # step2: 判断模型是否计算结束,若存在则执行后续流程
-        if was_successful:
-            # step3: 批量存储站点增水集合
-            # TODO:[*] 25-07-17 未测试
-            station_surge_executor = StationSurgeExecutor(read_path=str(result_path), ty_code=TY_CODE,
-                                                          issue_ts=ISSUE_TS,
-                                                          forecast_start_ts=FORECAST_TS)
-            station_surge_executor.execute()
-
-            # step4: 批量存储台风集合路径
-            ty_grouppath_executor = TyphoonGroupPathExecutor(user_id, TY_CODE, ty_name_ch, ty_name_en, ISSUE_TS)
-            ty_grouppath_executor.execute()
-
-            # step5: 批量写入增水范围
-            """
-                增水栅格执行器
-                center | fast | slow | left | right
-            """
-            surge_raster_executor = SurgeRasterExecutor(user_id, user_name, TY_CODE, ty_name_en, ty_name_ch, ISSUE_TS)
-            surge_raster_executor.execute()
-
-            # step6: 批量写入淹没范围
-
-            # step4: 批量
-            # 假设脚本成功后会生成一个以 task_id 命名的文件
-            # output_file_path = os.path.join(settings.OUTPUT_DIR, f"{job.task_id}.log")
-
-            # job.status = "SUCCESS"
-            # job.output_file = output_file_path
-            # return {"status": "SUCCESS", "output_file": output_file_path}
-
+        # TODO:[-] 26-10-18 不再等脚本结束后轮询 log.flag_surge 再统一后处理，
+        # 改为在模型运行期间监听输出目录，每个集合成员的产品写入完成后立即派发对应的后处理子任务
+        # 台风详情需要在子任务之前写入(集合路径子任务需要 ty_id)
+        ty_grouppath_executor = TyphoonGroupPathExecutor(user_id, TY_CODE, ty_name_en, ty_name_ch, ISSUE_TS)
+        ty_id: int = ty_grouppath_executor.create_ty_detail()
+        run_start_ts: float = time.time()
+        """模型开始运行的时间戳(输出目录被多次运行复用，早于该时间的文件为上一次运行遗留)"""
+        post_process_ctx: dict = {
+            'user_id': user_id,
+            'user_name': user_name,
+            'ty_id': ty_id,
+            'ty_code': TY_CODE,
+            'ty_name_en': ty_name_en,
+            'ty_name_ch': ty_name_ch,
+            'issue_ts': ISSUE_TS,
+            'forecast_ts': FORECAST_TS,
+            'result_path': str(result_path),
+            'run_start_ts': run_start_ts,
+        }
+
+        # 在 output 目录执行脚本(不阻塞，运行期间监听输出目录)
+        with open(os.path.join(base_setting.OUTPUT_DIR, 'run_surge.log'), 'w') as log_file:
+            process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, text=True,
+                                       cwd=base_setting.OUTPUT_DIR)
+
+        was_successful: bool = watch_and_dispatch_post_process(post_process_ctx, process, run_start_ts)
+        """模型是否计算完成"""
+        if not was_successful:
+            if process.returncode not in (None, 0):
+                raise subprocess.CalledProcessError(process.returncode, command)
+            # TODO:[-] 26-10-18 脚本正常退出(或超时被终止)但未生成 log.flag_surge 时同样视为失败，不再静默返回
+            reason: str = '脚本已正常退出但未生成 log.flag_surge' if process.returncode == 0 else '模式运行超时'
+            raise RuntimeError(f"台风:{TY_CODE} 模式未正常计算结束({reason})，结果目录:{result_path}")
+
+        # step6: 批量写入淹没范围
+
+        # step4: 批量
+        # 假设脚本成功后会生成一个以 task_id 命名的文件
+        # output_file_path = os.path.join(settings.OUTPUT_DIR, f"{job.task_id}.log")
+
+        # job.status = "SUCCESS"
+        # job.output_file = output_file_path
+        # return {"status": "SUCCESS", "output_file": output_file_path}
 
     except Exception as e:
         # job.status = "FAILURE"
@@ -126,73 +151,235 @@ def execute_shell_job(params_dict: dict):
         pass
 
 
-async def async_check_model_completed(interval_seconds: int, timeout_mins: float):
+def _run_member_stage(stage: str, path_stamp: str, func) -> dict:
+    """
+        执行单个 (阶段, 集合成员) 子任务，异常时不抛出而是返回失败状态，保证 chord 回调一定会执行
+    @param stage: station_surge | group_path | surge_raster
+    @param path_stamp: center | fast | slow | left | right
+    @param func: 无参的执行函数(执行器的创建也应放在其中，以便捕获路径不存在等异常)
+    @return: {'stage','member','status','elapsed','error'}
+    """
+    start_time = time.monotonic()
+    result: dict = {'stage': stage, 'member': path_stamp, 'status': 'SUCCESS', 'error': None}
+    try:
+        func()
+    except Exception as ex:
+        print(f"[!] 子任务 {stage}:{path_stamp} 执行失败: {str(ex)}")
+        result['status'] = 'FAILURE'
+        result['error'] = str(ex)
+    result['elapsed'] = round(time.monotonic() - start_time, 3)
+    return result
+
+
+# 子任务需要保存结果供 chord 回调汇总(全局配置为 CELERY_IGNORE_RESULT=True)
+@celery_app.task(name="ty_group.station_surge", ignore_result=False)
+def station_surge_member_job(ctx: dict, path_stamp: str) -> dict:
+    """
+        + 26-10-18 站点增水子任务(单个集合成员)
+    """
+    return _run_member_stage('station_surge', path_stamp,
+                             lambda: StationSurgeExecutor(read_path=ctx['result_path'], ty_code=ctx['ty_code'],
+                                                          issue_ts=ctx['issue_ts'],
+                                                          forecast_start_ts=ctx['forecast_ts']).execute(path_stamp))
+
+
+@celery_app.task(name="ty_group.group_path", ignore_result=False)
+def group_path_member_job(ctx: dict, path_stamp: str) -> dict:
+    """
+        + 26-10-18 台风集合路径子任务(单个集合成员)
+    """
+    # 执行器的创建放在执行函数中，创建失败时同样返回失败状态(不会导致 chord 回调无法执行)
+    return _run_member_stage('group_path', path_stamp,
+                             lambda: TyphoonGroupPathExecutor(ctx['user_id'], ctx['ty_code'], ctx['ty_name_en'],
+                                                              ctx['ty_name_ch'], ctx['issue_ts']).execute_member(
+                                 ctx['ty_id'], path_stamp))
+
+
+@celery_app.task(name="ty_group.surge_raster", ignore_result=False)
+def surge_raster_member_job(ctx: dict, path_stamp: str) -> dict:
+    """
+        + 26-10-18 增水场子任务(单个集合成员): nc -> geotiff -> db
+    """
+    return _run_member_stage('surge_raster', path_stamp,
+                             lambda: SurgeRasterExecutor(ctx['user_id'], ctx['user_name'], ctx['ty_code'],
+                                                         ctx['ty_name_en'], ctx['ty_name_ch'],
+                                                         ctx['issue_ts']).execute(issue_ts=ctx['issue_ts'],
+                                                                                  path_stamp=path_stamp))
+
+
+@celery_app.task(name="ty_group.surge_ensemble")
+def surge_ensemble_job(ctx: dict) -> dict:
+    """
+        + 26-10-18 集合统计增水场(包络最大值、平均、标准差、超阈值概率)，需在所有成员的增水场生成后执行
+    """
+    return _run_member_stage('surge_ensemble', 'ensemble',
+                             lambda: SurgeEnsembleExecutor(ctx['user_id'], ctx['user_name'], ctx['ty_code'],
+                                                           ctx['ty_name_en'], ctx['ty_name_ch'],
+                                                           ctx['issue_ts']).execute(issue_ts=ctx['issue_ts']))
+
+
+@celery_app.task(name="ty_group.complete")
+def post_process_complete_job(results: list, ctx: dict) -> dict:
+    """
+        + 26-10-18 所有子任务完成后的回调(本次模型运行的产品已全部入库)
+    @param results: 各子任务的返回值
+    @param ctx:
+    @return:
     """
-         一个异步的、周期性执行的任务。
-         应加入退出条件，根据时间加入退出条件
-    :param interval_seconds:
-    :param timeout_mins:
-    :return:
+    failed: list = [temp for temp in results if temp.get('status') != 'SUCCESS']
+    slowest: dict = max(results, key=lambda temp: temp.get('elapsed', 0), default={})
+    print(f"🎉 台风:{ctx['ty_code']} 发布时间:{ctx['issue_ts']} 后处理全部完成，"
+          f"子任务:{len(results)} 失败:{len(failed)} 最慢:{slowest.get('stage')}:{slowest.get('member')}"
+          f"({slowest.get('elapsed')}s)")
+    for temp in failed:
+        print(f"[!] 失败子任务 {temp.get('stage')}:{temp.get('member')} -> {temp.get('error')}")
+    # 各成员增水场均处理成功后再进行集合统计
+    if not any(temp.get('stage') == STAGE_SURGE_RASTER for temp in failed):
+        surge_ensemble_job.delay(ctx)
+    # + 26-10-18 淹没产品(模式计算结束后淹没结果已输出)
+    if FLOOD_PRODUCT_OPTIONS.get('enabled', True):
+        dispatch_flood_pipeline(ctx)
+    return {'ty_code': ctx['ty_code'], 'issue_ts': ctx['issue_ts'], 'count': len(results), 'failed': failed}
+
+
+POST_PROCESS_STAGE_JOBS = {STAGE_STATION_SURGE: station_surge_member_job,
+                           STAGE_GROUP_PATH: group_path_member_job,
+                           STAGE_SURGE_RASTER: surge_raster_member_job}
+"""后处理阶段(每个阶段按集合成员拆分为子任务)"""
+
+POST_PROCESS_JOIN_INTERVAL: int = 5
+"""流式派发时，汇总任务检查子任务状态的间隔(秒)"""
+
+POST_PROCESS_JOIN_MAX_RETRIES: int = math.ceil(
+    MODEL_OUTPUT_WATCH_OPTIONS.get('timeout_mins') * 60 / POST_PROCESS_JOIN_INTERVAL)
+"""汇总任务最多检查的次数(总等待时间与模式运行的超时时间一致)"""
+
+
+@celery_app.task(name="ty_group.join", bind=True, max_retries=POST_PROCESS_JOIN_MAX_RETRIES)
+def post_process_join_job(self, result_ids: list, ctx: dict) -> dict:
     """
-    user_name: str = 'admin'
-    ty_path_path_str: str = StoreConfig.TY_SOURCE_PATH
-    ty_path_path: pathlib.Path = pathlib.Path(ty_path_path_str)
-    ending_stamp_file_path: pathlib.Path = ty_path_path / 'surgeflood_wkdir' / 'user_out' / user_name / 'log.flag_surge'
+        + 26-10-18 流式派发的子任务无法组成 chord，由本任务检查子任务是否全部完成(未完成时 retry，与 chord_unlock 的方式一致)，
+        全部完成后汇总
+        超过 timeout_mins 仍有子任务未完成(如 worker 异常退出，结果永远不会 ready)时本次后处理失败
+    @param result_ids: 子任务 id
+    @param ctx:
+    @return:
+    """
+    async_results = [celery_app.AsyncResult(temp_id) for temp_id in result_ids]
+    pending: List[str] = [temp.id for temp in async_results if not temp.ready()]
+    if pending:
+        if self.request.retries >= self.max_retries:
+            print(f"[!] 台风:{ctx['ty_code']} 发布时间:{ctx['issue_ts']} 有 {len(pending)} 个子任务在 "
+                  f"{MODEL_OUTPUT_WATCH_OPTIONS.get('timeout_mins')} 分钟内未完成，后处理失败: {pending}")
+            raise TimeoutError(f"后处理子任务未完成:{pending}")
+        raise self.retry(countdown=POST_PROCESS_JOIN_INTERVAL)
+    results: list = [temp.result if isinstance(temp.result, dict) else {'status': 'FAILURE', 'error': str(temp.result)}
+                     for temp in async_results]
+    return post_process_complete_job(results, ctx)
+
+
+def watch_and_dispatch_post_process(ctx: dict, process: subprocess.Popen, since_ts: float) -> bool:
+    """
+        + 26-10-18 监听模型输出目录，每个 (阶段, 集合成员) 的文件写入完成后立即派发对应的子任务，
+        模型计算结束(log.flag_surge)后补发剩余的子任务，并派发汇总任务
+    @param ctx: 子任务所需的参数
+    @param process: 模型进程
+    @param since_ts: 模型开始运行的时间戳(忽略上一次运行遗留的文件)
+    @return: 模型是否计算完成
+    """
+    result_ids: List[str] = []
+
+    def on_member_ready(stage: str, member: str, file_path: pathlib.Path):
+        result_ids.append(POST_PROCESS_STAGE_JOBS[stage].apply_async((ctx, member)).id)
+
+    watcher = ModelOutputWatcher(ctx['result_path'], on_member_ready, since_ts=since_ts,
+                                 stable_seconds=MODEL_OUTPUT_WATCH_OPTIONS.get('stable_seconds'),
+                                 poll_interval=MODEL_OUTPUT_WATCH_OPTIONS.get('poll_interval'),
+                                 use_inotify=MODEL_OUTPUT_WATCH_OPTIONS.get('use_inotify'))
+    # 脚本可能只负责提交模型后即退出，因此进程正常退出时继续等待 log.flag_surge
+    was_successful: bool = watcher.run(MODEL_OUTPUT_WATCH_OPTIONS.get('timeout_mins') * 60,
+                                       is_alive=lambda: process.poll() in (None, 0))
+    if was_successful:
+        watcher.dispatch_pending()
+    elif process.poll() is None:
+        process.terminate()
+    if result_ids:
+        post_process_join_job.apply_async((result_ids, ctx), countdown=POST_PROCESS_JOIN_INTERVAL)
+    return was_successful
+
 
-    # --- 1. 初始化和记录开始时间 ---
-    start_time = time.monotonic()  # 使用单调时钟记录开始时间，最适合测量时长
-    timeout_seconds = timeout_mins * 60
-    while True:
-        # --- 2. 在每次循环开始时，检查是否超时 ---
-        elapsed_time = time.monotonic() - start_time
-        if elapsed_time > timeout_seconds:
-            print(f"⌛️ [超时退出] 任务已运行超过 {timeout_mins} 分钟，自动结束。")
-            return False
-        current_str: str = arrow.now().format('YYYY-MM-DD HH:mm:ss')
-        print(f"⏰ [Asyncio Task] 正在执行... 时间: {current_str}")
-        if ending_stamp_file_path.exists():
-            return True
-        # 在异步任务中，必须使用 asyncio.sleep() 而不是 time.sleep()
-        # asyncio.sleep() 不会阻塞整个事件循环
-        current_str: str = arrow.now().format('YYYY-MM-DD HH:mm:ss')
-        print(f"⏰ [等待中] 正在等待模型计算完成... 时间: {current_str}")
-        await asyncio.sleep(interval_seconds)
+def _get_flood_executor(ctx: dict) -> FloodProductExecutor:
+    return FloodProductExecutor(ctx['user_id'], ctx['user_name'], ctx['ty_code'], ctx['issue_ts'])
 
 
-async def main_workflow():
+@celery_app.task(name="flood.rasterize")
+def flood_rasterize_job(ctx: dict) -> str:
     """
-    模拟您的异步主工作流程。
+        + 26-10-18 淹没产品 stage1: 逐网格淹没结果 -> 淹没深度 geotiff
+        不存在淹没结果时抛出异常，终止后续阶段
+    @return: 淹没深度 geotiff 全路径
     """
-    print("🚀 [Asyncio] 主工作流程开始...")
+    executor: FloodProductExecutor = _get_flood_executor(ctx)
+    source_file = executor.find_source(ctx['result_path'], ctx.get('run_start_ts'))
+    if source_file is None:
+        raise FileNotFoundError(f"不存在淹没结果:{ctx['result_path']}")
+    return executor.rasterize(str(source_file))
 
-    for step in range(1, 10000):
-        print(f"   - 主流程异步步骤 {step}/forever 正在执行...")
-        # 模拟异步I/O操作，例如一次API调用
-        await asyncio.sleep(1)
 
-    print("✅ [Asyncio] 主工作流程结束。")
+@celery_app.task(name="flood.land_mask")
+def flood_land_mask_job(depth_path: str, ctx: dict) -> str:
+    """
+        + 26-10-18 淹没产品 stage2: 剔除掩码内的像元
+    @param depth_path: 上一阶段的输出
+    @return: 剔除后的淹没深度 geotiff 全路径
+    """
+    return _get_flood_executor(ctx).land_mask(depth_path)
 
 
-async def post_process():
+@celery_app.task(name="flood.depth_bins", ignore_result=False)
+def flood_depth_bins_job(depth_path: str, ctx: dict) -> dict:
     """
-        启动异步重复任务并执行后续的任务
-        model computed => product to store
-    :return:
+        + 26-10-18 淹没产品: 淹没深度分级范围入库
     """
-    print("准备启动后台任务，等待模型计算完成...")
+    return _run_member_stage('flood_depth_bins', 'bins', lambda: _get_flood_executor(ctx).depth_bins(depth_path))
 
-    TASK_INTERVAL = 3
-    TIMEOUT_MINS = 2  # 设置为30分钟
 
-    # 执行等待任务，并获取它的结果 (True 或 False)
-    was_successful = await async_check_model_completed(TASK_INTERVAL, TIMEOUT_MINS)
+@celery_app.task(name="flood.level", ignore_result=False)
+def flood_level_job(depth_path: str, ctx: dict, level_name: str) -> dict:
+    """
+        + 26-10-18 淹没产品: 单个淹没等级 提取 -> 平滑 -> 入库
+    @param depth_path: 剔除掩码后的淹没深度 geotiff
+    @param ctx:
+    @param level_name: FloodLevelEnum 的 name
+    """
+    return _run_member_stage('flood_level', level_name,
+                             lambda: _get_flood_executor(ctx).flood_level(depth_path, FloodLevelEnum[level_name]))
 
-    # 根据等待任务的结果，决定是否执行主流程
-    if was_successful:
-        print("✅ 模型计算已完成，现在开始执行主工作流程。")
-        await main_workflow()
-    else:
-        print("❌ 模型计算超时，主工作流程将不会执行。")
 
-    print("🎉 所有任务均已完成。")
-    return was_successful
+@celery_app.task(name="flood.complete")
+def flood_complete_job(results: list, ctx: dict) -> dict:
+    """
+        + 26-10-18 淹没产品全部完成后的回调
+    """
+    failed: list = [temp for temp in results if temp.get('status') != 'SUCCESS']
+    print(f"🎉 台风:{ctx['ty_code']} 发布时间:{ctx['issue_ts']} 淹没产品全部完成，子任务:{len(results)} 失败:{len(failed)}")
+    for temp in failed:
+        print(f"[!] 失败子任务 {temp.get('stage')}:{temp.get('member')} -> {temp.get('error')}")
+    return {'ty_code': ctx['ty_code'], 'issue_ts': ctx['issue_ts'], 'count': len(results), 'failed': failed}
+
+
+def dispatch_flood_pipeline(ctx: dict):
+    """
+        + 26-10-18 派发淹没产品流水线:
+        rasterize -> land_mask -> [depth_bins, 各淹没等级(并行)] -> flood_complete_job
+        模式本次运行未输出淹没结果时不派发(不使用上一次运行遗留的结果)
+    @param ctx: 需包含 user_id | user_name | ty_code | issue_ts | result_path，run_start_ts 为空时不按修改时间过滤
+    @return: AsyncResult，未派发时为 None
+    """
+    if _get_flood_executor(ctx).find_source(ctx['result_path'], ctx.get('run_start_ts')) is None:
+        print(f"[!] 台风:{ctx['ty_code']} 发布时间:{ctx['issue_ts']} 不存在淹没结果:{ctx['result_path']}，不生成淹没产品")
+        return None
+    level_names: List[str] = list(FLOOD_PRODUCT_OPTIONS.get('level_thresholds').keys())
+    header = group([flood_depth_bins_job.s(ctx)] + [flood_level_job.s(ctx, temp_name) for temp_name in level_names])
+    return chain(flood_rasterize_job.s(ctx), flood_land_mask_job.s(ctx),
+                 chord(header, flood_complete_job.s(ctx))).apply_async()
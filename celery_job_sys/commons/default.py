@@ -1,4 +1,4 @@
-from common.enums import NullEnum
+from commons.enums import NullEnum
 
 DEFAULT_CODE = 'DEFAULT'
 
@@ -26,4 +26,7 @@ DEFAULT_ENUM = NullEnum.NULL.value
 # 默认概率
 DEFAULT_PRO = 0.5
 
+TY_GROUP_MEMBERS = ['center', 'fast', 'slow', 'left', 'right']
+"""台风集合路径成员(文件名中的路径标记)，顺序即 gp_id"""
+
 # 默认的 arrow 时间 1970-1-1
@@ -16,6 +16,8 @@ DATABASES = {
         'POST': 3306,  # 端口
         'OPTIONS': {
             "init_command": "SET foreign_key_checks = 0;",
+            # TODO:[-] 26-10-18 站点增水批量入库时使用 LOAD DATA LOCAL INFILE 需要客户端开启 local_infile
+            "local_infile": True,
         },
     },
 
@@ -41,6 +43,86 @@ DB_TABLE_SPLIT_OPTIONS = {
     }
 }
 
+STATION_SURGE_INGEST_OPTIONS = {
+    # 是否使用 LOAD DATA LOCAL INFILE 写入(需要 mysql 服务端开启 local_infile),失败时回退为 executemany
+    'use_load_data': False,
+    # executemany 每批写入的行数
+    'batch_size': 10000,
+}
+
+SURGE_ENSEMBLE_OPTIONS = {
+    # 参与统计的 nc 变量
+    'var_name': 'zmax',
+    # 分块读取的行数(每次只读取一个成员的一个分块)
+    'block_rows': 256,
+    # 超阈值概率产品 {文件标记: 阈值(m)}，文件标记需在 util.utils.switch_dict 中有对应的 TyphoonGroupEnum
+    'exceed_thresholds': {'exceed050': 0.5, 'exceed100': 1.0, 'exceed150': 1.5, 'exceed200': 2.0},
+}
+
+MODEL_OUTPUT_WATCH_OPTIONS = {
+    # 优先使用 inotify 监听输出目录(仅 linux)，否则轮询
+    'use_inotify': True,
+    # 轮询模式下文件大小保持不变多久(秒)视为写入完成
+    'stable_seconds': 5,
+    # 轮询间隔(秒)
+    'poll_interval': 2,
+    # 模式运行的超时时间(分钟)
+    'timeout_mins': 180,
+}
+
+SURGE_RASTER_CONVERT_OPTIONS = {
+    # nc -> geotiff 并行转换的进程数(每个集合成员一个任务)，<=1 时串行
+    'max_workers': 5,
+    # 进程启动方式(spawn 避免 fork 继承 GDAL/netcdf 的全局状态)
+    'mp_context': 'spawn',
+    # 每个进程内 GDAL 使用的线程数，总线程数约为 max_workers * gdal_num_threads
+    'gdal_num_threads': '1',
+    # 每个进程 GDAL 块缓存大小(MB)
+    'gdal_cachemax': 256,
+    # 需要转换的 nc 变量(除 zmax 外的变量输出文件名中会带上变量名)
+    'var_names': ['zmax'],
+    # 输出 geotiff 的布局 cog|striped
+    'layout': 'cog',
+    # COG 参数(layout 为 cog 时生效)
+    'cog': {
+        # 内部分块大小 256|512
+        'blocksize': 512,
+        # 浮点预测器(PREDICTOR=3)，配合 deflate 可明显减小浮点栅格体积
+        'predictor': 3,
+        # 内部金字塔的抽稀倍数(小于 1 个像素的层级会被跳过)
+        'overview_levels': [2, 4, 8, 16, 32],
+        'overview_resampling': 'average',
+        # 无效值(被阈值过滤及陆地区域)
+        'nodata': -9999.0,
+    },
+}
+
+FLOOD_PRODUCT_OPTIONS = {
+    # 后处理完成后是否生成淹没产品(模式未输出淹没结果时也不生成)
+    'enabled': True,
+    # 模式输出的逐网格淹没结果(在 result_path 中查找，存在多个时取最新的一个)，也可以是淹没深度 geotiff(*.tif)
+    'source_patterns': ['surgeflood.max.*.json', 'surgeflood.max.*.tif'],
+    # 逐网格 geojson 中淹没深度的属性名
+    'value_name': '最大淹没深度(cm)',
+    # 网格大小(度)
+    'grid_unit': 0.00108,
+    # 掩码 shapefile(陆地及海洋外边界)，为空时不剔除
+    'mask_file': r'/data_local/mask/宁波_陆地及海洋外边界_不含岛屿_面.shp',
+    # 掩码分块大小(度)及缓存目录(为空时缓存在掩码文件所在目录)
+    'mask_grid_size': 0.05,
+    'mask_cache_dir': None,
+    # 淹没等级 -> 阈值(cm)，每个等级一个子任务
+    'level_thresholds': {'GTE100': 100, 'GTE150': 150, 'GTE200': 200},
+    # 淹没深度分级(cm)
+    'depth_breaks': [0, 50, 100, 150, 200],
+    # 入库前 Chaikin 平滑的迭代次数，0 为不平滑
+    'smooth_refinements': 3,
+    # 按窗口读写 geotiff 时每个窗口的行数
+    'block_rows': 1024,
+    # 每批写入的多边形数
+    'batch_size': 1000,
+}
+
 LOGGING_OPTIONS = {
     # 将日志改为当前目录下
     # 'LOG_DIR': r'/opt/project/logs',
@@ -1,4 +1,7 @@
+import os
+import threading
 from contextlib import contextmanager
+from typing import Dict, Generator, Optional
 
 from sqlalchemy import create_engine, Engine
 from sqlalchemy.ext.automap import automap_base
@@ -16,10 +19,141 @@ from config.db_config import DBConfig
 from config.settings import DATABASES
 
 
+def get_connect_str(db_mapping: str = 'default', engine_str: str = None, host: str = None, port: str = None,
+                    db_name: str = None, user: str = None, pwd: str = None) -> str:
+    """
+        根据 DATABASES 中的 db_mapping 生成连接字符串(可通过参数覆盖对应配置项)
+    @param db_mapping:
+    @return:
+    """
+    db_options = DATABASES.get(db_mapping)
+    engine_str = engine_str if engine_str else db_options.get('ENGINE')
+    host = host if host else db_options.get('HOST')
+    port = port if port else db_options.get('POST')
+    db_name = db_name if db_name else db_options.get('NAME')
+    user = user if user else db_options.get('USER')
+    password = pwd if pwd else db_options.get('PASSWORD')
+    # TODO:[-] 25-04-23 注意密码中包含@特殊字符需要重新编码，否则会出现特殊字符导致连接字符串出错的bug
+    encoded_passwd = quote_plus(password)
+    # TODO:[-] 25-05-07 ERROR: 'charmap' codec can't encode characters in position 0-1: character maps to <undefined>
+    # 在连接字符串结尾加了?charset=utf8mb4 解决中文编码的问题
+    return f"mysql+{engine_str}://{user}:{encoded_passwd}@{host}:{port}/{db_name}?charset=utf8mb4"
+
+
+class EngineRegistry:
+    """
+        + 26-10-18 进程级 engine 注册表
+        每个进程内同一个 key(默认为 DATABASES 中的 db_mapping) 只创建一次 engine 及其连接池，
+        避免每次 session_yield_scope() 都重新 create_engine 导致每个请求/每个入库步骤都新建一个连接池
+        注意: fork 后(celery prefork worker) 子进程不能复用父进程的连接，此处通过记录 pid 在子进程中重新创建
+    """
+
+    default_config: DBConfig = DBConfig()
+    """默认配置项"""
+
+    _engines: Dict[str, Engine] = {}
+    _session_factories: Dict[str, sessionmaker] = {}
+    _pid: int = os.getpid()
+    _lock = threading.Lock()
+
+    @classmethod
+    def _check_pid(cls):
+        """
+            若当前进程为 fork 后的子进程，丢弃从父进程继承的 engine(不关闭父进程持有的连接)
+        """
+        pid = os.getpid()
+        if pid != cls._pid:
+            for engine in cls._engines.values():
+                engine.dispose(close=False)
+            cls._engines = {}
+            cls._session_factories = {}
+            cls._pid = pid
+
+    @classmethod
+    def get_engine(cls, db_mapping: str = 'default', connect_str: str = None) -> Engine:
+        """
+            获取 db_mapping 对应的 engine，不存在则创建
+        @param db_mapping: DATABASES 中的配置 key
+        @param connect_str: 自定义连接字符串(此时以连接字符串作为 key)
+        @return:
+        """
+        key: str = connect_str if connect_str else db_mapping
+        with cls._lock:
+            cls._check_pid()
+            engine = cls._engines.get(key)
+            if engine is None:
+                config = cls.default_config
+                db_options: dict = DATABASES.get(db_mapping) or {}
+                connect_args: dict = {}
+                # LOAD DATA LOCAL INFILE 需要在客户端连接时开启 local_infile
+                if db_options.get('OPTIONS', {}).get('local_infile'):
+                    connect_args['local_infile'] = True
+                engine = create_engine(connect_str if connect_str else get_connect_str(db_mapping),
+                                       pool_pre_ping=True, future=True, echo=False, pool_size=config.pool_size,
+                                       max_overflow=config.max_overflow,
+                                       pool_recycle=config.pool_recycle, connect_args=connect_args)
+                cls._engines[key] = engine
+            return engine
+
+    @classmethod
+    def get_session_factory(cls, db_mapping: str = 'default', connect_str: str = None) -> sessionmaker:
+        """
+            获取绑定到进程级 engine 的 sessionmaker
+        @param db_mapping:
+        @param connect_str:
+        @return:
+        """
+        key: str = connect_str if connect_str else db_mapping
+        engine = cls.get_engine(db_mapping, connect_str)
+        with cls._lock:
+            factory = cls._session_factories.get(key)
+            if factory is None:
+                factory = sessionmaker(bind=engine)
+                cls._session_factories[key] = factory
+            return factory
+
+    @classmethod
+    def pool_status(cls) -> Dict[str, dict]:
+        """
+            获取当前进程中所有连接池的统计信息
+            eg:
+                {'default': {'size': 10, 'checked_in': 2, 'checked_out': 1, 'overflow': -7, 'status': '...'}}
+        @return:
+        """
+        status: Dict[str, dict] = {}
+        with cls._lock:
+            cls._check_pid()
+            for key, engine in cls._engines.items():
+                pool = engine.pool
+                temp_status: dict = {'status': pool.status()}
+                # QueuePool 才有以下统计项
+                for name, attr in (('size', 'size'), ('checked_in', 'checkedin'), ('checked_out', 'checkedout'),
+                                   ('overflow', 'overflow')):
+                    if hasattr(pool, attr):
+                        temp_status[name] = getattr(pool, attr)()
+                status[key] = temp_status
+        return status
+
+    @classmethod
+    def dispose_all(cls, close: bool = True):
+        """
+            释放当前进程中所有 engine 的连接池
+        @param close: False 时只丢弃连接不关闭(fork 后的子进程中使用)
+        @return:
+        """
+        with cls._lock:
+            for engine in cls._engines.values():
+                engine.dispose(close=close)
+            cls._engines = {}
+            cls._session_factories = {}
+            cls._pid = os.getpid()
+
+
 class DbFactory:
     """
         数据库工厂
         24-08-28 目前使用的 数据库工厂类
+        26-10-18 engine 改为从 EngineRegistry 获取，不再每次实例化都创建新的连接池
     """
 
     default_config: DBConfig = DBConfig()
@@ -39,28 +173,14 @@ class DbFactory:
         :param user:
         :param pwd:
         """
-        db_options = DATABASES.get(db_mapping)
-        config = self.default_config
-        '''当前加载的默认配置'''
-        self.engine_str = engine_str if engine_str else db_options.get('ENGINE')
-        self.host = host if host else db_options.get('HOST')
-        self.port = port if port else db_options.get('POST')
-        self.db_name = db_name if db_name else db_options.get('NAME')
-        self.user = user if user else db_options.get('USER')
-        self.password = pwd if pwd else db_options.get('PASSWORD')
-        # TODO:[-] 25-04-23 注意密码中包含@特殊字符需要重新编码，否则会出现特殊字符导致连接字符串出错的bug
-        encoded_passwd = quote_plus(self.password)
-        # TODO:[-] 25-05-07 ERROR: 'charmap' codec can't encode characters in position 0-1: character maps to <undefined>
-        # 在连接字符串结尾加了?charset=utf8mb4 解决中文编码的问题
-        connect_str: str = f"mysql+{self.engine_str}://{self.user}:{encoded_passwd}@{self.host}:{self.port}/{self.db_name}?charset=utf8mb4"
-        self.engine = create_engine(connect_str
-                                    ,
-                                    pool_pre_ping=True, future=True, echo=False, pool_size=config.pool_size,
-                                    max_overflow=config.max_overflow,
-                                    pool_recycle=config.pool_recycle, )
+        is_custom: bool = any([engine_str, host, port, db_name, user, pwd])
+        """是否覆盖了 DATABASES 中的配置项"""
+        connect_str: Optional[str] = get_connect_str(db_mapping, engine_str, host, port, db_name, user,
+                                                     pwd) if is_custom else None
+        self.engine = EngineRegistry.get_engine(db_mapping, connect_str)
         # TODO:[-] 23-03-03 通过 scoped_session 来提供现成安全的全局session
         # 参考: https://juejin.cn/post/6844904164141580302
-        self._session_def = scoped_session(sessionmaker(bind=self.engine))
+        self._session_def = scoped_session(EngineRegistry.get_session_factory(db_mapping, connect_str))
         """cls中的默认 session """
 
     @property
@@ -75,13 +195,13 @@ class DbFactory:
 
 
 @contextmanager
-def session_yield_scope() -> scoped_session:
+def session_yield_scope(db_mapping: str = 'default') -> Generator[Session, None, None]:
     """
         [-] 24-08-26 基于事物的Session会话管理
+        26-10-18 session 由进程级 engine 的 sessionmaker 创建，退出时归还连接而不是销毁连接池
     """
 
-    # session = DBFactory().session
-    session = DbFactory().Session
+    session: Session = EngineRegistry.get_session_factory(db_mapping)()
     """提供一个事务范围的会话"""
     try:
         yield session
@@ -101,9 +221,8 @@ def check_exist_tab(tab_name: str) -> bool:
     """
     is_exist = False
     auto_base = automap_base()
-    db_factory = DbFactory()
     # session = db_factory.Session
-    engine = db_factory.engine
+    engine = EngineRegistry.get_engine()
     # engine = db_factory.get_engine()
     try:
         auto_base.prepare(engine, reflect=True)
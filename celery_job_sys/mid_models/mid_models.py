@@ -1,9 +1,9 @@
 import pathlib
 from abc import abstractmethod
-from typing import List
+from typing import List, Union
 from datetime import datetime
 import arrow
-from commons.enums import ElementTypeEnum, RasterFileType, TyphoonGroupEnum
+from commons.enums import ElementTypeEnum, RasterFileType, TyphoonGroupEnum, RasterLayoutEnum, NullEnum
 
 
 class TyDetailMidModel:
@@ -148,10 +148,13 @@ class ForecastSurgeRasterFile(IForecastProductFile):
     """
 
     def __init__(self, raster_type: RasterFileType, issue_ts: int,
-                 file_name: str, relative_path: str, local_root_path: str, ty_group_type: TyphoonGroupEnum):
+                 file_name: str, relative_path: str, local_root_path: str, ty_group_type: TyphoonGroupEnum,
+                 raster_layout: Union[RasterLayoutEnum, NullEnum] = NullEnum.NULL):
         super().__init__(file_name, issue_ts, relative_path, local_root_path, element_type=ElementTypeEnum.SURGE_MAX)
         self.raster_file_type = raster_type
         self.ty_group_type = ty_group_type
+        self.raster_layout = raster_layout
+        """+ 26-10-18 geotiff 内部布局(nc 文件为 NULL)"""
 
     @property
     def local_full_path(self) -> str:
@@ -6,9 +6,9 @@ from geoalchemy2 import Geometry
 from datetime import datetime
 from typing import Optional, Any, List
 
-from commons.default import DEFAULT_CODE
+from commons.default import DEFAULT_CODE, DEFAULT_ENUM, DEFAULT_NAME, DEFAULT_PATH, NONE_ID
 from commons.enums import FloodLevelEnum, TaskStatusEnum
-from models.base_model import IDel, IIdIntModel, IForecastTime, IIssueTime, IModel
+from models.base_model import BaseMeta, IDel, IIdIntModel, IForecastTime, IIssueTime, IModel
 
 
 class Base(DeclarativeBase):
@@ -43,7 +43,12 @@ class StationForecastRealdataModel(Base):
         站点预报增水——需要加入用户名——按用户名分表存储
     """
     __tablename__ = "station_forecast_realdata_user1"
-    __table_args__ = {"schema": "sys_flood_nationaldebt"}
+    # + 26-10-18 按批次查询站点集合增水(有序读取，不需要再排序)的联合索引
+    __table_args__ = (
+        Index("idx_station_forecast_ty_issue_station", "ty_code", "issue_time", "station_code", "grouppath_type",
+              "forecast_ts"),
+        {"schema": "sys_flood_nationaldebt"}
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     is_del: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
@@ -131,7 +136,8 @@ class GeoFloodLevelPolygon(Base):
     name: Mapped[Optional[str]] = mapped_column(String(100), comment="多边形名称")
     description: Mapped[Optional[str]] = mapped_column(Text, comment="描述信息")
     properties: Mapped[Optional[str]] = mapped_column(Text, comment="GeoJSON properties 的 JSON 字符串")
-    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, comment="多边形几何数据")
+    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True), nullable=False,
+                                      comment="多边形几何数据")
     flood_level: Mapped[int] = mapped_column(Integer, comment="淹没等级——枚举", default=FloodLevelEnum.GTE100.value)
     gmt_create_time: Mapped[datetime] = mapped_column(
         default=datetime.utcnow(),
@@ -146,6 +152,11 @@ class GeoFloodLevelPolygon(Base):
     issue_time: Mapped[int] = mapped_column(default=Arrow.utcnow().int_timestamp,
                                             comment="发布时间")
 
+    # + 26-10-18 按批次及淹没等级查询的联合索引
+    __table_args__ = (
+        Index("idx_floodlevel_ty_issue_level", "ty_code", "issue_time", "flood_level"),
+    )
+
     def __repr__(self) -> str:
         return f"<GeoFloodLevelPolygon(id={self.id}, ty_code='{self.ty_code}', gp_id='{self.gp_id}')>"
 
@@ -154,7 +165,10 @@ class GeoPolygon(Base):
     """存储 GeoJSON 多边形数据的模型"""
 
     __tablename__ = "geo_polygons"
-    __table_args__ = {"extend_existing": True}  # 允许扩展已定义的表
+    __table_args__ = (
+        Index("idx_geo_polygons_ty_issue", "ty_code", "issue_time"),
+        {"extend_existing": True}  # 允许扩展已定义的表
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     value: Mapped[float] = mapped_column(Float, comment="增水值")
@@ -163,7 +177,8 @@ class GeoPolygon(Base):
     name: Mapped[Optional[str]] = mapped_column(String(100), comment="多边形名称")
     description: Mapped[Optional[str]] = mapped_column(Text, comment="描述信息")
     properties: Mapped[Optional[str]] = mapped_column(Text, comment="GeoJSON properties 的 JSON 字符串")
-    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, comment="多边形几何数据")
+    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True), nullable=False,
+                                      comment="多边形几何数据")
     gmt_create_time: Mapped[datetime] = mapped_column(
         default=datetime.utcnow(),
         comment="创建时间"
@@ -191,7 +206,11 @@ class GeoPolygon(Base):
 class TyphoonForecastRealdata(Base):
     """台风预报实际数据表"""
     __tablename__ = 'typhoon_forecast_realdata'
-    __table_args__ = {'schema': 'sys_flood_nationaldebt'}
+    # + 26-10-18 按集合路径有序读取路径点的联合索引
+    __table_args__ = (
+        Index("idx_typhoon_realdata_gp_index", "gp_id", "forecast_index"),
+        {'schema': 'sys_flood_nationaldebt'}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     is_del = Column(Boolean, nullable=False, default=False)
@@ -214,7 +233,11 @@ class TyphoonForecastRealdata(Base):
 class TyphoonForecastGrouppath(Base):
     """台风预报路径组表"""
     __tablename__ = 'typhoon_forecast_grouppath'
-    __table_args__ = {'schema': 'sys_flood_nationaldebt'}
+    # + 26-10-18 按 (台风, 发布时间) 查询集合路径的联合索引
+    __table_args__ = (
+        Index("idx_typhoon_grouppath_ty_ts", "ty_code", "timestamp"),
+        {'schema': 'sys_flood_nationaldebt'}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     is_del = Column(Boolean, nullable=False, default=False)
@@ -273,8 +296,12 @@ class TaskJobs(Base):
     group_paths: Mapped[List["RelaGroupPathTask"]] = relationship("RelaGroupPathTask", back_populates="task")
 
 
-class ICoverageFileModel:
-    pass
+class ICoverageFileModel(BaseMeta):
+    # TODO:[-] 26-10-18 与服务端 models 保持一致，写入 geo_coverage_files 时需要 relative_path | file_name
+    # TODO:[-] 26-10-18 relative_path 由 50 加长为 200(淹没产品目录包含用户名及时间戳)，已存在的表见 background/13
+    __abstract__ = True
+    relative_path: Mapped[str] = mapped_column(String(200), default=DEFAULT_PATH)
+    file_name: Mapped[str] = mapped_column(String(100), default=DEFAULT_NAME)
 
 
 class GeoCoverageFiles(IDel, IIdIntModel, ICoverageFileModel, IForecastTime, IIssueTime, IModel):
@@ -288,6 +315,8 @@ class GeoCoverageFiles(IDel, IIdIntModel, ICoverageFileModel, IForecastTime, IIs
 
     group_type: Mapped[int] = mapped_column(default=DEFAULT_ENUM)
     """group path 路径枚举对应的value"""
+    raster_layout: Mapped[int] = mapped_column(default=DEFAULT_ENUM)
+    """+ 26-10-18 geotiff 内部布局 RasterLayoutEnum(普通|COG)，nc 文件为 DEFAULT_ENUM(已存在的表见 background/13)"""
     # group_id: Mapped[int] = mapped_column(default=NONE_ID)
     # """对应grouppath表的id"""
     task_id: Mapped[int] = mapped_column(default=NONE_ID)
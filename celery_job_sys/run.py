@@ -1,11 +1,19 @@
-import asyncio
+import pathlib
 
-from celery_worker import post_process
+from config.base_config import StoreConfig
+from config.settings import MODEL_OUTPUT_WATCH_OPTIONS
+from util.output_watcher import ModelOutputWatcher
 
 
 def main():
-    # 运行主协程，启动整个异步程序
-    asyncio.run(post_process())
+    # 本地调试: 监听模型输出目录，打印每个集合成员产品写入完成的事件
+    watch_dir: pathlib.Path = pathlib.Path(StoreConfig.TY_SOURCE_PATH) / 'surgeflood_wkdir' / 'user_out' / 'admin'
+    watcher = ModelOutputWatcher(str(watch_dir),
+                                 lambda stage, member, file_path: print(f'{stage}:{member} -> {file_path}'),
+                                 stable_seconds=MODEL_OUTPUT_WATCH_OPTIONS.get('stable_seconds'),
+                                 poll_interval=MODEL_OUTPUT_WATCH_OPTIONS.get('poll_interval'),
+                                 use_inotify=MODEL_OUTPUT_WATCH_OPTIONS.get('use_inotify'))
+    watcher.run(MODEL_OUTPUT_WATCH_OPTIONS.get('timeout_mins') * 60)
     pass
 
 
@@ -0,0 +1,224 @@
+"""
+    + 26-10-18 淹没产品流水线(原 background/ 04 -> 05 -> 06 -> 08 -> 07 脚本)
+    按 (ty_code, issue_ts) 执行，每个阶段为一个方法，由 celery 任务串联(见 celery_worker.py):
+        rasterize   逐网格淹没 geojson -> 淹没深度 geotiff
+        land_mask   剔除中心点位于掩码内的像元，并登记到 geo_coverage_files(FLOOD_DEPTH)
+        depth_bins  按淹没深度分级合并后写入 geo_polygons
+        flood_level 单个淹没等级: 输出 uint8 geotiff 及 geojson，平滑后写入 geo_floodlevel_polygon，并登记 geotiff(FLOOD_LEVEL)
+    各产品输出到 {STORE_REMOTE_RELATIVE_PATH}/{user_name}/flood_{issue_ts}，重复执行时覆盖文件并替换 db 中的记录
+    不存在淹没像元时(包括剔除掩码后)各阶段之间传递 ''，不生成产品，并删除该次预报已入库的多边形及已登记的文件
+"""
+import pathlib
+import shutil
+from typing import Dict, List, Optional
+
+import arrow
+import geopandas as gpd
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from commons.default import DEFAULT_ENUM, NONE_ID
+from commons.enums import FloodLevelEnum, RasterFileType, RasterLayoutEnum
+from config.base_config import StoreConfig
+from config.settings import FLOOD_PRODUCT_OPTIONS
+from db_factory import session_yield_scope
+from models.models import GeoCoverageFiles
+from util.flood_dissolve import FloodCellGrid, dissolve_by_depth_class, dissolve_by_flood_level
+from util.flood_grid import cells_to_geotiff, read_cells, read_raster_cells
+from util.flood_level_extractor import write_level_geotiff
+from util.geojson_stream import GeoJSONFeatureWriter
+from util.land_mask import TiledLandMask
+from util.polygon_loader import delete_polygons, replace_depth_class_polygons, replace_flood_level_polygons
+from util.smoothing import smooth_shapes
+
+FLOOD_DEPTH_FILE: str = 'flood_depth.tif'
+"""由逐网格 geojson 生成的淹没深度 geotiff"""
+FLOOD_DEPTH_MASKED_FILE: str = 'flood_depth_masked.tif'
+"""剔除掩码内像元后的淹没深度 geotiff"""
+FLOOD_DEPTH_BINS_FILE: str = 'flood_depth_bins.geojson'
+
+
+class FloodProductExecutor:
+    """
+        淹没产品执行器
+    """
+
+    def __init__(self, user_id: int, user_name: str, ty_code: str, issue_ts: int, options: Optional[dict] = None):
+        """
+        @param user_id:
+        @param user_name:
+        @param ty_code: 台风编号
+        @param issue_ts: 提交作业时的时间戳
+        @param options: 默认为 FLOOD_PRODUCT_OPTIONS
+        """
+        self.uid = user_id
+        self.user_name = user_name
+        self.ty_code = ty_code
+        self.issue_ts = issue_ts
+        self.options: dict = options or FLOOD_PRODUCT_OPTIONS
+        self.root_path = StoreConfig.TY_SOURCE_PATH
+        """存储的根目录"""
+
+    @property
+    def relative_path(self) -> str:
+        """
+            当前作业淹没产品的相对路径(每次预报一个目录，geo_coverage_files.relative_path 长度为 200)
+        """
+        return f'{StoreConfig.STORE_REMOTE_RELATIVE_PATH.strip("/")}/{self.user_name}/flood_{self.issue_ts}'
+
+    @property
+    def out_dir(self) -> pathlib.Path:
+        out_dir: pathlib.Path = pathlib.Path(self.root_path) / self.relative_path
+        out_dir.mkdir(parents=True, exist_ok=True)
+        return out_dir
+
+    @property
+    def level_thresholds(self) -> Dict[FloodLevelEnum, float]:
+        """淹没等级 -> 阈值(cm)"""
+        return {FloodLevelEnum[name]: threshold for name, threshold in self.options.get('level_thresholds').items()}
+
+    def find_source(self, result_path: str, since_ts: Optional[float] = None) -> Optional[pathlib.Path]:
+        """
+            在模式输出目录中查找逐网格淹没结果(存在多个时取最新的一个)
+        @param result_path: 模式输出目录(同一用户的多次运行共用)
+        @param since_ts: 只查找修改时间不早于该时间戳的文件(与 ModelOutputWatcher 一致)，为空时不过滤
+        @return:
+        """
+        files: List[pathlib.Path] = [temp for pattern in self.options.get('source_patterns') for temp in
+                                     pathlib.Path(result_path).glob(pattern)
+                                     if since_ts is None or temp.stat().st_mtime >= since_ts]
+        if not files:
+            return None
+        return max(files, key=lambda temp: temp.stat().st_mtime)
+
+    def rasterize(self, source_file: str) -> str:
+        """
+            stage1: 逐网格淹没 geojson -> 淹没深度 geotiff(模式直接输出 geotiff 时不转换)
+        @param source_file:
+        @return: 淹没深度 geotiff 全路径，不存在淹没网格时为 ''
+        """
+        if pathlib.Path(source_file).suffix.lower() in ('.tif', '.tiff'):
+            return source_file
+        xs, ys, values = read_cells(source_file, self.options.get('value_name'))
+        if len(values) == 0:
+            print(f'[!] 淹没结果中不存在淹没网格:{source_file}')
+            return ''
+        out_put_path: pathlib.Path = self.out_dir / FLOOD_DEPTH_FILE
+        height, width = cells_to_geotiff(xs, ys, values, str(out_put_path), self.options.get('grid_unit'))
+        print(f'[-] 淹没深度 geotiff({height}x{width})已生成:{out_put_path}')
+        return str(out_put_path)
+
+    def land_mask(self, depth_path: str) -> str:
+        """
+            stage2: 剔除中心点位于掩码内的像元，并登记到 geo_coverage_files
+        @param depth_path: 淹没深度 geotiff(为 '' 时不存在淹没网格)
+        @return: 剔除后的淹没深度 geotiff 全路径，不存在淹没像元时为 ''
+        """
+        if not depth_path:
+            self.unregister_coverage_file(RasterFileType.FLOOD_DEPTH, DEFAULT_ENUM)
+            return ''
+        out_put_path: pathlib.Path = self.out_dir / FLOOD_DEPTH_MASKED_FILE
+        mask_file: Optional[str] = self.options.get('mask_file')
+        if mask_file:
+            land_mask: TiledLandMask = TiledLandMask.from_file(mask_file, self.options.get('mask_grid_size'),
+                                                               self.options.get('mask_cache_dir'))
+            count: int = land_mask.mask_geotiff(depth_path, str(out_put_path), self.options.get('block_rows'))
+            print(f'[-] 剔除掩码后剩余 {count} 个淹没像元:{out_put_path}')
+            if count == 0:
+                self.unregister_coverage_file(RasterFileType.FLOOD_DEPTH, DEFAULT_ENUM)
+                return ''
+        else:
+            shutil.copyfile(depth_path, out_put_path)
+        self.register_coverage_file(out_put_path.name, RasterFileType.FLOOD_DEPTH, DEFAULT_ENUM)
+        return str(out_put_path)
+
+    def depth_bins(self, depth_path: str) -> int:
+        """
+            stage3: 按淹没深度分级合并后写入 geo_polygons(各级相邻，不进行平滑)
+        @param depth_path: 剔除掩码后的淹没深度 geotiff(为 '' 时不存在淹没像元)
+        @return: 写入的多边形数
+        """
+        grid: Optional[FloodCellGrid] = self.read_grid(depth_path)
+        if grid is None:
+            with session_yield_scope() as session:
+                delete_polygons(session, self.ty_code, self.issue_ts)
+            return 0
+        gdf: gpd.GeoDataFrame = dissolve_by_depth_class(grid, self.options.get('depth_breaks'))
+        with GeoJSONFeatureWriter(str(self.out_dir / FLOOD_DEPTH_BINS_FILE)) as writer:
+            writer.write_geodataframe(gdf)
+        return replace_depth_class_polygons(gdf, self.ty_code, self.issue_ts, self.options.get('batch_size'))
+
+    def flood_level(self, depth_path: str, level: FloodLevelEnum) -> int:
+        """
+            stage4: 单个淹没等级: 提取 -> 平滑 -> 入库，并登记 uint8 geotiff
+        @param depth_path: 剔除掩码后的淹没深度 geotiff(为 '' 时不存在淹没像元)
+        @param level:
+        @return: 写入的多边形数
+        """
+        grid: Optional[FloodCellGrid] = self.read_grid(depth_path)
+        if grid is None:
+            with session_yield_scope() as session:
+                delete_polygons(session, self.ty_code, self.issue_ts, level)
+            self.unregister_coverage_file(RasterFileType.FLOOD_LEVEL, level.value)
+            return 0
+        threshold: float = self.level_thresholds[level]
+        tif_path: pathlib.Path = self.out_dir / f'flood_gt{threshold:g}.tif'
+        write_level_geotiff(depth_path, str(tif_path), threshold, self.options.get('block_rows'))
+        gdf: gpd.GeoDataFrame = dissolve_by_flood_level(grid, {level: threshold})[level]
+        refinements: int = self.options.get('smooth_refinements', 0)
+        if refinements > 0 and len(gdf) > 0:
+            gdf = gdf.set_geometry(smooth_shapes(gdf.geometry.values, refinements), crs=gdf.crs)
+        with GeoJSONFeatureWriter(str(tif_path.with_suffix('.geojson'))) as writer:
+            writer.write_geodataframe(gdf)
+        count: int = replace_flood_level_polygons(gdf, self.ty_code, self.issue_ts, level,
+                                                  self.options.get('batch_size'))
+        self.register_coverage_file(tif_path.name, RasterFileType.FLOOD_LEVEL, level.value)
+        return count
+
+    def read_grid(self, depth_path: str) -> Optional[FloodCellGrid]:
+        """
+            读取剔除掩码后的淹没深度 geotiff
+        @param depth_path: 为 '' 时不存在淹没像元
+        @return: 不存在淹没像元时为 None
+        """
+        if not depth_path:
+            return None
+        xs, ys, values, resolution = read_raster_cells(depth_path, self.options.get('block_rows'))
+        if len(values) == 0:
+            return None
+        return FloodCellGrid(xs, ys, values, resolution)
+
+    def _delete_coverage_files(self, session: Session, coverage_type: RasterFileType, group_type: int) -> None:
+        """同一次预报已登记的同类产品标记为删除"""
+        session.execute(update(GeoCoverageFiles).where(
+            GeoCoverageFiles.ty_code == self.ty_code,
+            GeoCoverageFiles.issue_ts == self.issue_ts,
+            GeoCoverageFiles.coverage_type == coverage_type.value,
+            GeoCoverageFiles.group_type == group_type,
+            GeoCoverageFiles.is_del == 0
+        ).values(is_del=1))
+
+    def unregister_coverage_file(self, coverage_type: RasterFileType, group_type: int) -> None:
+        """
+            不存在淹没像元时不登记产品，同一次预报之前登记的同类产品标记为删除
+        @param coverage_type: FLOOD_DEPTH | FLOOD_LEVEL
+        @param group_type: 淹没等级枚举(FLOOD_DEPTH 为 DEFAULT_ENUM)
+        @return:
+        """
+        with session_yield_scope() as session:
+            self._delete_coverage_files(session, coverage_type, group_type)
+
+    def register_coverage_file(self, file_name: str, coverage_type: RasterFileType, group_type: int) -> None:
+        """
+            登记到 geo_coverage_files，同一次预报已登记的同类产品标记为删除
+        @param file_name:
+        @param coverage_type: FLOOD_DEPTH | FLOOD_LEVEL
+        @param group_type: 淹没等级枚举(FLOOD_DEPTH 为 DEFAULT_ENUM)
+        @return:
+        """
+        with session_yield_scope() as session:
+            self._delete_coverage_files(session, coverage_type, group_type)
+            session.add(GeoCoverageFiles(task_id=NONE_ID, ty_code=self.ty_code, relative_path=self.relative_path,
+                                         file_name=file_name, issue_ts=self.issue_ts,
+                                         issue_dt=arrow.get(self.issue_ts).datetime, coverage_type=coverage_type.value,
+                                         group_type=group_type, raster_layout=RasterLayoutEnum.STRIPED.value))
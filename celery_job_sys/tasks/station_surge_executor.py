@@ -1,15 +1,144 @@
+import os
 import pathlib
-from typing import List, Optional
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
 
-import arrow
+import numpy as np
 import pandas as pd
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
 
 # 假设这些是您项目中的模块，保持不变
+from commons.default import TY_GROUP_MEMBERS
 from commons.enums import TYGroupTypeEnum
+from config.settings import STATION_SURGE_INGEST_OPTIONS
 from db_factory import session_yield_scope
 from models.models import StationForecastRealdataModel
 from schemas import StationSurgeFileSchema
-from util.file_util import FileExplorer
+from util.file_util import FileExplorer, get_grouppath_type
+from util.model_output_parser import StationSurgeMatrix, read_station_surge_dat
+
+
+class StationSurgeBulkWriter:
+    """
+        站点增水批量写入器
+        将站点增水矩阵(时次, 站点)展开为按列存储的 numpy 数组，
+        并通过 executemany 分批写入或 LOAD DATA LOCAL INFILE 一次性写入
+    """
+
+    TIME_STEP_SECONDS: int = 3600
+    """每个预报时次的时间步长(1小时)"""
+
+    COLUMNS: List[str] = ['is_del', 'ty_code', 'gp_id', 'station_code', 'forecast_dt', 'forecast_ts',
+                          'forecast_index', 'surge', 'issue_time', 'gmt_create_time', 'gmt_modify_time',
+                          'grouppath_type']
+    """写入字段(顺序与 LOAD DATA 的列顺序一致)"""
+
+    def __init__(self, batch_size: Optional[int] = None, use_load_data: Optional[bool] = None):
+        """
+        @param batch_size: executemany 每批写入的行数，默认读取 STATION_SURGE_INGEST_OPTIONS
+        @param use_load_data: 是否优先使用 LOAD DATA LOCAL INFILE，默认读取 STATION_SURGE_INGEST_OPTIONS
+        """
+        self.batch_size: int = batch_size if batch_size else STATION_SURGE_INGEST_OPTIONS.get('batch_size', 10000)
+        self.use_load_data: bool = use_load_data if use_load_data is not None else STATION_SURGE_INGEST_OPTIONS.get(
+            'use_load_data', False)
+
+    @classmethod
+    def melt(cls, matrix: StationSurgeMatrix, ty_code: str, issue_ts: int, forecast_ts: int, gp_id: int,
+             grouppath_type: TYGroupTypeEnum) -> Dict[str, np.ndarray]:
+        """
+            将宽表展开为按列存储的数组(站点优先，时次其次)
+            forecast_ts = forecast_ts + index * 3600 ，forecast_dt 为对应的 utc naive datetime
+            增水为空(nan)的记录会被剔除
+        @param matrix: read_station_surge_dat 读取的站点增水矩阵
+        @param ty_code:
+        @param issue_ts: 发布时间戳
+        @param forecast_ts: 起始预报时间戳
+        @param gp_id: 集合路径 id
+        @param grouppath_type: 集合路径枚举
+        @return: {列名: np.ndarray}
+        """
+        # shape: (时次, 站点) -> 转置后按站点展开
+        count_hours, count_stations = matrix.surge.shape
+
+        surge: np.ndarray = matrix.surge.T.reshape(-1)
+        station_code: np.ndarray = np.repeat(np.asarray(matrix.station_codes, dtype=object), count_hours)
+        forecast_index: np.ndarray = np.tile(np.arange(count_hours, dtype=np.int64), count_stations)
+        forecast_ts_arr: np.ndarray = forecast_ts + forecast_index * cls.TIME_STEP_SECONDS
+
+        mask: np.ndarray = np.isfinite(surge)
+        if not mask.all():
+            surge, station_code = surge[mask], station_code[mask]
+            forecast_index, forecast_ts_arr = forecast_index[mask], forecast_ts_arr[mask]
+
+        count: int = surge.shape[0]
+        now: datetime = datetime.utcnow()
+        return {
+            'is_del': np.zeros(count, dtype=np.int8),
+            'ty_code': np.full(count, ty_code, dtype=object),
+            'gp_id': np.full(count, gp_id, dtype=np.int64),
+            'station_code': station_code,
+            'forecast_dt': forecast_ts_arr.astype('datetime64[s]'),
+            'forecast_ts': forecast_ts_arr,
+            'forecast_index': forecast_index,
+            'surge': surge,
+            'issue_time': np.full(count, issue_ts, dtype=np.int64),
+            'gmt_create_time': np.full(count, now, dtype='datetime64[us]'),
+            'gmt_modify_time': np.full(count, now, dtype='datetime64[us]'),
+            'grouppath_type': np.full(count, grouppath_type.value, dtype=np.int64),
+        }
+
+    @classmethod
+    def to_records(cls, columns: Dict[str, np.ndarray], start: int = 0, end: Optional[int] = None) -> List[dict]:
+        """
+            将 [start, end) 区间的列数组转换为 executemany 所需的参数列表
+        """
+        # tolist 会将 numpy 标量转为 python 原生类型(datetime64 -> datetime)
+        values: List[list] = [columns[name][start:end].tolist() for name in cls.COLUMNS]
+        values[0] = [bool(val) for val in values[0]]
+        return [dict(zip(cls.COLUMNS, row)) for row in zip(*values)]
+
+    def write(self, session: Session, columns: Dict[str, np.ndarray]) -> int:
+        """
+            写入当前 session 的事务中(不提交)，由调用方统一提交
+        @param session:
+        @param columns: melt 的结果
+        @return: 写入的行数
+        """
+        if columns['surge'].shape[0] == 0:
+            return 0
+        if self.use_load_data and session.get_bind().dialect.name == 'mysql':
+            try:
+                # 使用 savepoint，LOAD DATA 失败时只回滚本次操作再回退为 executemany
+                with session.begin_nested():
+                    return self._write_by_load_data(session, columns)
+            except Exception as ex:
+                print(f'[!] LOAD DATA LOCAL INFILE 写入失败，回退为 executemany:{ex}')
+        return self._write_by_executemany(session, columns)
+
+    def _write_by_executemany(self, session: Session, columns: Dict[str, np.ndarray]) -> int:
+        table = StationForecastRealdataModel.__table__
+        count: int = columns['surge'].shape[0]
+        for start in range(0, count, self.batch_size):
+            session.execute(insert(table), self.to_records(columns, start, start + self.batch_size))
+        return count
+
+    def _write_by_load_data(self, session: Session, columns: Dict[str, np.ndarray]) -> int:
+        table = StationForecastRealdataModel.__table__
+        count: int = columns['surge'].shape[0]
+        df = pd.DataFrame({name: columns[name] for name in self.COLUMNS})
+        fd, csv_path = tempfile.mkstemp(prefix='station_surge_', suffix='.csv')
+        try:
+            with os.fdopen(fd, 'w', newline='') as f:
+                df.to_csv(f, header=False, index=False, lineterminator='\n', date_format='%Y-%m-%d %H:%M:%S.%f')
+            sql: str = (f"LOAD DATA LOCAL INFILE :csv_path INTO TABLE {table.fullname} "
+                        f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+                        f"({', '.join(self.COLUMNS)})")
+            session.execute(text(sql), {'csv_path': pathlib.Path(csv_path).as_posix()})
+        finally:
+            os.remove(csv_path)
+        return count
 
 
 class StationSurgeExecutor:
@@ -30,19 +159,23 @@ class StationSurgeExecutor:
         self.ty_code = ty_code
         self.issue_ts = issue_ts
         self.forecast_start_ts = forecast_start_ts
+        self.writer = StationSurgeBulkWriter()
 
         if not self.read_path.is_dir():
             raise FileNotFoundError(f"指定的读取路径不存在或不是一个目录: {self.read_path}")
 
-    def execute(self) -> None:
+    def execute(self, path_stamp: Optional[str] = None) -> None:
         """
         执行主流程：获取文件 -> 循环处理 -> 写入数据库。
+        :param path_stamp: 只处理指定集合成员(center|fast|slow|left|right)的文件，为空时处理全部文件。
         """
         print(f"[*] 开始执行站点增水数据处理任务...")
         print(f"    - 台风编号: {self.ty_code}")
         print(f"    - 数据路径: {self.read_path}")
 
         files = self._get_source_files()
+        if path_stamp is not None:
+            files = [file_path for file_path in files if self._get_path_stamp(file_path) == path_stamp]
         if not files:
             print(f"[!] 在路径 {self.read_path} 中未找到任何文件。任务终止。")
             return
@@ -56,92 +189,70 @@ class StationSurgeExecutor:
                 ty_code=self.ty_code,
                 issue_ts=self.issue_ts,
                 forecast_ts=self.forecast_start_ts,
-                group_id=index,
+                group_id=self._get_group_id(file_path, index),
                 file_name=file_path.name
             )
 
-            # 1. 读取文件到 DataFrame
-            df = self._read_dat_to_dataframe(file_path)
-            if df is None or df.empty:
+            # 1. 读取文件到 站点增水矩阵
+            matrix = self._read_dat_to_matrix(file_path)
+            if matrix is None or matrix.is_empty:
                 print(f"[!] 读取文件 {file_path.name} 失败或文件为空，已跳过。")
                 continue
 
-            # 2. 将 DataFrame 数据写入数据库
-            self._save_dataframe_to_db(df, file_schema)
+            # 2. 将 站点增水矩阵 写入数据库
+            self._save_matrix_to_db(matrix, file_schema)
 
         print("\n[*] 所有文件处理完毕。")
 
     def _get_source_files(self) -> List[pathlib.Path]:
-        """从指定路径获取所有文件列表。"""
+        """从指定路径获取所有 .dat 文件列表(输出目录中还包含路径及增水场等文件)。"""
         try:
             explorer = FileExplorer(str(self.read_path))
-            return explorer.get_all_files()
+            return sorted(file_path for file_path in explorer.get_all_files() if file_path.suffix == '.dat')
         except Exception as e:
             print(f"[!] 获取文件列表时发生错误: {e}")
             return []
 
     @staticmethod
-    def _read_dat_to_dataframe(file_path: pathlib.Path) -> Optional[pd.DataFrame]:
+    def _get_path_stamp(file_path: pathlib.Path) -> str:
+        """从文件名中截取集合路径标记，eg: station_output_center.dat -> center"""
+        return file_path.name.split('.')[0].split('_')[-1]
+
+    @classmethod
+    def _get_group_id(cls, file_path: pathlib.Path, index: int) -> int:
+        """集合成员按 TY_GROUP_MEMBERS 的顺序作为 gp_id，保证拆分为子任务后 gp_id 不变"""
+        path_stamp: str = cls._get_path_stamp(file_path)
+        return TY_GROUP_MEMBERS.index(path_stamp) if path_stamp in TY_GROUP_MEMBERS else index
+
+    @staticmethod
+    def _read_dat_to_matrix(file_path: pathlib.Path) -> Optional[StationSurgeMatrix]:
         """
-        将单个 .dat 文件读取为 pandas DataFrame。
+        将单个 .dat 文件读取为 站点增水矩阵(fhour 列不作为站点)。
         这是一个静态方法，因为它不依赖于任何实例状态。
         """
         try:
-            # 使用 pandas 直接读取，指定分隔符为一个或多个空格，并将第一行作为表头
-            df = pd.read_csv(file_path, sep=r'\s+', header=0)
-            return df
+            return read_station_surge_dat(file_path)
         except Exception as e:
             print(f"[!] 读取文件 {file_path.name} 时出错: {e}")
             return None
 
-    @staticmethod
-    def _convert_dataframe_to_dict(df: pd.DataFrame) -> dict:
+    def _save_matrix_to_db(self, matrix: StationSurgeMatrix, file_schema: StationSurgeFileSchema) -> None:
         """
-        将 DataFrame 转换为以站点名为键，增水序列为值的字典。
-        这是一个静态方法，因为它不依赖于任何实例状态。
+            将 站点增水矩阵 中的数据批量存入数据库。
+            TODO:[-] 26-10-18 由逐行构建 ORM 对象、逐站点提交 改为 numpy 展开后批量写入，每个集合成员文件只提交一次
         """
-        station_data_dict = {}
-        for col_name in df.columns:
-            station_data_dict[col_name] = df[col_name].tolist()
-        return station_data_dict
-
-    def _save_dataframe_to_db(self, df: pd.DataFrame, file_schema: StationSurgeFileSchema) -> None:
-        """
-        将 DataFrame 中的数据批量存入数据库。
-        """
-        station_forecast_dict = self._convert_dataframe_to_dict(df)
-        forecast_dt_start = arrow.get(file_schema.forecast_ts)
-        TIME_STEP_HOURS = 1  # 每条记录的时间步长为1小时
-
-        with session_yield_scope() as session:
-            for station_code, surge_values in station_forecast_dict.items():
-                records_to_add: List[StationForecastRealdataModel] = []
-                try:
-                    for index, surge_value in enumerate(surge_values):
-                        # 计算每个预报点的时间
-                        current_forecast_dt = forecast_dt_start.shift(hours=index * TIME_STEP_HOURS)
-                        current_forecast_ts = current_forecast_dt.int_timestamp
-
-                        # 创建数据库模型实例
-                        record = StationForecastRealdataModel(
-                            ty_code=file_schema.ty_code,
-                            gp_id=file_schema.group_id,  # 使用 schema 中的 group_id
-                            station_code=station_code,
-                            timestamp=file_schema.issue_ts,  # 发布时间
-                            forecast_dt=current_forecast_dt.datetime,  # 预报时间
-                            forecast_ts=current_forecast_ts,
-                            forecast_index=index,
-                            surge=surge_value
-                        )
-                        records_to_add.append(record)
-
-                    # 批量添加一个站点的所有预报数据
-                    session.add_all(records_to_add)
-                    session.commit()
-                    print(f"    - 成功写入站点 [{station_code}] 的 {len(records_to_add)} 条数据。")
-                except Exception as ex:
-                    print(f"    - [!] 写入站点 [{station_code}] 数据时失败: {ex}")
-                    session.rollback()  # 如果失败，回滚事务，防止部分写入
+        grouppath_type: TYGroupTypeEnum = get_grouppath_type(file_schema.group_path_stamp)
+        columns: Dict[str, np.ndarray] = self.writer.melt(matrix, ty_code=file_schema.ty_code,
+                                                          issue_ts=file_schema.issue_ts,
+                                                          forecast_ts=file_schema.forecast_ts,
+                                                          gp_id=file_schema.group_id,
+                                                          grouppath_type=grouppath_type)
+        try:
+            with session_yield_scope() as session:
+                count: int = self.writer.write(session, columns)
+            print(f"    - 成功写入文件 [{file_schema.file_name}] 的 {count} 条数据。")
+        except Exception as ex:
+            print(f"    - [!] 写入文件 [{file_schema.file_name}] 数据时失败: {ex}")
 
 
 # --- 主程序入口 ---
@@ -0,0 +1,205 @@
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+import rasterio.shutil
+import xarray as xr
+from rasterio.enums import Resampling
+from rasterio.transform import Affine, from_origin
+from rasterio.windows import Window
+
+from commons.default import TY_GROUP_MEMBERS
+from commons.enums import RasterFileType, RasterLayoutEnum
+from config.settings import SURGE_ENSEMBLE_OPTIONS, SURGE_RASTER_CONVERT_OPTIONS
+from mid_models.mid_models import ForecastSurgeRasterFile
+from tasks.surge_raster_executor import SurgeRasterExecutor
+from util.utils import get_ty_group_enum
+
+STAT_ENSEMBLE_MAX: str = 'ensmax'
+STAT_ENSEMBLE_MEAN: str = 'ensmean'
+STAT_ENSEMBLE_STD: str = 'ensstd'
+
+
+class SurgeEnsembleReducer:
+    """
+        + 26-10-18 集合统计: 按行分块依次读取各成员的最大增水场，逐块累加统计量
+        同一时刻内存中只有一个成员的一个分块以及当前分块的累加量，不会同时读入全部成员的完整网格
+        输出(均为 float32 COG):
+            ensmax      各成员最大增水的包络
+            ensmean     集合平均
+            ensstd      集合标准差(总体标准差)
+            exceedXXX   超过阈值的概率(超过阈值的成员数 / 有效成员数)
+        无有效成员的格点为 nodata
+    """
+
+    def __init__(self, member_files: List[str], out_dir: str, var_name: str = 'zmax', block_rows: int = 256,
+                 thresholds: Optional[Dict[str, float]] = None, cog_options: Optional[dict] = None,
+                 compress: str = 'deflate'):
+        """
+        @param member_files: 各成员的 nc 文件全路径(网格需一致)
+        @param out_dir: 输出目录
+        @param var_name: 变量名
+        @param block_rows: 每次读取的行数
+        @param thresholds: 超阈值概率 {文件标记: 阈值(m)}
+        @param cog_options: 参考 SURGE_RASTER_CONVERT_OPTIONS['cog']
+        @param compress:
+        """
+        self.member_files = member_files
+        self.out_dir = pathlib.Path(out_dir)
+        self.var_name = var_name
+        self.block_rows = block_rows
+        self.thresholds: Dict[str, float] = thresholds or {}
+        self.cog_options: dict = cog_options or {}
+        self.compress = compress
+
+    @property
+    def stamps(self) -> List[str]:
+        """输出产品的文件标记"""
+        return [STAT_ENSEMBLE_MAX, STAT_ENSEMBLE_MEAN, STAT_ENSEMBLE_STD] + list(self.thresholds.keys())
+
+    @staticmethod
+    def _grid_definition(data_array: xr.DataArray) -> Tuple[Affine, int, int, bool]:
+        """
+            根据 lat/lon 坐标(格点中心)计算输出的仿射变换，输出北在上
+        @return: (transform, height, width, 源数据纬度是否为升序)
+        """
+        lons: np.ndarray = data_array['lon'].values
+        lats: np.ndarray = data_array['lat'].values
+        res_x: float = float(lons[1] - lons[0])
+        res_y: float = float(abs(lats[1] - lats[0]))
+        lat_ascending: bool = bool(lats[-1] > lats[0])
+        transform: Affine = from_origin(float(lons[0]) - res_x / 2, float(lats.max()) + res_y / 2, res_x, res_y)
+        return transform, lats.shape[0], lons.shape[0], lat_ascending
+
+    def _read_block(self, data_array: xr.DataArray, row_start: int, row_stop: int, height: int,
+                    lat_ascending: bool) -> np.ndarray:
+        """
+            读取输出行 [row_start, row_stop) 对应的分块(只从 nc 中读取该切片)
+        """
+        if lat_ascending:
+            block: np.ndarray = data_array.isel(lat=slice(height - row_stop, height - row_start)).values[::-1]
+        else:
+            block = data_array.isel(lat=slice(row_start, row_stop)).values
+        return block.astype(np.float64)
+
+    def _out_path(self, stamp: str) -> pathlib.Path:
+        return self.out_dir / f'{self.var_name}_{stamp}.tif'
+
+    def _finish_cog(self, tmp_path: pathlib.Path, out_path: pathlib.Path, profile: dict) -> None:
+        """
+            为分块写入的临时文件(未压缩)生成金字塔，并压缩复制为 COG
+        """
+        levels: List[int] = [level for level in self.cog_options.get('overview_levels', [2, 4, 8, 16, 32]) if
+                             min(profile['height'], profile['width']) // level >= 1]
+        resampling: str = self.cog_options.get('overview_resampling', 'average')
+        with rasterio.open(tmp_path, 'r+') as dataset:
+            if levels:
+                dataset.build_overviews(levels, Resampling[resampling])
+                dataset.update_tags(ns='rio_overview', resampling=resampling)
+        rasterio.shutil.copy(tmp_path, out_path, driver='GTiff', copy_src_overviews=True, tiled=True,
+                             blockxsize=profile['blockxsize'], blockysize=profile['blockysize'],
+                             compress=self.compress, predictor=self.cog_options.get('predictor', 3))
+        os.remove(tmp_path)
+
+    def reduce(self) -> Dict[str, pathlib.Path]:
+        """
+            执行统计并输出
+        @return: {文件标记: 输出文件路径}
+        """
+        members: List[xr.Dataset] = [xr.open_dataset(temp_file) for temp_file in self.member_files]
+        try:
+            data_arrays: List[xr.DataArray] = [temp[self.var_name].transpose('lat', 'lon') for temp in members]
+            transform, height, width, lat_ascending = self._grid_definition(data_arrays[0])
+            for temp in data_arrays[1:]:
+                if temp.shape != (height, width):
+                    raise ValueError(f'集合成员网格不一致:{temp.shape} != {(height, width)}')
+            nodata: float = self.cog_options.get('nodata', -9999.0)
+            blocksize: int = self.cog_options.get('blocksize', 512)
+            profile: dict = dict(driver='GTiff', width=width, height=height, count=1, dtype='float32',
+                                 crs='EPSG:4326', transform=transform, nodata=nodata, tiled=True,
+                                 blockxsize=blocksize, blockysize=blocksize)
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            tmp_paths: Dict[str, pathlib.Path] = {stamp: self._out_path(stamp).with_suffix('.tmp.tif') for stamp in
+                                                  self.stamps}
+            outputs = {stamp: rasterio.open(tmp_path, 'w', **profile) for stamp, tmp_path in tmp_paths.items()}
+            try:
+                for row_start in range(0, height, self.block_rows):
+                    row_stop: int = min(row_start + self.block_rows, height)
+                    shape: Tuple[int, int] = (row_stop - row_start, width)
+                    block_max: np.ndarray = np.full(shape, np.nan)
+                    block_sum: np.ndarray = np.zeros(shape)
+                    block_sum_sq: np.ndarray = np.zeros(shape)
+                    block_count: np.ndarray = np.zeros(shape, dtype=np.int32)
+                    block_exceed: Dict[str, np.ndarray] = {stamp: np.zeros(shape, dtype=np.int32) for stamp in
+                                                           self.thresholds}
+                    for data_array in data_arrays:
+                        block: np.ndarray = self._read_block(data_array, row_start, row_stop, height, lat_ascending)
+                        valid: np.ndarray = np.isfinite(block)
+                        filled: np.ndarray = np.where(valid, block, 0.0)
+                        block_max = np.fmax(block_max, block)
+                        block_sum += filled
+                        block_sum_sq += filled * filled
+                        block_count += valid
+                        for stamp, threshold in self.thresholds.items():
+                            block_exceed[stamp] += valid & (filled > threshold)
+                    has_value: np.ndarray = block_count > 0
+                    count: np.ndarray = np.where(has_value, block_count, 1)
+                    block_mean: np.ndarray = block_sum / count
+                    stats: Dict[str, np.ndarray] = {
+                        STAT_ENSEMBLE_MAX: block_max,
+                        STAT_ENSEMBLE_MEAN: block_mean,
+                        STAT_ENSEMBLE_STD: np.sqrt(np.maximum(block_sum_sq / count - block_mean * block_mean, 0)),
+                    }
+                    for stamp in self.thresholds:
+                        stats[stamp] = block_exceed[stamp] / count
+                    window: Window = Window(0, row_start, width, row_stop - row_start)
+                    for stamp, values in stats.items():
+                        outputs[stamp].write(np.where(has_value, values, nodata).astype(np.float32), 1,
+                                             window=window)
+            finally:
+                for dataset in outputs.values():
+                    dataset.close()
+        finally:
+            for temp in members:
+                temp.close()
+        out_paths: Dict[str, pathlib.Path] = {}
+        for stamp, tmp_path in tmp_paths.items():
+            out_paths[stamp] = self._out_path(stamp)
+            self._finish_cog(tmp_path, out_paths[stamp], profile)
+        return out_paths
+
+
+class SurgeEnsembleExecutor(SurgeRasterExecutor):
+    """
+        + 26-10-18 集合统计增水场执行器
+        在各成员 nc 文件全部生成后执行，统计结果与集合成员的 geotiff 一样写入 geo_coverage_files(group_type 为统计产品枚举)
+    """
+
+    def execute(self, **kwargs):
+        """
+            执行集合统计 job
+        @param kwargs:
+        @return: 输出的 geotiff 文件集合
+        """
+        var_name: str = SURGE_ENSEMBLE_OPTIONS.get('var_name', 'zmax')
+        coverage_files: List[ForecastSurgeRasterFile] = [temp for temp in self.get_coveragefiles() if
+                                                         temp.file_name.split('.')[0].split('_')[1] in
+                                                         TY_GROUP_MEMBERS]
+        """各集合成员的 nc 文件"""
+        if len(coverage_files) == 0:
+            print(f'[!] 台风:{self.ty_code} 不存在集合成员的增水场文件，跳过集合统计')
+            return []
+        reducer = SurgeEnsembleReducer([temp.local_full_path for temp in coverage_files],
+                                       str(pathlib.Path(self.root_path) / self.relative_path), var_name=var_name,
+                                       block_rows=SURGE_ENSEMBLE_OPTIONS.get('block_rows', 256),
+                                       thresholds=SURGE_ENSEMBLE_OPTIONS.get('exceed_thresholds'),
+                                       cog_options=SURGE_RASTER_CONVERT_OPTIONS.get('cog'))
+        out_paths: Dict[str, pathlib.Path] = reducer.reduce()
+        tiff_files: List[ForecastSurgeRasterFile] = [
+            ForecastSurgeRasterFile(RasterFileType.GEOTIFF, self.timestamp, out_path.name, self.relative_path,
+                                    self.root_path, get_ty_group_enum(stamp), RasterLayoutEnum.COG) for
+            stamp, out_path in out_paths.items()]
+        self.batch2db(tiff_files)
+        return tiff_files
@@ -5,15 +5,17 @@ import rasterio
 from rasterio import features
 import numpy as np
 import arrow
-from typing import List
+from typing import List, Optional
 
-from commons.default import DEFAULT_RELATIVE_PATH
+from sqlalchemy import update
+
+from commons.default import DEFAULT_RELATIVE_PATH, NONE_ID
 from commons.enums import TyphoonGroupEnum, RasterFileType
 from config.base_config import StoreConfig
-from core.transformers import SurgeTransformer
+from core.raster_engine import SurgeRasterConvertEngine
 from db_factory import session_yield_scope
 from mid_models.mid_models import ForecastSurgeRasterFile
-from models.models import TaskJobs, GeoCoverageFiles
+from models.models import GeoCoverageFiles
 from util.utils import get_ty_group_enum
 
 
@@ -24,7 +26,8 @@ class SurgeRasterExecutor:
         TODO:[-] 25-07-24 整合 JobGenerateSurgeRasterPathFile
     """
 
-    def __init__(self, user_id: int, user_name: str, ty_code: str, ty_name_en: str, ty_name_ch: str, timestamp: int):
+    def __init__(self, user_id: int, user_name: str, ty_code: str, ty_name_en: str, ty_name_ch: str, timestamp: int,
+                 task_id: int = NONE_ID):
         self.uid = user_id
         """用户id"""
         self.user_name = user_name
@@ -36,6 +39,8 @@ class SurgeRasterExecutor:
         """台风名(中文)"""
         self.timestamp = timestamp
         """提交作业时的时间戳"""
+        self.task_id = task_id
+        """+ 26-10-18 写入 geo_coverage_files 的 task_id(celery 流程中不创建 task_jobs，默认为 NONE_ID)"""
         self.root_path = StoreConfig.TY_SOURCE_PATH
         """读取的根目录"""
 
@@ -80,20 +85,21 @@ class SurgeRasterExecutor:
         """
         pass
 
-    def get_coveragefiles(self) -> List[ForecastSurgeRasterFile]:
+    def get_coveragefiles(self, path_stamp: Optional[str] = None) -> List[ForecastSurgeRasterFile]:
         """
             25-05-09
             获取当前路径下的所有栅格文件集合
-        @param task_id:
-        @param ty_code:
-        @param issue_ts:
+            26-10-18 只获取 nc 文件(输出目录中还包含站点及路径文件)，可指定只获取某个集合成员
+        @param path_stamp: 集合成员标记 center|fast|slow|left|right ，为空时获取全部
         @return:
         """
         coverage_files: List[ForecastSurgeRasterFile] = []
-        files = self.get_path_files()
+        files = [temp_file for temp_file in self.get_path_files() if temp_file.suffix == '.nc']
 
         for temp_file in files:
             temp_group_type_str: str = temp_file.name.split('.')[0].split('_')[1]
+            if path_stamp is not None and temp_group_type_str != path_stamp:
+                continue
             temp_group_type: TyphoonGroupEnum = get_ty_group_enum(temp_group_type_str)
             """当前文件的集合路径枚举"""
             temp_relative_path: str = self.relative_path
@@ -120,90 +126,55 @@ class SurgeRasterExecutor:
         """
         pass
 
-    def batch_nc2tiff(self, task_job: TaskJobs,
-                      coverage_files: List[ForecastSurgeRasterFile]) -> List[ForecastSurgeRasterFile]:
+    def batch_nc2tiff(self, coverage_files: List[ForecastSurgeRasterFile]) -> List[ForecastSurgeRasterFile]:
         """
             将 nc 文件批量转换为 geotiff
-        @param session:
-        @param task_job:
         @param coverage_files:
         @return:
         """
-        tiff_files: List[ForecastSurgeRasterFile] = []
-        """转换后的geotiff文件集合"""
-        for temp_file in coverage_files:
-            temp_file_transformer = SurgeTransformer(temp_file, task_job.id)
-            temp_file_transformer.read_data()
-            temp_geo_tiff_file = temp_file_transformer.out_put()
-            tiff_files.append(temp_geo_tiff_file)
+        # TODO:[-] 26-10-18 各集合成员并行转换(进程数及 GDAL 线程数见 SURGE_RASTER_CONVERT_OPTIONS)
+        tiff_files: List[ForecastSurgeRasterFile] = SurgeRasterConvertEngine().convert(coverage_files, self.task_id)
+        """转换后的geotiff文件集合(与 coverage_files 顺序一致)"""
         return tiff_files
 
-    def batch2db(self, task_job: TaskJobs,
-                 coverage_files: List[ForecastSurgeRasterFile]):
+    def batch2db(self, coverage_files: List[ForecastSurgeRasterFile]):
         """
-            将 geotiff 批量写入db并于task表关联
-        @param session:
-        @param task_job:
+            将 geotiff 批量写入db
         @param coverage_files:
         @return:
         """
-        with session_yield_scope() as session:
-            try:
-                coverage_type: RasterFileType = RasterFileType.GEOTIFF
-                list_geo_coverages: List[GeoCoverageFiles] = [
-                    GeoCoverageFiles(task_id=task_job.id, ty_code=task_job.ty_code, relative_path=temp.relative_path,
-                                     file_name=temp.file_name, issue_ts=temp.issue_ts, issue_dt=temp.issue_dt,
-                                     coverage_type=coverage_type.value) for temp in
-                    coverage_files]
-                for temp_coverage in list_geo_coverages:
-                    session.add(temp_coverage)
-                    session.flush()
-                    # TODO:[*] 25-05-13 暂时不写入关联表
-                    # 写入关联表
-                    # relation = RelaTaskFiles(task_id=task_job.id, file_id=temp_coverage.id, file_type=coverage_type.value)
-                    # session.add(relation)
-                session.commit()
-            except Exception as ex:
-
-                session.close()
-                print(ex.args)
-        pass
+        self.register_coverage_files(coverage_files, RasterFileType.GEOTIFF)
 
-    def create_coveragefiles(self, task_job: TaskJobs,
-                             coverage_files: List[ForecastSurgeRasterFile]):
+    def create_coveragefiles(self, coverage_files: List[ForecastSurgeRasterFile]):
         """
-            基于 task 以及 ty_code 和 获取时间戳 获取并写入db 对应的 coverage file( geotiff | nc ) tb:geo_coverage_files
-            并将与task的关系写入 tb:rela_task_files
-        @param task_job:当前的作业job
+            将 nc 文件写入db tb:geo_coverage_files
         @param coverage_files:栅格文件集合
         @return:
         """
-        # step1: 获取所有的netcdf文件
-        # step2: nc -> geotiff
-        # step3: save -> db
+        self.register_coverage_files(coverage_files, RasterFileType.NETCDF)
 
+    def register_coverage_files(self, coverage_files: List[ForecastSurgeRasterFile], coverage_type: RasterFileType):
+        """
+            TODO:[-] 26-10-18 原先由未入库的 TaskJobs() 提供 task_id 及 ty_code(均为空，且 TaskJobs 的映射无法初始化)，
+             改为直接使用本执行器的 ty_code | task_id，同一次预报已登记的同类文件标记为删除(重复执行时不产生重复记录)
+        @param coverage_files:
+        @param coverage_type: NETCDF | GEOTIFF
+        @return:
+        """
         with session_yield_scope() as session:
-            coverage_type: RasterFileType = RasterFileType.NETCDF
-            list_geo_coverages: List[GeoCoverageFiles] = [
-                GeoCoverageFiles(task_id=task_job.id, ty_code=task_job.ty_code, relative_path=temp.relative_path,
-                                 file_name=temp.file_name, issue_ts=temp.issue_ts, issue_dt=temp.issue_dt,
-                                 coverage_type=coverage_type.value) for temp in
-                coverage_files]
-            for temp_coverage in list_geo_coverages:
-                """
-                    + 25-05-13
-                    (MySQLdb._exceptions.OperationalError) (1054, "Unknown column 'forecast_time' in 'field list'")
-                    [SQL: INSERT INTO geo_coverage_files (coverage_type, task_id, ty_code, is_del, relative_path, file_name, forecast_time, forecast_ts, issue_dt, issue_ts, gmt_create_time, gmt_modify_time) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)]
-                    [parameters: (6101, -1, 'DEFAULT', 0, 'user1/surge_path/2025/2106/1746777768768', 'zmax_center.dat.nc', datetime.date(2025, 5, 13), 1747118753, <Arrow [2025-05-13T06:33:16.666000+00:00]>, 1747117996666, datetime.datetime(2025, 5, 13, 6, 48, 5, 151547), datetime.datetime(2025, 5, 13, 6, 48, 5, 151547))]
-                    (Background on this error at: https://sqlalche.me/e/20/e3q8)
-                """
-                session.add(temp_coverage)
-                session.flush()
-                # # TODO:[*] 25-05-13 暂时不写入关联表
-                # relation = RelaTaskFiles(task_id=task_job.id, file_id=temp_coverage.id, file_type=coverage_type.value)
-                # session.add(relation)
-            session.commit()
-        pass
+            for temp in coverage_files:
+                session.execute(update(GeoCoverageFiles).where(
+                    GeoCoverageFiles.ty_code == self.ty_code,
+                    GeoCoverageFiles.issue_ts == temp.issue_ts,
+                    GeoCoverageFiles.coverage_type == coverage_type.value,
+                    GeoCoverageFiles.group_type == temp.ty_group_type.value,
+                    GeoCoverageFiles.is_del == 0
+                ).values(is_del=1))
+                session.add(GeoCoverageFiles(task_id=self.task_id, ty_code=self.ty_code,
+                                             relative_path=temp.relative_path, file_name=temp.file_name,
+                                             issue_ts=temp.issue_ts, issue_dt=arrow.get(temp.issue_ts).datetime,
+                                             coverage_type=coverage_type.value, group_type=temp.ty_group_type.value,
+                                             raster_layout=temp.raster_layout.value))
 
     def execute(self, **kwargs):
         """
@@ -213,18 +184,17 @@ class SurgeRasterExecutor:
         @return:
         """
         issue_ts: int = kwargs.get('issue_ts')
-        files: List[pathlib.Path] = self.get_path_files()
+        path_stamp: Optional[str] = kwargs.get('path_stamp')
+        """+ 26-10-18 只处理指定集合成员(由子任务传入)"""
 
-        coverage_files: List[ForecastSurgeRasterFile] = self.get_coveragefiles()
+        coverage_files: List[ForecastSurgeRasterFile] = self.get_coveragefiles(path_stamp)
         """当前路径下的所有栅格文件集合(只包含nc文件)"""
-        # 获取对应的 task_jobs
-        task_job = TaskJobs()
         # 本作业的主要处理流程
         # step1: 批量下载(之后再实现)—— docker 与 本地 volumns 映射，不需要下载文件
         # self.batch_download()
         # step2: 创建并写入db对应的nc文件信息
-        self.create_coveragefiles(task_job, coverage_files)
+        self.create_coveragefiles(coverage_files)
         # step3: 批量将 nc->geotiff 并写入 db
-        list_tiff_files = self.batch_nc2tiff(task_job, coverage_files)
-        self.batch2db(task_job, list_tiff_files)
+        list_tiff_files = self.batch_nc2tiff(coverage_files)
+        self.batch2db(list_tiff_files)
         pass
@@ -2,7 +2,6 @@ import json
 import pathlib
 from datetime import datetime, timezone, timedelta
 from typing import List
-import pandas as pd
 
 import arrow
 from sqlalchemy.orm import scoped_session, Session
@@ -11,9 +10,9 @@ from commons.default import MS_UNIT
 from commons.enums import TyphoonForecastInstitutionEnum
 from config.base_config import StoreConfig
 from db_factory import session_yield_scope
-from mid_models.mid_models import TyForecastRealDataMidModel
 from models.models import TyphoonForecastGrouppath, TyphoonForecastDetailinfo, TyphoonForecastRealdata
 from schemas import TyphoonPathComplexDetailSchema, TyphoonPointSchema
+from util.model_output_parser import TyTrackArrays, read_ty_track_txt
 
 
 class TyphoonPathExecutor:
@@ -128,39 +127,91 @@ class TyphoonGroupPathExecutor:
             path_files = [temp_file for temp_file in target_path.iterdir()]
         return path_files
 
-    def read_ty_path(self, file_path: str) -> List[TyForecastRealDataMidModel]:
+    def read_ty_path(self, file_path: str) -> TyTrackArrays:
         """
             读取指定路径的台风路径文件并提取台风路径信息并返回
-        """
-        df: pd.DataFrame = None
-        ty_realdata: List[TyForecastRealDataMidModel] = []
-        if pathlib.Path(file_path).exists():
-            # 使用空格分割;不使用header;指定读取的列名
-            """
-                eg: 
+            eg:
                 'datetime', 'longitude', 'latitude', 'pressure', 'wind'
-                2024090517,112.20000,19.20000,905.00000,26.00000
-                2024090518,112.12000,19.30000,905.20000,26.10000
-                2024090519,112.00000,19.40000,905.00000,26.00000
-                2024090520,111.83000,19.50000,904.30000,25.80000
-                2024090521,111.61000,19.61000,903.40000,25.70000
-
-            """
-            df = pd.read_csv(file_path, sep='\s+', header=None,
-                             names=['datetime', 'longitude', 'latitude', 'pressure', 'wind'])
-            # 逐行读取台风时间以及经纬度和气压以及最大风速
-            for row in df.itertuples():
-                # TODO[*] 25-04-30 此处的时间是世界时还是本地时间？
-                # Pandas(Index=0, datetime=2024090517, longitude=112.2, latitude=19.2, pressure=905.0, wind=26.0)
-                temp_dt_str: int = row.datetime
-                temp_local_ar: arrow.Arrow = arrow.get(str(temp_dt_str), "YYYYMMDDHH", tzinfo="Asia/Shanghai")
-                temp_utc_ar: arrow.Arrow = temp_local_ar.to('UTC')
-                temp_ty_realdata = TyForecastRealDataMidModel(row.latitude, row.longitude, row.pressure,
-                                                              temp_utc_ar.int_timestamp, '',
-                                                              [])
-                ty_realdata.append(temp_ty_realdata)
-
-        return ty_realdata
+                2024090517 112.20000 19.20000 905.00000 26.00000
+                2024090518 112.12000 19.30000 905.20000 26.10000
+            TODO:[-] 26-10-18 由逐行 arrow 转换时区改为 read_ty_track_txt 一次性读取，时间为北京时并统一转换为世界时
+            遍历返回值得到的 TyTrackPoint 与原 TyForecastRealDataMidModel 具有相同的 lat,lon,bp,ts,forecast_dt 属性
+        """
+        if not pathlib.Path(file_path).exists():
+            return TyTrackArrays.empty()
+        return read_ty_track_txt(file_path)
+
+    def _build_ty_detail(self) -> TyphoonForecastDetailinfo:
+        timestamp_sec = int(self.timestamp / MS_UNIT)
+        ty_detail: TyphoonForecastDetailinfo = TyphoonForecastDetailinfo(code=self.ty_code,
+                                                                         name_ch=self.ty_name_ch,
+                                                                         name_en=self.ty_name_en,
+                                                                         forecast_source=TyphoonForecastInstitutionEnum.CMA.value,
+                                                                         timestamp=timestamp_sec)
+        return ty_detail
+
+    @staticmethod
+    def get_path_stamp(temp_file: pathlib.Path) -> str:
+        """
+            文件样例:
+                tc_track_center.txt
+            截取的台风路径标记 center|fast|slow|right|left
+        """
+        return temp_file.name.split('.')[0].split('_')[2]
+
+    def _save_group_path(self, session: Session, ty_id: int, temp_file: pathlib.Path) -> None:
+        """
+            写入单个集合路径文件对应的 group path 及 realdata
+        """
+        timestamp_sec = int(self.timestamp / MS_UNIT)
+        temp_file_name: str = temp_file.name
+        path_stamp: str = self.get_path_stamp(temp_file)
+        """截取的台风路径标记 center|fast|slow|right|left"""
+
+        # 批量读取五个台风路径，分别写入db
+        temp_ty_realdata = self.read_ty_path(str(temp_file))
+        # step2: 写入台风 group path 表
+        temp_ty_grouppath: TyphoonForecastGrouppath = TyphoonForecastGrouppath(ty_id=ty_id,
+                                                                               ty_code=self.ty_code,
+                                                                               relative_path=self.relative_path,
+                                                                               file_name=temp_file_name,
+                                                                               ty_path_type=path_stamp,
+                                                                               timestamp=timestamp_sec)
+        session.add(temp_ty_grouppath)
+        session.flush()
+        # step3: 将台风路径预报信息写入 ty realdata 表
+        list_ty_realdata: List[TyphoonForecastRealdata] = []
+        for index, val in enumerate(temp_ty_realdata):
+            ty_realdata_model = TyphoonForecastRealdata(ty_id=ty_id, gp_id=temp_ty_grouppath.id,
+                                                        forecast_index=index,
+                                                        forecast_dt=val.forecast_dt,
+                                                        lat=val.lat, lon=val.lon, bp=val.bp,
+                                                        timestamp=val.ts)
+            list_ty_realdata.append(ty_realdata_model)
+        session.add_all(list_ty_realdata)
+
+    def create_ty_detail(self) -> int:
+        """
+            + 26-10-18 按集合成员拆分为子任务前，先单独写入台风详情表
+        @return: 台风详情 id
+        """
+        with session_yield_scope() as session:
+            ty_detail: TyphoonForecastDetailinfo = self._build_ty_detail()
+            session.add(ty_detail)
+            session.flush()
+            return ty_detail.id
+
+    def execute_member(self, ty_id: int, path_stamp: str) -> None:
+        """
+            + 26-10-18 只写入指定集合成员的台风路径(center|fast|slow|right|left)
+        @param ty_id: create_ty_detail 返回的台风详情 id
+        @param path_stamp:
+        @return:
+        """
+        with session_yield_scope() as session:
+            for temp_file in self.get_path_files():
+                if temp_file.is_file() and self.get_path_stamp(temp_file) == path_stamp:
+                    self._save_group_path(session, ty_id, temp_file)
 
     def execute(self) -> None:
         """
@@ -170,48 +221,15 @@ class TyphoonGroupPathExecutor:
             try:
                 files: List[pathlib.Path] = self.get_path_files()
                 # step1: 写入台风详情表
-                timestamp_sec = int(self.timestamp / MS_UNIT)
-                ty_detail: TyphoonForecastDetailinfo = TyphoonForecastDetailinfo(code=self.ty_code,
-                                                                                 name_ch=self.ty_name_ch,
-                                                                                 name_en=self.ty_name_en,
-                                                                                 forecast_source=TyphoonForecastInstitutionEnum.CMA.value,
-                                                                                 timestamp=timestamp_sec)
+                ty_detail: TyphoonForecastDetailinfo = self._build_ty_detail()
                 session.add(ty_detail)
                 # flush()：将更改同步到数据库，但不提交事务|commit(): 提交事务，使更改永久化
                 session.flush()
                 # session.commit()
                 for temp_file in files:
                     if temp_file.is_file():
-                        """
-                            文件样例:
-                                tc_track_center.txt
-                        """
-                        temp_file_name: str = temp_file.name
-                        path_stamp: str = temp_file_name.split('.')[0].split('_')[2]
-                        """截取的台风路径标记 center|fast|slow|right|left"""
-
-                        # 批量读取五个台风路径，分别写入db
-                        temp_ty_realdata = self.read_ty_path(str(temp_file))
-                        # step2: 写入台风 group path 表
-                        temp_ty_grouppath: TyphoonForecastGrouppath = TyphoonForecastGrouppath(ty_id=ty_detail.id,
-                                                                                               ty_code=ty_detail.code,
-                                                                                               relative_path=self.relative_path,
-                                                                                               file_name=temp_file_name,
-                                                                                               ty_path_type=path_stamp,
-                                                                                               timestamp=timestamp_sec)
-                        session.add(temp_ty_grouppath)
-                        session.flush()
-                        # session.commit()
-                        # step3: 将台风路径预报信息写入 ty realdata 表
-                        list_ty_realdata: List[TyphoonForecastRealdata] = []
-                        for index, val in enumerate(temp_ty_realdata):
-                            ty_realdata_model = TyphoonForecastRealdata(ty_id=ty_detail.id, gp_id=temp_ty_grouppath.id,
-                                                                        forecast_index=index,
-                                                                        forecast_dt=val.forecast_dt,
-                                                                        lat=val.lat, lon=val.lon, bp=val.bp,
-                                                                        timestamp=val.ts)
-                            list_ty_realdata.append(ty_realdata_model)
-                        session.add_all(list_ty_realdata)
+                        # step2 & step3: 写入台风 group path 表 以及 ty realdata 表
+                        self._save_group_path(session, ty_detail.id, temp_file)
                         session.commit()
                         pass
                 pass
@@ -0,0 +1,148 @@
+"""
+    + 26-10-18 由逐网格的淹没 geojson 直接重建栅格
+    淹没模式按 0.00108° 的网格逐个输出正方形多边形(属性为 "最大淹没深度(cm)")，
+    不构造 shapely 几何、不对整个范围 rasterize:
+    - 由每个网格的对角点得到中心点，向量化计算 (行, 列)
+    - 按 tiled + SPARSE_OK 的 geotiff 输出，只写入包含有效网格的块，内存及耗时只与有效网格数有关
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from affine import Affine
+from rasterio.transform import from_origin
+from rasterio.windows import Window
+
+from util.geojson_stream import iter_feature_batches
+
+FLOOD_GRID_UNIT: float = 0.00108
+"""淹没模式网格大小(度)"""
+
+FLOOD_DEPTH_FIELD: str = '最大淹没深度(cm)'
+
+
+def read_cells(read_path: str, value_name: str = FLOOD_DEPTH_FIELD) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+        读取逐网格 geojson 中各网格的中心点及值
+    @param read_path:
+    @param value_name: 属性名
+    @return: (中心点经度, 中心点纬度, 值) float64 | float64 | float32，值为空的网格不输出
+    """
+    # 流式读取，每批转换为 numpy 数组后丢弃 feature
+    centers: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    for batch in iter_feature_batches(read_path):
+        corners = []
+        batch_values = []
+        for feature in batch:
+            value = (feature.get('properties') or {}).get(value_name)
+            geometry: Optional[dict] = feature.get('geometry')
+            if value is None or geometry is None or geometry.get('type') != 'Polygon':
+                continue
+            ring = geometry['coordinates'][0]
+            # 正方形网格的两个对角点
+            corners.append((ring[0][0], ring[0][1], ring[2][0], ring[2][1]))
+            batch_values.append(value)
+        corner_arr: np.ndarray = np.asarray(corners, dtype=np.float64).reshape(-1, 4)
+        centers.append((corner_arr[:, :2] + corner_arr[:, 2:]) / 2)
+        values.append(np.asarray(batch_values, dtype=np.float32))
+    center_arr: np.ndarray = np.concatenate(centers) if centers else np.empty((0, 2))
+    return center_arr[:, 0], center_arr[:, 1], (np.concatenate(values) if values else np.empty(0, np.float32))
+
+
+def read_raster_cells(read_path: str, block_rows: int = 1024) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+        + 26-10-18 按窗口读取淹没深度 geotiff，只保留有效像元(与 read_cells 的输出一致)
+    @param read_path: 淹没深度 geotiff(cm)，像元须为正方形
+    @param block_rows: 每个窗口的行数
+    @return: (中心点经度, 中心点纬度, 值, 像元大小)
+    """
+    xs: List[np.ndarray] = []
+    ys: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    with rasterio.open(read_path) as src:
+        transform: Affine = src.transform
+        if not np.isclose(transform.a, -transform.e) or transform.b != 0 or transform.d != 0:
+            raise ValueError(f'仅支持正方形且无旋转的像元:{transform}')
+        for row_off in range(0, src.height, block_rows):
+            window: Window = Window(0, row_off, src.width, min(block_rows, src.height - row_off))
+            data: np.ndarray = src.read(1, window=window)
+            valid: np.ndarray = np.isfinite(data)
+            if src.nodata is not None and not np.isnan(src.nodata):
+                valid &= data != src.nodata
+            rows, cols = np.nonzero(valid)
+            xs.append(transform.c + (cols + 0.5) * transform.a)
+            ys.append(transform.f + (rows + row_off + 0.5) * transform.e)
+            values.append(data[rows, cols].astype(np.float32))
+    if not values:
+        return np.empty(0), np.empty(0), np.empty(0, np.float32), transform.a
+    return np.concatenate(xs), np.concatenate(ys), np.concatenate(values), transform.a
+
+
+def cells_to_grid(xs: np.ndarray, ys: np.ndarray, resolution: float = FLOOD_GRID_UNIT) -> Tuple[
+    np.ndarray, np.ndarray, int, int, Affine]:
+    """
+        计算网格中心点所在的 (行, 列)
+        范围为所有网格的外包矩形(与原 rasterize 一致)
+    @param xs: 网格中心经度
+    @param ys: 网格中心纬度
+    @param resolution: 网格大小
+    @return: (rows, cols, height, width, transform)
+    """
+    if len(xs) == 0:
+        raise ValueError('不存在有效的淹没网格')
+    x_min: float = float(xs.min()) - resolution / 2
+    y_max: float = float(ys.max()) + resolution / 2
+    cols: np.ndarray = np.rint((xs - x_min) / resolution - 0.5).astype(np.int64)
+    rows: np.ndarray = np.rint((y_max - ys) / resolution - 0.5).astype(np.int64)
+    return rows, cols, int(rows.max()) + 1, int(cols.max()) + 1, from_origin(x_min, y_max, resolution, resolution)
+
+
+def cells_to_geotiff(xs: np.ndarray, ys: np.ndarray, values: np.ndarray, out_put_path: str,
+                     resolution: float = FLOOD_GRID_UNIT, crs: str = 'EPSG:4326', block_size: int = 256,
+                     compress: str = 'deflate') -> Tuple[int, int]:
+    """
+        将网格中心点及值写入 geotiff
+        范围与原 rasterize 一致(所有网格的外包矩形)，无值处为 nan
+        同一位置有多个网格时以最后一个为准
+    @param xs: 网格中心经度
+    @param ys: 网格中心纬度
+    @param values:
+    @param out_put_path:
+    @param resolution: 网格大小
+    @param crs:
+    @param block_size: geotiff 块大小
+    @param compress:
+    @return: (height, width)
+    """
+    rows, cols, height, width, transform = cells_to_grid(xs, ys, resolution)
+    # 按所在块排序，逐块写入(稳定排序保证重复网格以最后一个为准)
+    blocks_x: int = (width + block_size - 1) // block_size
+    block_keys: np.ndarray = (rows // block_size) * blocks_x + cols // block_size
+    order: np.ndarray = np.argsort(block_keys, kind='stable')
+    block_keys, rows, cols, values = block_keys[order], rows[order], cols[order], values[order]
+    splits: np.ndarray = np.flatnonzero(np.diff(block_keys)) + 1
+    profile: dict = dict(driver='GTiff', height=height, width=width, count=1, dtype='float32', crs=crs,
+                         transform=transform, nodata=np.nan, tiled=True,
+                         blockxsize=block_size, blockysize=block_size, compress=compress, sparse_ok=True)
+    with rasterio.open(out_put_path, 'w', **profile) as dst:
+        for block_rows, block_cols, block_values in zip(np.split(rows, splits), np.split(cols, splits),
+                                                        np.split(values, splits)):
+            row_off: int = int(block_rows[0]) // block_size * block_size
+            col_off: int = int(block_cols[0]) // block_size * block_size
+            window: Window = Window(col_off, row_off, min(block_size, width - col_off),
+                                    min(block_size, height - row_off))
+            block: np.ndarray = np.full((window.height, window.width), np.nan, dtype=np.float32)
+            block[block_rows - row_off, block_cols - col_off] = block_values
+            dst.write(block, 1, window=window)
+    return height, width
+
+
+def convert_cells_to_geotiff(read_path: str, out_put_path: str, value_name: str = FLOOD_DEPTH_FIELD,
+                             resolution: float = FLOOD_GRID_UNIT) -> Tuple[int, int]:
+    """
+        逐网格 geojson -> geotiff
+    @return: (height, width)
+    """
+    xs, ys, values = read_cells(read_path, value_name)
+    return cells_to_geotiff(xs, ys, values, out_put_path, resolution)
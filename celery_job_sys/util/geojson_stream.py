@@ -0,0 +1,122 @@
+"""
+    + 26-10-18 大体积 geojson(如 surgeflood.max.*.json)的流式读写
+    - 读取: 使用 ijson 逐个解析 features 数组中的元素，按批次返回，内存只与批次大小有关
+      未安装 ijson 时退化为一次性 json.load(结果相同，但不再是流式)
+    - 写入: 逐批次写入 FeatureCollection，不需要在内存中保留全部结果
+"""
+import json
+import math
+from typing import Any, Iterator, List
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def iter_features(read_path: str) -> Iterator[dict]:
+    """
+        逐个读取 feature
+    @param read_path: geojson(FeatureCollection)
+    @return:
+    """
+    if ijson is None:
+        print(f'[!] 未安装 ijson，一次性读取:{read_path}')
+        with open(read_path, 'r', encoding='utf-8') as f:
+            yield from json.load(f).get('features', [])
+        return
+    with open(read_path, 'rb') as f:
+        yield from ijson.items(f, 'features.item', use_float=True)
+
+
+def iter_feature_batches(read_path: str, batch_size: int = 10000) -> Iterator[List[dict]]:
+    """
+        按批次读取 feature
+    @param read_path:
+    @param batch_size: 每批的 feature 数
+    @return:
+    """
+    batch: List[dict] = []
+    for feature in iter_features(read_path):
+        batch.append(feature)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_geodataframes(read_path: str, batch_size: int = 10000, crs: str = 'EPSG:4326') -> Iterator[
+    gpd.GeoDataFrame]:
+    """
+        按批次读取为 GeoDataFrame
+        index 为 feature 在整个文件中的序号(与 gpd.read_file 一致)
+    @param read_path:
+    @param batch_size:
+    @param crs: 流式读取不解析 geojson 中的 crs 成员，默认为 EPSG:4326
+    @return:
+    """
+    offset: int = 0
+    for batch in iter_feature_batches(read_path, batch_size):
+        gdf: gpd.GeoDataFrame = gpd.GeoDataFrame.from_features(batch, crs=crs)
+        gdf.index = pd.RangeIndex(offset, offset + len(batch))
+        offset += len(batch)
+        yield gdf
+
+
+def json_value(val: Any) -> Any:
+    """numpy 标量 -> python 标量，nan -> None"""
+    if isinstance(val, np.generic):
+        val = val.item()
+    if isinstance(val, float) and math.isnan(val):
+        return None
+    return val
+
+
+class GeoJSONFeatureWriter:
+    """
+        逐批次写入 FeatureCollection
+        with GeoJSONFeatureWriter(path) as writer:
+            writer.write_geodataframe(gdf)
+    """
+
+    def __init__(self, out_put_path: str):
+        self.out_put_path = out_put_path
+        self.count: int = 0
+        self._file = None
+
+    def __enter__(self) -> 'GeoJSONFeatureWriter':
+        self._file = open(self.out_put_path, 'w', encoding='utf-8')
+        self._file.write('{"type":"FeatureCollection","features":[')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.write(']}')
+        self._file.close()
+
+    def _write_raw(self, feature_text: str) -> None:
+        if self.count > 0:
+            self._file.write(',')
+        self._file.write(feature_text)
+        self.count += 1
+
+    def write_features(self, features: List[dict]) -> None:
+        for feature in features:
+            self._write_raw(json.dumps(feature, ensure_ascii=False))
+
+    def write_geodataframe(self, gdf: gpd.GeoDataFrame) -> None:
+        """
+            几何整列转换为 geojson 字符串后写入
+        """
+        geometries: np.ndarray = shapely.to_geojson(gdf.geometry.values)
+        records: List[dict] = gdf.drop(columns=gdf.geometry.name).to_dict('records')
+        for geometry, properties in zip(geometries, records):
+            properties = {key: json_value(val) for key, val in properties.items()}
+            geometry_text: str = geometry if geometry is not None else 'null'
+            self._write_raw(f'{{"type":"Feature","properties":{json.dumps(properties, ensure_ascii=False)},'
+                            f'"geometry":{geometry_text}}}')
@@ -0,0 +1,176 @@
+"""
+    + 26-10-18 分块并建立空间索引的掩码(陆地及海洋外边界)
+    - 掩码 shapefile 为静态数据，合并(union)后的结果以 WKB 缓存在磁盘，源文件修改后自动失效
+    - 合并后的掩码按规则网格切分为小块，建立 STRtree 并 prepare
+    - 每个淹没多边形只与相交的掩码块求差集；完全在掩码外的直接保留，完全在某个掩码块内的直接剔除
+"""
+import hashlib
+import pathlib
+import struct
+from typing import List, Optional
+
+import geopandas as gpd
+import numpy as np
+import rasterio
+import shapely
+from rasterio.windows import Window
+from shapely.geometry.base import BaseGeometry
+
+
+def _write_wkb_list(path: pathlib.Path, geoms: np.ndarray) -> None:
+    """按 (长度, WKB) 依次写入"""
+    tmp_path: pathlib.Path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        for wkb in shapely.to_wkb(geoms):
+            f.write(struct.pack('<I', len(wkb)))
+            f.write(wkb)
+    tmp_path.replace(path)
+
+
+def _read_wkb_list(path: pathlib.Path) -> np.ndarray:
+    data: bytes = path.read_bytes()
+    wkbs: List[bytes] = []
+    offset: int = 0
+    while offset < len(data):
+        (size,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        wkbs.append(data[offset:offset + size])
+        offset += size
+    return shapely.from_wkb(np.array(wkbs, dtype=object))
+
+
+class TiledLandMask:
+    """
+        分块掩码
+    """
+
+    def __init__(self, tiles: np.ndarray):
+        """
+        @param tiles: 掩码块(shapely 几何数组)
+        """
+        self.tiles: np.ndarray = tiles
+        shapely.prepare(self.tiles)
+        self.tree = shapely.STRtree(self.tiles)
+
+    @staticmethod
+    def _cache_key(mask_file: str, grid_size: float) -> str:
+        """源文件路径 + 修改时间 + 大小 + 网格大小"""
+        stat = pathlib.Path(mask_file).stat()
+        return hashlib.sha1(f'{pathlib.Path(mask_file).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{grid_size}'.encode(
+            'utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def split_tiles(union: BaseGeometry, grid_size: float) -> np.ndarray:
+        """
+            将合并后的掩码按网格切分
+        @param union:
+        @param grid_size: 网格大小(与掩码坐标单位一致，经纬度时为度)
+        @return: 非空的掩码块
+        """
+        min_x, min_y, max_x, max_y = union.bounds
+        xs: np.ndarray = np.arange(min_x, max_x, grid_size)
+        ys: np.ndarray = np.arange(min_y, max_y, grid_size)
+        cell_x, cell_y = (temp.ravel() for temp in np.meshgrid(xs, ys))
+        cells: np.ndarray = shapely.box(cell_x, cell_y, cell_x + grid_size, cell_y + grid_size)
+        shapely.prepare(union)
+        cells = cells[shapely.intersects(union, cells)]
+        tiles: np.ndarray = shapely.intersection(union, cells)
+        return tiles[~shapely.is_empty(tiles)]
+
+    @classmethod
+    def from_file(cls, mask_file: str, grid_size: float = 0.05, cache_dir: Optional[str] = None) -> 'TiledLandMask':
+        """
+            读取掩码(优先读取磁盘缓存)
+        @param mask_file: 掩码 shapefile
+        @param grid_size: 网格大小
+        @param cache_dir: 缓存目录，为空时缓存在掩码文件所在目录
+        @return:
+        """
+        cache_path = pathlib.Path(cache_dir) if cache_dir else pathlib.Path(mask_file).parent
+        cache_path.mkdir(parents=True, exist_ok=True)
+        stem: str = f'{pathlib.Path(mask_file).stem}.{cls._cache_key(mask_file, grid_size)}'
+        union_file: pathlib.Path = cache_path / f'{stem}.union.wkb'
+        tiles_file: pathlib.Path = cache_path / f'{stem}.tiles.wkb'
+        if tiles_file.exists():
+            return cls(_read_wkb_list(tiles_file))
+        if union_file.exists():
+            union: BaseGeometry = _read_wkb_list(union_file)[0]
+        else:
+            gdf_mask: gpd.GeoDataFrame = gpd.read_file(mask_file)
+            union = shapely.union_all(gdf_mask.geometry.values)
+            _write_wkb_list(union_file, np.array([union], dtype=object))
+        tiles: np.ndarray = cls.split_tiles(union, grid_size)
+        _write_wkb_list(tiles_file, tiles)
+        return cls(tiles)
+
+    def covers_points(self, xs: np.ndarray, ys: np.ndarray, batch_size: int = 1000000) -> np.ndarray:
+        """
+            + 26-10-18 判断点(如网格中心点)是否位于掩码内
+        @param xs:
+        @param ys:
+        @param batch_size: 每批构造的点数
+        @return: bool 数组
+        """
+        covered: np.ndarray = np.zeros(len(xs), dtype=bool)
+        for start in range(0, len(xs), batch_size):
+            points: np.ndarray = shapely.points(xs[start:start + batch_size], ys[start:start + batch_size])
+            point_indexes, _ = self.tree.query(points, predicate='intersects')
+            covered[start + point_indexes] = True
+        return covered
+
+    def mask_geotiff(self, read_path: str, out_put_path: str, block_rows: int = 1024) -> int:
+        """
+            + 26-10-18 将中心点位于掩码内的像元置为无效值(按窗口读写)
+        @param read_path: 淹没深度 geotiff
+        @param out_put_path:
+        @param block_rows: 每个窗口的行数
+        @return: 剩余的有效像元数
+        """
+        count: int = 0
+        with rasterio.open(read_path) as src:
+            profile: dict = src.profile.copy()
+            nodata = src.nodata if src.nodata is not None else np.nan
+            profile.update({'driver': 'GTiff', 'nodata': nodata, 'compress': 'deflate'})
+            with rasterio.open(out_put_path, 'w', **profile) as dst:
+                for row_off in range(0, src.height, block_rows):
+                    window: Window = Window(0, row_off, src.width, min(block_rows, src.height - row_off))
+                    data: np.ndarray = src.read(1, window=window)
+                    valid: np.ndarray = np.isfinite(data)
+                    if not np.isnan(nodata):
+                        valid &= data != nodata
+                    rows, cols = np.nonzero(valid)
+                    transform = src.window_transform(window)
+                    covered: np.ndarray = self.covers_points(transform.c + (cols + 0.5) * transform.a,
+                                                             transform.f + (rows + 0.5) * transform.e)
+                    data[rows[covered], cols[covered]] = nodata
+                    count += int((~covered).sum())
+                    dst.write(data, 1, window=window)
+        return count
+
+    def difference(self, geoms: np.ndarray) -> np.ndarray:
+        """
+            剔除掩码内的部分
+        @param geoms: shapely 几何数组
+        @return: 与输入等长，全部被剔除的为空几何
+        """
+        geoms = np.asarray(geoms, dtype=object)
+        result: np.ndarray = geoms.copy()
+        geom_indexes, tile_indexes = self.tree.query(geoms, predicate='intersects')
+        if len(geom_indexes) == 0:
+            return result
+        order: np.ndarray = np.argsort(geom_indexes, kind='stable')
+        geom_indexes, tile_indexes = geom_indexes[order], tile_indexes[order]
+        # 完全在某个掩码块内部的几何
+        inside: np.ndarray = shapely.contains_properly(self.tiles[tile_indexes], geoms[geom_indexes])
+        inside_geoms: np.ndarray = np.unique(geom_indexes[inside])
+        result[inside_geoms] = shapely.Polygon()
+        inside_set = set(inside_geoms.tolist())
+        splits: np.ndarray = np.flatnonzero(np.diff(geom_indexes)) + 1
+        for group_geoms, group_tiles in zip(np.split(geom_indexes, splits), np.split(tile_indexes, splits)):
+            geom_index: int = group_geoms[0]
+            if geom_index in inside_set:
+                continue
+            tiles: np.ndarray = self.tiles[group_tiles]
+            result[geom_index] = shapely.difference(geoms[geom_index], shapely.union_all(tiles) if len(
+                tiles) > 1 else tiles[0])
+        return result
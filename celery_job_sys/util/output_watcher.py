@@ -0,0 +1,231 @@
+"""
+    模式输出目录监听
+    模式运行过程中各集合成员的产品是陆续写出的，监听 user_out 目录，某个成员的文件写完后立即回调，
+    不再等待全部成员计算结束后(log.flag_surge)才开始后处理
+    - linux 下使用 inotify(IN_CLOSE_WRITE | IN_MOVED_TO) 监听文件关闭写入
+    - 其他平台或 inotify 不可用时回退为轮询，文件大小在 stable_seconds 内不再变化视为写入完成
+"""
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from commons.default import TY_GROUP_MEMBERS
+
+STAGE_STATION_SURGE: str = 'station_surge'
+"""站点增水: station_output_{member}.dat"""
+STAGE_GROUP_PATH: str = 'group_path'
+"""集合路径: tc_track_{member}.txt"""
+STAGE_SURGE_RASTER: str = 'surge_raster'
+"""增水场: zmax_{member}.dat.nc"""
+
+POST_PROCESS_STAGES: List[str] = [STAGE_STATION_SURGE, STAGE_GROUP_PATH, STAGE_SURGE_RASTER]
+"""后处理阶段"""
+
+DONE_FLAG_FILE: str = 'log.flag_surge'
+"""模式全部计算结束的标记文件"""
+
+
+def classify_output_file(file_path: pathlib.Path) -> Optional[Tuple[str, str]]:
+    """
+        根据文件名判断属于哪个后处理阶段以及哪个集合成员
+    @param file_path:
+    @return: (stage, member) ，不是后处理所需的文件时返回 None
+    """
+    name: str = file_path.name
+    stem_parts: List[str] = name.split('.')[0].split('_')
+    if name.endswith('.nc') and name.startswith('zmax_') and len(stem_parts) > 1:
+        return STAGE_SURGE_RASTER, stem_parts[1]
+    if name.endswith('.txt') and name.startswith('tc_track_'):
+        return STAGE_GROUP_PATH, stem_parts[-1]
+    if file_path.suffix == '.dat':
+        return STAGE_STATION_SURGE, stem_parts[-1]
+    return None
+
+
+class _Inotify:
+    """
+        基于 ctypes 调用 libc inotify (只监听单个目录，不递归)
+    """
+    IN_CLOSE_WRITE: int = 0x00000008
+    IN_MOVED_TO: int = 0x00000080
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, watch_dir: pathlib.Path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        wd: int = libc.inotify_add_watch(self.fd, os.fsencode(str(watch_dir)), self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+        if wd < 0:
+            errno: int = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f'inotify_add_watch failed:{watch_dir}')
+
+    def read(self, timeout: float) -> List[str]:
+        """
+            等待并读取事件
+        @param timeout: 秒
+        @return: 写入完成的文件名集合
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data: bytes = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names: List[str] = []
+        offset: int = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            _, _, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name: bytes = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ModelOutputWatcher:
+    """
+        模式输出目录监听器
+        每个 (阶段, 集合成员) 的文件写入完成后只回调一次
+    """
+
+    def __init__(self, watch_dir: str, on_ready: Callable[[str, str, pathlib.Path], None],
+                 since_ts: Optional[float] = None, members: Optional[List[str]] = None,
+                 stable_seconds: float = 5, poll_interval: float = 2, use_inotify: bool = True):
+        """
+        @param watch_dir: 监听的目录(user_out/{user_name})
+        @param on_ready: 回调 (stage, member, file_path)
+        @param since_ts: 只处理修改时间不早于该时间戳的文件(输出目录会被多次运行复用)
+        @param members: 集合成员，默认为全部成员
+        @param stable_seconds: 轮询模式下文件大小保持不变多久视为写入完成
+        @param poll_interval: 轮询间隔(秒)，inotify 模式下为单次等待事件的最长时间
+        @param use_inotify: 是否尝试使用 inotify
+        """
+        self.watch_dir = pathlib.Path(watch_dir)
+        self.on_ready = on_ready
+        self.since_ts: float = since_ts if since_ts is not None else time.time()
+        self.members: List[str] = members if members else TY_GROUP_MEMBERS
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self._dispatched: Set[Tuple[str, str]] = set()
+        """已回调的 (stage, member)"""
+        self._sizes: Dict[pathlib.Path, Tuple[int, float]] = {}
+        """轮询模式下文件的 (大小, 大小最后一次变化的时间)"""
+        self._done: bool = False
+
+    @property
+    def pending(self) -> List[Tuple[str, str]]:
+        """尚未回调的 (stage, member)"""
+        return [(stage, member) for member in self.members for stage in POST_PROCESS_STAGES if
+                (stage, member) not in self._dispatched]
+
+    def _is_current_run(self, file_path: pathlib.Path) -> bool:
+        try:
+            return file_path.stat().st_mtime >= self.since_ts
+        except FileNotFoundError:
+            return False
+
+    def _mark_ready(self, file_path: pathlib.Path) -> None:
+        if file_path.name == DONE_FLAG_FILE:
+            if self._is_current_run(file_path):
+                self._done = True
+            return
+        key: Optional[Tuple[str, str]] = classify_output_file(file_path)
+        if key is None or key[1] not in self.members or key in self._dispatched:
+            return
+        if not self._is_current_run(file_path):
+            return
+        self._dispatched.add(key)
+        print(f"📦 [监听] {key[0]}:{key[1]} 文件写入完成: {file_path.name}")
+        self.on_ready(key[0], key[1], file_path)
+
+    def _scan_stable(self, file_names: Optional[List[str]] = None) -> None:
+        """
+            轮询检查文件大小是否稳定
+        @param file_names: 只检查指定文件，默认检查目录下的所有文件
+        """
+        now: float = time.monotonic()
+        files: List[pathlib.Path] = [self.watch_dir / name for name in file_names] if file_names is not None else [
+            temp_file for temp_file in self.watch_dir.iterdir() if temp_file.is_file()]
+        for temp_file in files:
+            try:
+                size: int = temp_file.stat().st_size
+            except FileNotFoundError:
+                continue
+            if temp_file.name == DONE_FLAG_FILE:
+                # 标记文件可能为空文件
+                self._mark_ready(temp_file)
+                continue
+            last_size, changed_at = self._sizes.get(temp_file, (-1, now))
+            if size != last_size:
+                self._sizes[temp_file] = (size, now)
+            elif size > 0 and now - changed_at >= self.stable_seconds:
+                self._mark_ready(temp_file)
+
+    def dispatch_pending(self) -> None:
+        """
+            模式计算结束后，将目录下所有尚未回调的文件直接视为写入完成
+            (以及不在监听目录中的阶段，如集合路径文件不在 user_out 时，按成员补发回调)
+        """
+        if self.watch_dir.exists():
+            for temp_file in sorted(self.watch_dir.iterdir()):
+                if temp_file.is_file():
+                    self._mark_ready(temp_file)
+        for stage, member in self.pending:
+            self._dispatched.add((stage, member))
+            self.on_ready(stage, member, self.watch_dir)
+
+    def run(self, timeout_seconds: float, is_alive: Optional[Callable[[], bool]] = None) -> bool:
+        """
+            阻塞监听，直到出现本次运行的 log.flag_surge 或超时
+        @param timeout_seconds:
+        @param is_alive: 模式进程是否仍正常(返回 False 时提前结束监听)
+        @return: 模式是否正常计算结束
+        """
+        self.watch_dir.mkdir(parents=True, exist_ok=True)
+        inotify: Optional[_Inotify] = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(self.watch_dir)
+            except (OSError, AttributeError) as ex:
+                print(f"[!] inotify 不可用，回退为轮询:{ex}")
+        # 监听开始前已经存在(可能仍在写入)的文件，通过大小是否稳定判断
+        initial_files: List[str] = [temp_file.name for temp_file in self.watch_dir.iterdir() if temp_file.is_file()]
+        start_time: float = time.monotonic()
+        try:
+            while not self._done:
+                if time.monotonic() - start_time > timeout_seconds:
+                    print(f"⌛️ [超时退出] 模式运行超过 {timeout_seconds / 60:.1f} 分钟，停止监听。")
+                    return False
+                if is_alive is not None and not is_alive():
+                    print("❌ 模式进程异常退出，停止监听。")
+                    return False
+                if inotify is not None:
+                    for name in inotify.read(self.poll_interval):
+                        self._sizes.pop(self.watch_dir / name, None)
+                        if name in initial_files:
+                            initial_files.remove(name)
+                        self._mark_ready(self.watch_dir / name)
+                    if initial_files:
+                        self._scan_stable(initial_files)
+                else:
+                    self._scan_stable()
+                    if not self._done:
+                        time.sleep(self.poll_interval)
+        finally:
+            if inotify is not None:
+                inotify.close()
+        print("✅ 模式计算已完成。")
+        return True
@@ -6,7 +6,15 @@ switch_dict = {'center': TyphoonGroupEnum.GROUP_CENTER,
                'fast': TyphoonGroupEnum.GROUP_FAST,
                'slow': TyphoonGroupEnum.GROUP_SLOW,
                'left': TyphoonGroupEnum.GROUP_LEFT,
-               'right': TyphoonGroupEnum.GROUP_RIGHT}
+               'right': TyphoonGroupEnum.GROUP_RIGHT,
+               # + 26-10-18 集合统计产品
+               'ensmax': TyphoonGroupEnum.GROUP_ENSEMBLE_MAX,
+               'ensmean': TyphoonGroupEnum.GROUP_ENSEMBLE_MEAN,
+               'ensstd': TyphoonGroupEnum.GROUP_ENSEMBLE_STD,
+               'exceed050': TyphoonGroupEnum.GROUP_EXCEED_050,
+               'exceed100': TyphoonGroupEnum.GROUP_EXCEED_100,
+               'exceed150': TyphoonGroupEnum.GROUP_EXCEED_150,
+               'exceed200': TyphoonGroupEnum.GROUP_EXCEED_200}
 
 
 def get_ty_group_enum(val: str) -> TyphoonGroupEnum:
@@ -29,7 +29,7 @@ class GeoCoverageFiles(Base):
     forecast_ts = Column(Integer, nullable=False)
     issue_dt = Column(DateTime)
     issue_ts = Column(Integer)
-    relative_path = Column(String(50), nullable=False)
+    relative_path = Column(String(200), nullable=False)
     file_name = Column(String(100), nullable=False)
     file_ext = Column(String(50), nullable=False)
     coverage_type = Column(Integer, nullable=False)
@@ -1,4 +1,5 @@
 from enum import Enum, unique
+from typing import List
 
 
 @unique
@@ -39,12 +40,28 @@ class RasterFileType(Enum):
     """netcdf"""
     GEOTIFF = 6102
     """geotiff"""
+    # + 26-10-18 淹没产品(与增水场分开存储，避免按 GEOTIFF 查询全部集合成员时混入)
+    FLOOD_DEPTH = 6103
+    """淹没深度 geotiff(cm，已剔除掩码内的像元)"""
+    FLOOD_LEVEL = 6104
+    """淹没等级范围 geotiff(uint8，group_type 为淹没等级枚举)"""
 
     @classmethod
     def _missing_(cls, value):
         return cls.GEOTIFF  # 设定默认值为 GEOTIFF
 
 
+@unique
+class RasterLayoutEnum(Enum):
+    """
+        + 26-10-18 geotiff 文件内部布局
+    """
+    STRIPED = 6201
+    """普通 geotiff(条带存储，需完整下载后才能渲染)"""
+    COG = 6202
+    """Cloud-Optimized GeoTIFF(内部分块 + 内部金字塔，支持 http range 按需读取)"""
+
+
 @unique
 class TyphoonForecastInstitutionEnum(Enum):
     """
@@ -75,7 +92,28 @@ class TyphoonGroupEnum(Enum):
     GROUP_FAST = 4103
     GROUP_RIGHT = 4104
     GROUP_LEFT = 4105
+    # + 26-10-18 集合统计产品(由各成员的最大增水场统计生成，与集合成员一样按 group_type 存储及查询)
+    GROUP_ENSEMBLE_MAX = 4111
+    """各成员最大增水的包络(逐格点最大值)"""
+    GROUP_ENSEMBLE_MEAN = 4112
+    """集合平均"""
+    GROUP_ENSEMBLE_STD = 4113
+    """集合离散度(标准差)"""
+    GROUP_EXCEED_050 = 4121
+    """最大增水超过 0.5m 的概率"""
+    GROUP_EXCEED_100 = 4122
+    """最大增水超过 1.0m 的概率"""
+    GROUP_EXCEED_150 = 4123
+    """最大增水超过 1.5m 的概率"""
+    GROUP_EXCEED_200 = 4124
+    """最大增水超过 2.0m 的概率"""
 
     @classmethod
     def _missing_(cls, value):
         return cls.GROUP_CENTER  # 设定默认值为 CENTER
+
+
+TY_GROUP_MEMBER_ENUMS: List[TyphoonGroupEnum] = [TyphoonGroupEnum.GROUP_CENTER, TyphoonGroupEnum.GROUP_SLOW,
+                                                  TyphoonGroupEnum.GROUP_FAST, TyphoonGroupEnum.GROUP_RIGHT,
+                                                  TyphoonGroupEnum.GROUP_LEFT]
+"""+ 26-10-18 集合成员(不包含集合统计产品)"""
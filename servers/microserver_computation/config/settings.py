@@ -41,6 +41,83 @@ DB_TABLE_SPLIT_OPTIONS = {
     }
 }
 
+SURGE_RASTER_CONVERT_OPTIONS = {
+    # nc -> geotiff 并行转换的进程数(每个集合成员一个任务)，<=1 时串行
+    'max_workers': 5,
+    # 进程启动方式(spawn 避免 fork 继承 GDAL/netcdf 的全局状态)
+    'mp_context': 'spawn',
+    # 每个进程内 GDAL 使用的线程数，总线程数约为 max_workers * gdal_num_threads
+    'gdal_num_threads': '1',
+    # 每个进程 GDAL 块缓存大小(MB)
+    'gdal_cachemax': 256,
+    # 需要转换的 nc 变量(除 zmax 外的变量输出文件名中会带上变量名)
+    'var_names': ['zmax'],
+    # 输出 geotiff 的布局 cog|striped
+    'layout': 'cog',
+    # COG 参数(layout 为 cog 时生效)
+    'cog': {
+        # 内部分块大小 256|512
+        'blocksize': 512,
+        # 浮点预测器(PREDICTOR=3)，配合 deflate 可明显减小浮点栅格体积
+        'predictor': 3,
+        # 内部金字塔的抽稀倍数(小于 1 个像素的层级会被跳过)
+        'overview_levels': [2, 4, 8, 16, 32],
+        'overview_resampling': 'average',
+        # 无效值(被阈值过滤及陆地区域)
+        'nodata': -9999.0,
+    },
+}
+
+SURGE_TILE_OPTIONS = {
+    # 瓦片像素大小
+    'tile_size': 256,
+    # 重投影重采样方法
+    'resampling': 'bilinear',
+    # 默认色标(见 core/tiles.py SURGE_COLORMAPS)
+    'default_colormap': 'surge',
+    # 内存缓存的瓦片数及总大小(MB)
+    'cache_memory_items': 4096,
+    'cache_memory_mb': 256,
+    # 磁盘缓存目录及总大小(MB)，目录为空时不使用磁盘缓存
+    'cache_disk_dir': r'./cache/tiles',
+    'cache_disk_mb': 4096,
+}
+
+SURGE_SAMPLE_OPTIONS = {
+    # 最多缓存(完整读入内存)的增水场文件数
+    'max_files': 32,
+    # 最多缓存的 (网格定义, 点位集合) 行列号数
+    'max_indexes': 64,
+}
+
+GEOJSON_CACHE_OPTIONS = {
+    # 淹没多边形响应缓存的条数及压缩后的总大小(MB)
+    'max_items': 256,
+    'max_mb': 128,
+    # gzip 压缩等级
+    'compress_level': 6,
+}
+
+FLOOD_MVT_OPTIONS = {
+    # 图层名
+    'layer_name': 'flood',
+    # 瓦片坐标范围及裁剪外扩(瓦片坐标)
+    'extent': 4096,
+    'buffer': 64,
+    # 抽稀容差及最小面积(瓦片坐标，extent=4096 渲染为 256px 时 16 为 1 像素)
+    'simplify_tolerance': 8.0,
+    'min_area': 64.0,
+    # 写入瓦片的属性
+    'properties': ['value', 'flood_level'],
+    # 缓存投影后多边形的批次数
+    'max_runs': 16,
+    # 瓦片缓存(同 SURGE_TILE_OPTIONS)
+    'cache_memory_items': 4096,
+    'cache_memory_mb': 128,
+    'cache_disk_dir': r'./cache/mvt',
+    'cache_disk_mb': 2048,
+}
+
 LOGGING_OPTIONS = {
     # 将日志改为当前目录下
     # 'LOG_DIR': r'/opt/project/logs',
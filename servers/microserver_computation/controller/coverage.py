@@ -4,35 +4,39 @@ from typing import List, Dict, Optional
 import arrow
 import requests
 from lxml import etree
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request, Response
 from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
 from common.default import DEFAULT_CODE
-from common.enums import TyphoonGroupEnum, FloodAreaLevelEnum
+from common.enums import TyphoonGroupEnum, FloodAreaLevelEnum, RasterFileType
 from common.exceptions import NoExistTargetTyphoon
+from config.settings import SURGE_TILE_OPTIONS
 from core.jobs import JobGenerateTyphoonPathFile
+from core.sampler import get_sampler, to_json_values
+from core.tiles import SURGE_COLORMAPS, TILE_IMAGE_DRIVERS, get_tile_service, is_valid_tile
 from dao.coverage import CoverageDao
+from dao.stations import StationDao
 from dao.jobs import TaskDao
 from dao.typhoon import TyphoonDao
+from db.db import get_db_session
 from models.mid_models import TyDetailMidModel, TyPathMidModel
 from schema.common import ResponseModel
+from schema.coverage import SurgeSampleParamsSchema, SurgeSampleResultSchema, SurgeMemberSampleSchema
+from schema.stations import StionInfoSchema
 from schema.task import TyGroupTaskSchema
 from schema.typhoon import TyphoonPathSchema, TyphoonPathComplexSchema, TyphoonDistGroupSchema
+from util.tile_cache import file_version
 
 app = APIRouter()
 
 
-def get_flood_area_tif_name(val: FloodAreaLevelEnum) -> str:
-    """
-        TODO:[*] 25-06-10
-        根据 淹没等级获取对应的geotiff地址(静态)
-    @param val:
-    @return:
-    """
-    switch_dict = {FloodAreaLevelEnum.GTE100: 'output_processed_gt100.tif',
-                   FloodAreaLevelEnum.GTE150: 'output_processed_gt150.tif',
-                   FloodAreaLevelEnum.GTE200: 'output_processed_gt200.tif', }
-    return switch_dict.get(val)
+def get_coverage_dao(session: Session = Depends(get_db_session)):
+    return CoverageDao(session)
+
+
+def get_station_dao(session: Session = Depends(get_db_session)):
+    return StationDao(session)
 
 
 # @app.get('/surge/max/url',
@@ -60,7 +64,8 @@ def get_flood_area_tif_name(val: FloodAreaLevelEnum) -> str:
 
 @app.get('/surge/max/url',
          summary="根据group获取对应的增水场url", response_model=str)
-async def get(ty_code: str, issue_ts: int, group: TyphoonGroupEnum = TyphoonGroupEnum.GROUP_CENTER):
+async def get(ty_code: str, issue_ts: int, group: TyphoonGroupEnum = TyphoonGroupEnum.GROUP_CENTER,
+              coverage_dao: CoverageDao = Depends(get_coverage_dao)):
     """
         根据 ty_code 获取对应台风的路径(实况|预报)
     :param params:
@@ -70,7 +75,6 @@ async def get(ty_code: str, issue_ts: int, group: TyphoonGroupEnum = TyphoonGrou
         # 将集合路径 type转换为对应 enmu
         group_type_enum: TyphoonGroupEnum = TyphoonGroupEnum(group)
         """集合路径对应的类型"""
-        coverage_dao = CoverageDao()
         res = coverage_dao.get_tif_file_url(ty_code, issue_ts, group_type_enum)
         return res
 
@@ -82,14 +86,87 @@ async def get(ty_code: str, issue_ts: int, group: TyphoonGroupEnum = TyphoonGrou
         )
 
 
+@app.get('/surge/max/tiles/{z}/{x}/{y}.{img_format}',
+         summary="增水场 XYZ 瓦片(Web-Mercator，png|webp)", response_class=Response)
+def get(request: Request, z: int, x: int, y: int, img_format: str, ty_code: str, issue_ts: int,
+        group: TyphoonGroupEnum = TyphoonGroupEnum.GROUP_CENTER,
+        colormap: str = SURGE_TILE_OPTIONS.get('default_colormap', 'surge'),
+        coverage_dao: CoverageDao = Depends(get_coverage_dao)):
+    """
+        + 26-10-18 在服务端根据 zmax geotiff 渲染瓦片
+        瓦片缓存于内存及磁盘(key 包含源文件的修改时间及大小，文件被覆盖后重新渲染)
+        url 中不包含文件版本，客户端以 (修改时间, 大小) 作为 ETag 重新验证(与淹没矢量瓦片一致)
+        瓦片与增水场不相交(或全部为无效值)时返回 204(不缓存)
+    """
+    if img_format not in TILE_IMAGE_DRIVERS:
+        raise HTTPException(status_code=400, detail=f'不支持的瓦片格式:{img_format}')
+    if colormap not in SURGE_COLORMAPS:
+        raise HTTPException(status_code=400, detail=f'不支持的色标:{colormap}')
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail=f'无效的瓦片:{z}/{x}/{y}')
+    file_path: Optional[str] = coverage_dao.get_tif_local_path(ty_code, issue_ts, TyphoonGroupEnum(group))
+    if file_path is None:
+        raise HTTPException(status_code=404, detail='不存在对应的增水场文件')
+    try:
+        etag: str = '"{}-{}"'.format(*file_version(file_path))
+        headers: Dict[str, str] = {'Cache-Control': 'public, no-cache', 'ETag': etag}
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+        data: bytes = get_tile_service().get_tile(file_path, z, x, y, colormap, img_format)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+    if not data:
+        return Response(status_code=204, headers={'Cache-Control': 'no-store'})
+    return Response(content=data, media_type=f'image/{img_format}', headers=headers)
+
+
+@app.post('/surge/max/sample',
+          summary="批量获取点位(或全部站点)在各集合成员增水场中的最大增水", response_model=SurgeSampleResultSchema)
+def post(params: SurgeSampleParamsSchema, coverage_dao: CoverageDao = Depends(get_coverage_dao),
+         station_dao: StationDao = Depends(get_station_dao)):
+    """
+        + 26-10-18 服务端批量采样 zmax，避免客户端下载整个 geotiff
+        结果按列返回，members 中每个成员的 values 与 codes/lons/lats 顺序一致
+    """
+    codes: List[Optional[str]]
+    lons: List[float]
+    lats: List[float]
+    if params.all_stations:
+        stations: List[StionInfoSchema] = station_dao.get_all_stations()
+        codes = [temp.station_code for temp in stations]
+        lons = [temp.lon for temp in stations]
+        lats = [temp.lat for temp in stations]
+    else:
+        codes = [temp.code for temp in params.points]
+        lons = [temp.lon for temp in params.points]
+        lats = [temp.lat for temp in params.points]
+    file_paths: Dict[int, str] = coverage_dao.get_tif_local_paths(params.ty_code, params.issue_ts)
+    if len(file_paths) == 0:
+        raise HTTPException(status_code=404, detail='不存在对应的增水场文件')
+    try:
+        samples = get_sampler().sample_files(file_paths, lons, lats)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
+    members: List[SurgeMemberSampleSchema] = [
+        SurgeMemberSampleSchema(group_type=group_type, values=to_json_values(values)) for group_type, values in
+        samples.items()]
+    return SurgeSampleResultSchema(codes=codes, lons=lons, lats=lats, members=members)
+
+
 @app.get('/flood/grid/url',
          summary="漫滩预报淹没范围", response_model=str)
-async def get(ty_code: str, issue_ts: int):
+def get(ty_code: str, issue_ts: int, coverage_dao: CoverageDao = Depends(get_coverage_dao)):
+    """
+        TODO:[-] 26-10-18 不再返回写死的 url，改为查询淹没产品流水线登记的淹没深度 geotiff(不存在时返回 '')
+    """
     try:
-        # TODO:[*]
-        # geotiff_url: str = 'http://localhost:82/images/TYPHOON\data/user1/flood_path/2025/2106/1746777768768/output_processed.tif'
-        geotiff_url: str = 'http://localhost:82/images/TYPHOON\data/user1/flood_path/2025/2106/1746777768768/ningbo_test_250611_masked.tif'
-        # geotiff_url: str = 'http://localhost:82/images/TYPHOON\data/user1/flood_path/2025/2106/1746777768768/output.tif'
+        geotiff_url: str = coverage_dao.get_flood_file_url(ty_code, issue_ts, RasterFileType.FLOOD_DEPTH)
         return geotiff_url
 
     except Exception as e:
@@ -102,13 +179,14 @@ async def get(ty_code: str, issue_ts: int):
 
 @app.get('/flood/grid/level/url',
          summary="根据淹没的等级(level)获取对应的淹没范围geotiff", response_model=str)
-async def get(ty_code: str, issue_ts: int, gt_level_val: int):
+def get(ty_code: str, issue_ts: int, gt_level_val: int, coverage_dao: CoverageDao = Depends(get_coverage_dao)):
+    """
+        TODO:[-] 26-10-18 查询淹没产品流水线登记的对应等级的 geotiff(不存在时返回 '')
+    """
     try:
         gt_level: FloodAreaLevelEnum = FloodAreaLevelEnum(gt_level_val)
-        # TODO:[*]
-        geotiff_url: str = 'http://localhost:82/images/TYPHOON\data/user1/flood_path/2025/2106/1746777768768/'
-        file_name: str = get_flood_area_tif_name(gt_level)
-        geotiff_url = geotiff_url + file_name
+        geotiff_url: str = coverage_dao.get_flood_file_url(ty_code, issue_ts, RasterFileType.FLOOD_LEVEL,
+                                                           gt_level.value)
         return geotiff_url
 
     except Exception as e:
@@ -1,28 +1,60 @@
-from http.client import HTTPException
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
 
 from common.enums import FloodAreaLevelEnum
+from config.settings import GEOJSON_CACHE_OPTIONS
+from core.mvt import MVT_MEDIA_TYPE, get_mvt_service
+from core.tiles import is_valid_tile
 from dao.floodplain import FloodPlainDao
+from db.db import get_db_session
 from schema.geo import GeoPolygonSchema, GeoFloodPolygonSchema, FloodPolygonFeatureCollectionSchema
+from util.geo_util import parse_bbox
+from util.geojson_cache import CompressedBytesCache, dumps, json_response
 
 app = APIRouter()
 
+geojson_cache = CompressedBytesCache(max_items=GEOJSON_CACHE_OPTIONS.get('max_items', 256),
+                                     max_bytes=GEOJSON_CACHE_OPTIONS.get('max_mb', 128) * 1024 * 1024,
+                                     compress_level=GEOJSON_CACHE_OPTIONS.get('compress_level', 6))
+"""+ 26-10-18 淹没多边形响应缓存(gzip 压缩后的 json bytes)"""
+
+
+def get_floodplain_dao(session: Session = Depends(get_db_session)):
+    return FloodPlainDao(session)
+
 
 @app.get('/flood/polygons',
          summary="根据group获取对应的增水场url", response_model=List[GeoPolygonSchema])
-async def get(ty_code: str, issue_ts: int):
+def get(request: Request, ty_code: str, issue_ts: int, bbox: Optional[str] = None,
+        flood_dao: FloodPlainDao = Depends(get_floodplain_dao)):
     """
         根据 ty_code 获取对应台风的路径(实况|预报)
+        TODO:[-] 26-10-18 结果序列化一次后缓存，重复请求直接返回缓存的 bytes
+        TODO:[-] 26-10-18 bbox(min_lng,min_lat,max_lng,max_lat) 不为空时只查询与视口相交的多边形(不缓存)
+        TODO:[-] 26-10-18 缓存的 key 包含多边形的版本，淹没产品重新生成后不再命中之前的缓存
     :param params:
     :return:
     """
     try:
-        """集合路径对应的类型"""
-        flood_dao = FloodPlainDao()
-        schemas = flood_dao.get_polygons_by_typhoon(ty_code, issue_ts)
-        return schemas
+        bbox_val = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        if bbox_val is not None:
+            return Response(content=dumps(flood_dao.get_polygon_features_by_typhoon(ty_code, issue_ts, bbox_val)),
+                            media_type='application/json')
+        version = flood_dao.get_polygons_version(ty_code, issue_ts)
+        if version[0] == 0:
+            # 产品可能尚未生成，空结果不缓存
+            return []
+        cache_key = ('polygons', ty_code, issue_ts) + version
+        compressed: Optional[bytes] = geojson_cache.get(cache_key)
+        if compressed is None:
+            features: List[dict] = flood_dao.get_polygon_features_by_typhoon(ty_code, issue_ts)
+            compressed = geojson_cache.put(cache_key, dumps(features))
+        return json_response(request, compressed)
 
     except Exception as e:
         # 异常处理
@@ -56,14 +88,33 @@ async def get(ty_code: str, issue_ts: int):
 @app.get('/flood/grid/level/polygon',
          summary="根据淹没的等级(level)获取对应的淹没范围geotiff",
          response_model=FloodPolygonFeatureCollectionSchema)
-async def get(ty_code: str, issue_ts: int, gt_level_val: int):
+def get(request: Request, ty_code: str, issue_ts: int, gt_level_val: int, bbox: Optional[str] = None,
+        dao: FloodPlainDao = Depends(get_floodplain_dao)):
+    """
+        TODO:[-] 26-10-18 FeatureCollection 序列化一次后缓存，重复请求直接返回缓存的 bytes
+        TODO:[-] 26-10-18 bbox(min_lng,min_lat,max_lng,max_lat) 不为空时只查询与视口相交的多边形(不缓存)
+        TODO:[-] 26-10-18 缓存的 key 包含多边形的版本，淹没产品重新生成后不再命中之前的缓存
+    """
+    try:
+        bbox_val = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         gt_level: FloodAreaLevelEnum = FloodAreaLevelEnum(gt_level_val)
-        # TODO:[*]
-        dao = FloodPlainDao()
-        floodPolygonSchema = dao.get_fooldlevel_polygons_by_ty(ty_code, issue_ts, gt_level)
-        schemas = FloodPolygonFeatureCollectionSchema(type='FeatureCollection', features=floodPolygonSchema)
-        return schemas
+        if bbox_val is not None:
+            features: List[dict] = dao.get_floodlevel_polygon_features(ty_code, issue_ts, gt_level, bbox_val)
+            return Response(content=dumps({'type': 'FeatureCollection', 'features': features}),
+                            media_type='application/json')
+        version = dao.get_floodlevel_polygons_version(ty_code, issue_ts, gt_level)
+        if version[0] == 0:
+            # 产品可能尚未生成，空结果不缓存
+            return FloodPolygonFeatureCollectionSchema(type='FeatureCollection', features=[])
+        cache_key = ('flood_level', ty_code, issue_ts, gt_level.value) + version
+        compressed: Optional[bytes] = geojson_cache.get(cache_key)
+        if compressed is None:
+            features: List[dict] = dao.get_floodlevel_polygon_features(ty_code, issue_ts, gt_level)
+            compressed = geojson_cache.put(cache_key, dumps({'type': 'FeatureCollection', 'features': features}))
+        return json_response(request, compressed)
 
     except Exception as e:
         # 异常处理
@@ -71,3 +122,35 @@ async def get(ty_code: str, issue_ts: int, gt_level_val: int):
             status_code=500,
             detail=str(e)
         )
+
+
+@app.get('/flood/tiles/{z}/{x}/{y}.mvt',
+         summary="淹没等级多边形矢量瓦片(Mapbox Vector Tile)", response_class=Response)
+def get(request: Request, z: int, x: int, y: int, ty_code: str, issue_ts: int, level: int,
+        dao: FloodPlainDao = Depends(get_floodplain_dao)):
+    """
+        + 26-10-18 按瓦片裁剪、按级别抽稀并量化后的淹没等级多边形
+        同一批次的多边形只查询一次，瓦片缓存于内存及磁盘
+        批次及瓦片缓存的 key 包含多边形的版本(淹没产品重新生成后不再命中)，客户端以版本作为 ETag 重新验证
+        瓦片中没有多边形时返回 204
+    """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail=f'无效的瓦片:{z}/{x}/{y}')
+    try:
+        flood_level: FloodAreaLevelEnum = FloodAreaLevelEnum(level)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f'不支持的淹没等级:{level}')
+    try:
+        version = dao.get_floodlevel_polygons_version(ty_code, issue_ts, flood_level)
+        etag: str = '"{}-{}"'.format(*version)
+        headers: dict = {'Cache-Control': 'public, no-cache', 'ETag': etag}
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+        data: bytes = b'' if version[0] == 0 else get_mvt_service().get_tile(
+            (ty_code, issue_ts, flood_level.value) + version, z, x, y,
+            lambda: dao.get_floodlevel_polygon_features(ty_code, issue_ts, flood_level))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if len(data) == 0:
+        return Response(status_code=204)
+    return Response(content=data, media_type=MVT_MEDIA_TYPE, headers=headers)
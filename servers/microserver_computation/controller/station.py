@@ -6,22 +6,26 @@ import requests
 from lxml import etree
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
 from common.default import DEFAULT_CODE
 from common.enums import TyphoonGroupEnum
 from common.exceptions import NoExistTargetTyphoon
 from common.util import ms_2_s
 from dao.stations import StationDao
+from db.db import get_db_session
 from schema.common import ResponseModel
-from schema.stations import StionInfoSchema, StationGroupSurgeSchema, StationTideSchema
+from schema.stations import StionInfoSchema, StationGroupSurgeSchema, StationTideSchema, \
+    StationGroupSurgeBatchParamsSchema, StationGroupSurgeBatchSchema
 from schema.task import TyGroupTaskSchema
 from schema.typhoon import TyphoonPathSchema, TyphoonPathComplexSchema, TyphoonDistGroupSchema
+from util.series_codec import negotiate_media_type, series_response
 
 app = APIRouter()
 
 
-def get_station_dao():
-    return StationDao()
+def get_station_dao(session: Session = Depends(get_db_session)):
+    return StationDao(session)
 
 
 @app.get('/all/list',
@@ -47,22 +51,52 @@ async def get(station_dao: StationDao = Depends(get_station_dao)):
 
 
 @app.get('/surge/group/', summary="获取所有站点信息", response_model=List[StationGroupSurgeSchema])
-async def get_station_group_surgelist(station_code: str, ty_code: str, issue_ts: int,
+async def get_station_group_surgelist(request: Request, station_code: str, ty_code: str, issue_ts: int,
                                       station_dao: StationDao = Depends(get_station_dao)):
     """
         获取对应站点的增水集合
+        + 26-10-18 Accept 为列式格式(见 util/series_codec.py)时返回列式数据
     @return:
     """
     group_type: TyphoonGroupEnum = TyphoonGroupEnum.GROUP_CENTER
     # TODO:[-] 25-06-25 注意将 ms => s
     issue_ts_seconds: int = ms_2_s(issue_ts)
+    media_type: Optional[str] = negotiate_media_type(request)
+    if media_type is not None:
+        return series_response(station_dao.get_stations_groupsurge_frame(ty_code, issue_ts_seconds, [station_code]),
+                               media_type)
     # station_dao = StationDao()
     station_groups = station_dao.get_station_groupsurge(station_code, ty_code, issue_ts_seconds, group_type)
     return station_groups
 
 
+@app.post('/surge/group/batch', summary="批量获取多个站点(或全部站点)的集合增水",
+          response_model=List[StationGroupSurgeBatchSchema])
+def post_station_group_surgelist(request: Request, params: StationGroupSurgeBatchParamsSchema,
+                                 station_dao: StationDao = Depends(get_station_dao)):
+    """
+        + 26-10-18 一次请求返回多个站点的全部集合路径增水，替代逐站点调用 /surge/group/
+        结果按 station_codes 的顺序返回(all_stations 时按站点代码排序)，不存在预报结果的站点不返回
+        Accept 为列式格式时按站点代码排序返回列式数据
+    """
+    issue_ts_seconds: int = ms_2_s(params.issue_ts)
+    station_codes: Optional[List[str]] = None if params.all_stations else list(dict.fromkeys(params.station_codes))
+    media_type: Optional[str] = negotiate_media_type(request)
+    if media_type is not None:
+        return series_response(station_dao.get_stations_groupsurge_frame(params.ty_code, issue_ts_seconds,
+                                                                         station_codes), media_type)
+    station_groups = station_dao.get_stations_groupsurge(params.ty_code, issue_ts_seconds, station_codes)
+    codes: List[str] = station_codes if station_codes is not None else list(station_groups.keys())
+    return [StationGroupSurgeBatchSchema(station_code=code, groups=station_groups[code]) for code in codes if
+            code in station_groups]
+
+
 @app.get('/tide/list/', summary="获取所有站点信息", response_model=List[StationTideSchema])
-async def get_station_group_surgelist(station_code: str, start_ts: int, end_ts: int,
+async def get_station_group_surgelist(request: Request, station_code: str, start_ts: int, end_ts: int,
                                       station_dao: StationDao = Depends(get_station_dao)):
+    # + 26-10-18 Accept 为列式格式时返回列式数据
+    media_type: Optional[str] = negotiate_media_type(request)
+    if media_type is not None:
+        return series_response(station_dao.get_tide_frame(station_code, start_ts, end_ts), media_type)
     res = station_dao.get_tide_list(station_code, start_ts, end_ts)
     return res
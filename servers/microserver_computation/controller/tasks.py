@@ -6,12 +6,14 @@ import requests
 from lxml import etree
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
 from common.default import DEFAULT_CODE
 from common.exceptions import NoExistTargetTyphoon
 from config.celery_config import celery_app
 from core.jobs import JobGenerateTyphoonPathFile
 from dao.jobs import TaskDao, execute_ty_model
+from db.db import get_db_session
 from models.mid_models import TyDetailMidModel, TyPathMidModel
 from schema.common import ResponseModel
 from schema.task import TyGroupTaskSchema
@@ -20,6 +22,10 @@ from schema.typhoon import TyphoonPathSchema, TyphoonPathComplexSchema, TyphoonP
 app = APIRouter()
 
 
+def get_task_dao(session: Session = Depends(get_db_session)):
+    return TaskDao(session)
+
+
 @app.post('/create/typhoon/path',
           summary="获取提交的作业请求")
 async def post(params: TyphoonPathComplexDetailSchema):
@@ -62,7 +68,7 @@ async def post(params: TyphoonPathComplexDetailSchema):
 
 @app.post('/create/typhoon/surge',
           summary="获取提交的作业请求")
-async def get(params: TyphoonPathComplexSchema):
+async def get(params: TyphoonPathComplexSchema, job_dao: TaskDao = Depends(get_task_dao)):
     """
         根据 ty_code 获取对应台风的路径(实况|预报)
     :param params:
@@ -72,7 +78,6 @@ async def get(params: TyphoonPathComplexSchema):
         #
         print(f"Received typhoon path data: {params.dict()}")
         now_ts = arrow.utcnow().int_timestamp
-        job_dao = TaskDao()
         job_dao.submit_surge_task(1, params)
         # 测试——返回提交的数据集
         return ResponseModel(
@@ -91,14 +96,13 @@ async def get(params: TyphoonPathComplexSchema):
 
 @app.get('/get/task/list', response_model=List[TyGroupTaskSchema],
          summary="爬取中央气象台的台风路径")
-def get(code: str):
+def get(code: str, job_dao: TaskDao = Depends(get_task_dao)):
     """
         获取台风对应的任务列表
         TODO:[*] 25-05-13 此处需要修改 url 为 group/list 目前不从 task 获取对应的 group
     @param code:
     @return:
     """
-    job_dao = TaskDao()
     # issue_ts: int = 1747125125
     res = job_dao.get_task_list(code)
     return res
@@ -6,6 +6,7 @@ import requests
 from lxml import etree
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
 from common.default import DEFAULT_CODE
 from common.enums import TyphoonGroupEnum
@@ -13,17 +14,23 @@ from common.exceptions import NoExistTargetTyphoon
 from core.jobs import JobGenerateTyphoonPathFile
 from dao.jobs import TaskDao
 from dao.typhoon import TyphoonDao
+from db.db import get_db_session
 from models.mid_models import TyDetailMidModel, TyPathMidModel
 from schema.common import ResponseModel
 from schema.task import TyGroupTaskSchema
 from schema.typhoon import TyphoonPathSchema, TyphoonPathComplexSchema, TyphoonDistGroupSchema
+from util.series_codec import negotiate_media_type, series_response
 
 app = APIRouter()
 
 
+def get_typhoon_dao(session: Session = Depends(get_db_session)):
+    return TyphoonDao(session)
+
+
 @app.get('/typhoon/group/dist',
          summary="获取指定台风的不同的集合", response_model=List[TyphoonDistGroupSchema])
-async def get(ty_code: str):
+async def get(ty_code: str, typhoon_dao: TyphoonDao = Depends(get_typhoon_dao)):
     """
         根据 ty_code 获取对应台风的路径(实况|预报)
     :param params:
@@ -31,7 +38,6 @@ async def get(ty_code: str):
     """
     try:
         #
-        typhoon_dao = TyphoonDao()
         res = typhoon_dao.get_group_list(ty_code)
         return res
 
@@ -45,17 +51,18 @@ async def get(ty_code: str):
 
 @app.get('/typhoon/grouppath/list',
          summary="获取指定任务创建的所有集合路径集合", response_model=List[TyphoonPathComplexSchema])
-async def get(ty_code: str, issue_ts):
+async def get(request: Request, ty_code: str, issue_ts: int, typhoon_dao: TyphoonDao = Depends(get_typhoon_dao)):
     """
-
+        + 26-10-18 Accept 为列式格式(见 util/series_codec.py)时返回列式数据
     @param ty_code:
     @param issue_ts:
     @return:
     """
     try:
         #
-
-        typhoon_dao = TyphoonDao()
+        media_type: Optional[str] = negotiate_media_type(request)
+        if media_type is not None:
+            return series_response(typhoon_dao.get_grouppath_frame(ty_code, issue_ts), media_type)
         res = typhoon_dao.get_grouppath_list(ty_code, issue_ts)
         return res
 
@@ -69,7 +76,7 @@ async def get(ty_code: str, issue_ts):
 
 @app.get('/typhoon/grouppath/detail/list',
          summary="根据台风编号以及发布时间戳获取5中集合路径的信息", response_model=List[TyphoonPathComplexSchema])
-async def get(ty_code: str, issue_ts):
+async def get(ty_code: str, issue_ts, typhoon_dao: TyphoonDao = Depends(get_typhoon_dao)):
     """
         获取指定case的5种集合路径信息
     @param ty_code:
@@ -79,7 +86,6 @@ async def get(ty_code: str, issue_ts):
     try:
         #
 
-        typhoon_dao = TyphoonDao()
         res = typhoon_dao.get_dist_grouppath_list(ty_code, issue_ts)
         return res
 
@@ -3,17 +3,17 @@ from typing import List
 import arrow
 import pathlib
 import xarray as xr
-import pandas as pd
 from sqlalchemy.orm import scoped_session, Session
 
 from common.default import DEFAULT_RELATIVE_PATH, MS_UNIT
 from common.enums import TyphoonForecastInstitutionEnum, RasterFileType, TyphoonGroupEnum, NullEnum
 from common.util import get_ty_group_enum
 from config.store_config import STORE_CONFIG
-from core.transformers import SurgeTransformer
-from models.mid_models import TyForecastRealDataMidModel, ForecastSurgeRasterFile
+from core.raster_engine import SurgeRasterConvertEngine
+from models.mid_models import ForecastSurgeRasterFile
 from models.models import TyphoonForecastDetailinfo, TyphoonForecastGrouppath, TyphoonForecastRealdata, \
     GeoCoverageFiles, TaskJobs, RelaGroupPathTask, RelaTaskFiles
+from util.model_output_parser import TyTrackArrays, read_ty_track_txt
 
 
 class JobGenerateTyphoonPathFile:
@@ -72,39 +72,19 @@ class JobGenerateTyphoonPathFile:
             #         self.read_ty_path(str(temp_file))
         return path_files
 
-    def read_ty_path(self, file_path: str) -> List[TyForecastRealDataMidModel]:
+    def read_ty_path(self, file_path: str) -> TyTrackArrays:
         """
             读取指定路径的台风路径文件并提取台风路径信息并返回
-        """
-        df: pd.DataFrame = None
-        ty_realdata: List[TyForecastRealDataMidModel] = []
-        if pathlib.Path(file_path).exists():
-            # 使用空格分割;不使用header;指定读取的列名
-            """
-                eg: 
+            eg:
                 'datetime', 'longitude', 'latitude', 'pressure', 'wind'
-                2024090517,112.20000,19.20000,905.00000,26.00000
-                2024090518,112.12000,19.30000,905.20000,26.10000
-                2024090519,112.00000,19.40000,905.00000,26.00000
-                2024090520,111.83000,19.50000,904.30000,25.80000
-                2024090521,111.61000,19.61000,903.40000,25.70000
-
-            """
-            df = pd.read_csv(file_path, sep='\s+', header=None,
-                             names=['datetime', 'longitude', 'latitude', 'pressure', 'wind'])
-            # 逐行读取台风时间以及经纬度和气压以及最大风速
-            for row in df.itertuples():
-                # TODO[*] 25-04-30 此处的时间是世界时还是本地时间？
-                # Pandas(Index=0, datetime=2024090517, longitude=112.2, latitude=19.2, pressure=905.0, wind=26.0)
-                temp_dt_str: int = row.datetime
-                temp_local_ar: arrow.Arrow = arrow.get(str(temp_dt_str), "YYYYMMDDHH", tzinfo="Asia/Shanghai")
-                temp_utc_ar: arrow.Arrow = temp_local_ar.to('UTC')
-                temp_ty_realdata = TyForecastRealDataMidModel(row.latitude, row.longitude, row.pressure,
-                                                              temp_utc_ar.int_timestamp, '',
-                                                              [])
-                ty_realdata.append(temp_ty_realdata)
-
-        return ty_realdata
+                2024090517 112.20000 19.20000 905.00000 26.00000
+                2024090518 112.12000 19.30000 905.20000 26.10000
+            TODO:[-] 26-10-18 由逐行 arrow 转换时区改为 read_ty_track_txt 一次性读取，时间为北京时并统一转换为世界时
+            遍历返回值得到的 TyTrackPoint 与原 TyForecastRealDataMidModel 具有相同的 lat,lon,bp,ts,forecast_dt 属性
+        """
+        if not pathlib.Path(file_path).exists():
+            return TyTrackArrays.empty()
+        return read_ty_track_txt(file_path)
 
     def to_do(self, session: scoped_session[Session]):
         """
@@ -270,13 +250,9 @@ class JobGenerateSurgeRasterPathFile:
         @param coverage_files:
         @return:
         """
-        tiff_files: List[ForecastSurgeRasterFile] = []
-        """转换后的geotiff文件集合"""
-        for temp_file in coverage_files:
-            temp_file_transformer = SurgeTransformer(temp_file, task_job.id)
-            temp_file_transformer.read_data()
-            temp_geo_tiff_file = temp_file_transformer.out_put()
-            tiff_files.append(temp_geo_tiff_file)
+        # TODO:[-] 26-10-18 各集合成员并行转换(进程数及 GDAL 线程数见 SURGE_RASTER_CONVERT_OPTIONS)
+        tiff_files: List[ForecastSurgeRasterFile] = SurgeRasterConvertEngine().convert(coverage_files, task_job.id)
+        """转换后的geotiff文件集合(与 coverage_files 顺序一致)"""
         return tiff_files
 
     def batch2db(self, session: scoped_session[Session], task_job: TaskJobs,
@@ -292,7 +268,7 @@ class JobGenerateSurgeRasterPathFile:
         list_geo_coverages: List[GeoCoverageFiles] = [
             GeoCoverageFiles(task_id=task_job.id, ty_code=task_job.ty_code, relative_path=temp.relative_path,
                              file_name=temp.file_name, issue_ts=temp.issue_ts, issue_dt=temp.issue_dt,
-                             coverage_type=coverage_type.value) for temp in
+                             coverage_type=coverage_type.value, raster_layout=temp.raster_layout.value) for temp in
             coverage_files]
         for temp_coverage in list_geo_coverages:
             session.add(temp_coverage)
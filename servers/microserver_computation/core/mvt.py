@@ -0,0 +1,326 @@
+"""
+    淹没范围矢量瓦片(Mapbox Vector Tile)
+    - 同一批次(台风, 发布时间, 淹没等级)的多边形只查询一次，投影至 Web-Mercator 后缓存在进程内(并建立 STRtree)
+    - 每个瓦片(shapely 向量化): 按范围筛选 -> 转换至瓦片坐标 -> 裁剪(外扩 buffer) -> 抽稀 -> 量化为整数 -> 剔除过小的环
+      抽稀容差与面积阈值均为瓦片坐标，低级别下同样的容差对应更大的地理距离，即按级别简化
+    - 按 MVT 2.1 规范直接编码 protobuf(只有一个图层及多边形要素，不引入 mapbox-vector-tile)
+"""
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+from shapely.geometry.polygon import orient
+
+from config.settings import FLOOD_MVT_OPTIONS
+from core.tiles import tile_bounds_mercator
+from util.tile_cache import TileLRUCache
+
+MVT_MEDIA_TYPE: str = 'application/vnd.mapbox-vector-tile'
+
+MERCATOR_MAX_LAT: float = 85.0511287798066
+EARTH_RADIUS: float = 6378137.0
+
+CMD_MOVE_TO: int = 1
+CMD_LINE_TO: int = 2
+CMD_CLOSE_PATH: int = 7
+GEOM_TYPE_POLYGON: int = 3
+
+
+class ProjectedPolygons:
+    """
+        一个批次投影至 Web-Mercator 的多边形
+    """
+    __slots__ = ('geoms', 'properties', 'tree')
+
+    def __init__(self, geoms: np.ndarray, properties: List[Dict[str, Any]]):
+        self.geoms: np.ndarray = geoms
+        """shapely Polygon 数组(MultiPolygon 已拆分)"""
+        self.properties: List[Dict[str, Any]] = properties
+        self.tree: shapely.STRtree = shapely.STRtree(geoms)
+        """按瓦片范围筛选多边形"""
+
+
+def lonlat_to_mercator(coords: np.ndarray) -> np.ndarray:
+    """
+        经纬度 -> Web-Mercator(m)
+    @param coords: (n, 2) (lng, lat)
+    @return:
+    """
+    lons: np.ndarray = coords[:, 0]
+    lats: np.ndarray = np.clip(coords[:, 1], -MERCATOR_MAX_LAT, MERCATOR_MAX_LAT)
+    xs: np.ndarray = np.radians(lons) * EARTH_RADIUS
+    ys: np.ndarray = np.log(np.tan(np.pi / 4 + np.radians(lats) / 2)) * EARTH_RADIUS
+    return np.column_stack([xs, ys])
+
+
+def project_features(features: List[dict], property_names: List[str]) -> ProjectedPolygons:
+    """
+        将 GeoJSON 多边形(Polygon | MultiPolygon)投影至 Web-Mercator
+        MultiPolygon 拆分为多个多边形，属性相同
+    @param features: [{'geom': {...}, 'value': ..., ...}]
+    @param property_names: 写入瓦片的属性字段
+    @return:
+    """
+    geoms: np.ndarray = np.array([shape(feature['geom']) for feature in features], dtype=object)
+    parts, indexes = shapely.get_parts(shapely.transform(geoms, lonlat_to_mercator), return_index=True)
+    keep: np.ndarray = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & ~shapely.is_empty(parts)
+    properties: List[Dict[str, Any]] = [{name: feature.get(name) for name in property_names
+                                         if feature.get(name) is not None} for feature in features]
+    return ProjectedPolygons(parts[keep], [properties[index] for index in indexes[keep]])
+
+
+def ring_area(ring: np.ndarray) -> float:
+    """
+        带符号面积(鞋带公式)，瓦片坐标(y 向下)下顺时针为正
+    """
+    xs, ys = ring[:, 0], ring[:, 1]
+    return float(np.dot(xs, np.roll(ys, -1)) - np.dot(np.roll(xs, -1), ys)) / 2
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 31)
+
+
+def encode_polygon_geometry(rings: List[np.ndarray]) -> List[int]:
+    """
+        编码多边形的几何指令(坐标为相对上一个点的增量)
+    @param rings: 量化后的环(int64 (n, 2)，不含闭合点，外环在前且方向已调整)
+    @return:
+    """
+    commands: List[int] = []
+    cursor: np.ndarray = np.zeros(2, dtype=np.int64)
+    for ring in rings:
+        deltas: np.ndarray = np.diff(np.vstack([cursor, ring]), axis=0)
+        zigzag: List[int] = [_zigzag(int(temp)) for temp in deltas.ravel()]
+        commands.append((CMD_MOVE_TO & 0x7) | (1 << 3))
+        commands.extend(zigzag[:2])
+        commands.append((CMD_LINE_TO & 0x7) | ((len(ring) - 1) << 3))
+        commands.extend(zigzag[2:])
+        commands.append((CMD_CLOSE_PATH & 0x7) | (1 << 3))
+        cursor = ring[-1]
+    return commands
+
+
+def _varint(value: int) -> bytes:
+    data = bytearray()
+    while True:
+        byte: int = value & 0x7F
+        value >>= 7
+        if value:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+
+def _field_key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _field_bytes(field: int, payload: bytes) -> bytes:
+    return _field_key(field, 2) + _varint(len(payload)) + payload
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _field_key(field, 0) + _varint(value)
+
+
+def _field_packed(field: int, values: List[int]) -> bytes:
+    return _field_bytes(field, b''.join(_varint(temp) for temp in values))
+
+
+def _encode_value(value: Any) -> bytes:
+    """
+        Tile.Value: 1 string | 3 double | 6 sint64 | 7 bool
+    """
+    if isinstance(value, bool):
+        return _field_varint(7, int(value))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        return _field_varint(6, (value << 1) ^ (value >> 63))
+    if isinstance(value, (float, np.floating)):
+        return _field_key(3, 1) + struct.pack('<d', float(value))
+    return _field_bytes(1, str(value).encode('utf-8'))
+
+
+def encode_layer(name: str, features: List[Tuple[Dict[str, Any], List[int]]], extent: int) -> bytes:
+    """
+        编码 Tile(只包含一个图层)
+    @param name: 图层名
+    @param features: [(属性, 几何指令)]
+    @param extent:
+    @return:
+    """
+    keys: Dict[str, int] = {}
+    values: Dict[Tuple[type, Any], int] = {}
+    encoded_values: List[bytes] = []
+    layer = bytearray(_field_varint(15, 2))
+    layer += _field_bytes(1, name.encode('utf-8'))
+    for feature_id, (props, geometry) in enumerate(features, start=1):
+        tags: List[int] = []
+        for key, value in props.items():
+            key_index: int = keys.setdefault(key, len(keys))
+            value_key = (type(value), value)
+            if value_key not in values:
+                values[value_key] = len(encoded_values)
+                encoded_values.append(_encode_value(value))
+            tags.extend([key_index, values[value_key]])
+        feature: bytes = (_field_varint(1, feature_id) + _field_packed(2, tags) +
+                          _field_varint(3, GEOM_TYPE_POLYGON) + _field_packed(4, geometry))
+        layer += _field_bytes(2, feature)
+    for key in keys:
+        layer += _field_bytes(3, key.encode('utf-8'))
+    for value in encoded_values:
+        layer += _field_bytes(4, value)
+    layer += _field_varint(5, extent)
+    return _field_bytes(3, bytes(layer))
+
+
+class FloodMvtEncoder:
+    """
+        淹没范围矢量瓦片编码
+    """
+
+    def __init__(self, layer_name: str = 'flood', extent: int = 4096, buffer: int = 64,
+                 simplify_tolerance: float = 8.0, min_area: float = 64.0):
+        """
+        @param layer_name: 图层名
+        @param extent: 瓦片坐标范围
+        @param buffer: 裁剪时外扩的瓦片坐标(避免渲染时瓦片边缘出现描边)
+        @param simplify_tolerance: 抽稀容差(瓦片坐标，extent=4096 渲染为 256px 时 16 为 1 像素)
+        @param min_area: 小于该面积(瓦片坐标)的环不输出
+        """
+        self.layer_name = layer_name
+        self.extent = extent
+        self.buffer = buffer
+        self.simplify_tolerance = simplify_tolerance
+        self.min_area = min_area
+
+    def _tile_geoms(self, geoms: np.ndarray, left: float, top: float, scale: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+            将多边形转换为瓦片坐标下裁剪、抽稀并量化后的多边形
+        @return: (多边形, 对应的输入序号)，裁剪或量化后拆分的多边形序号相同，过小的多边形不输出
+        """
+        low: float = -self.buffer
+        high: float = self.extent + self.buffer
+        geoms = shapely.transform(geoms, lambda coords: np.column_stack([(coords[:, 0] - left) * scale,
+                                                                          (top - coords[:, 1]) * scale]))
+        geoms = shapely.clip_by_rect(geoms, low, low, high, high)
+        if self.simplify_tolerance > 0:
+            geoms = shapely.simplify(geoms, self.simplify_tolerance, preserve_topology=True)
+        # 量化至整数网格(结果保持有效，可能拆分为多个多边形)
+        geoms = shapely.set_precision(geoms, 1.0)
+        parts, indexes = shapely.get_parts(geoms, return_index=True)
+        keep: np.ndarray = ((shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) &
+                            (shapely.area(parts) >= self.min_area))
+        return parts[keep], indexes[keep]
+
+    def _tile_rings(self, polygon: shapely.Polygon) -> List[np.ndarray]:
+        """
+            多边形的环(int64，不含闭合点)，外环面积为正(瓦片坐标下顺时针)、内环为负，过小的内环不输出
+        """
+        polygon = orient(polygon, sign=1.0)
+        rings: List[np.ndarray] = [np.rint(np.asarray(polygon.exterior.coords)[:-1]).astype(np.int64)]
+        for interior in polygon.interiors:
+            ring: np.ndarray = np.rint(np.asarray(interior.coords)[:-1]).astype(np.int64)
+            if abs(ring_area(ring)) >= self.min_area:
+                rings.append(ring)
+        return rings
+
+    def encode(self, projected: ProjectedPolygons, z: int, x: int, y: int) -> bytes:
+        """
+            编码瓦片
+        @return: 瓦片中没有要素时返回 b''
+        """
+        left, bottom, right, top = tile_bounds_mercator(z, x, y)
+        scale: float = self.extent / (right - left)
+        margin: float = self.buffer / scale
+        candidates: np.ndarray = np.sort(projected.tree.query(shapely.box(left - margin, bottom - margin,
+                                                                          right + margin, top + margin)))
+        if len(candidates) == 0:
+            return b''
+        polygons, indexes = self._tile_geoms(projected.geoms[candidates], left, top, scale)
+        features: List[Tuple[Dict[str, Any], List[int]]] = [
+            (projected.properties[candidates[index]], encode_polygon_geometry(self._tile_rings(polygon)))
+            for polygon, index in zip(polygons, indexes)]
+        if len(features) == 0:
+            return b''
+        return encode_layer(self.layer_name, features, self.extent)
+
+
+class FloodMvtService:
+    """
+        矢量瓦片编码 + 缓存
+        - 批次缓存: (ty_code, issue_ts, flood_level, 多边形数, 最大 id) -> 投影后的多边形
+        - 瓦片缓存: (批次, z, x, y) -> 编码后的瓦片
+        批次包含多边形的版本，淹没产品重新生成后之前的缓存不再命中(按 LRU 淘汰)
+    """
+
+    def __init__(self):
+        self.encoder = FloodMvtEncoder(FLOOD_MVT_OPTIONS.get('layer_name', 'flood'),
+                                       FLOOD_MVT_OPTIONS.get('extent', 4096),
+                                       FLOOD_MVT_OPTIONS.get('buffer', 64),
+                                       FLOOD_MVT_OPTIONS.get('simplify_tolerance', 8.0),
+                                       FLOOD_MVT_OPTIONS.get('min_area', 64.0))
+        self.property_names: List[str] = FLOOD_MVT_OPTIONS.get('properties', ['value', 'flood_level'])
+        self.max_runs: int = FLOOD_MVT_OPTIONS.get('max_runs', 16)
+        self.cache = TileLRUCache(memory_max_items=FLOOD_MVT_OPTIONS.get('cache_memory_items', 4096),
+                                  memory_max_bytes=FLOOD_MVT_OPTIONS.get('cache_memory_mb', 128) * 1024 * 1024,
+                                  disk_dir=FLOOD_MVT_OPTIONS.get('cache_disk_dir'),
+                                  disk_max_bytes=FLOOD_MVT_OPTIONS.get('cache_disk_mb', 2048) * 1024 * 1024)
+        self._runs: 'OrderedDict[Tuple[Hashable, ...], ProjectedPolygons]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_projected(self, run_key: Tuple[Hashable, ...], loader: Callable[[], List[dict]]) -> ProjectedPolygons:
+        """
+            获取批次投影后的多边形，未缓存时通过 loader 查询
+            查询结果为空(产品可能尚未生成)时不缓存
+        """
+        with self._lock:
+            projected: Optional[ProjectedPolygons] = self._runs.get(run_key)
+            if projected is not None:
+                self._runs.move_to_end(run_key)
+                return projected
+        projected = project_features(loader(), self.property_names)
+        if len(projected.geoms) > 0:
+            with self._lock:
+                self._runs[run_key] = projected
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+        return projected
+
+    def get_tile(self, run_key: Tuple[Hashable, ...], z: int, x: int, y: int,
+                 loader: Callable[[], List[dict]]) -> bytes:
+        """
+        @param run_key: (ty_code, issue_ts, flood_level, 多边形数, 最大 id)
+        @param z:
+        @param x:
+        @param y:
+        @param loader: 查询批次多边形(GeoJSON 字典)
+        @return: 瓦片中没有要素时返回 b''
+        """
+        key = ('mvt',) + tuple(run_key) + (z, x, y)
+        data: Optional[bytes] = self.cache.get(key)
+        if data is None:
+            projected: ProjectedPolygons = self.get_projected(run_key, loader)
+            data = self.encoder.encode(projected, z, x, y)
+            if len(projected.geoms) > 0:
+                self.cache.put(key, data)
+        return data
+
+
+_mvt_service: Optional[FloodMvtService] = None
+
+
+def get_mvt_service() -> FloodMvtService:
+    """
+        每个进程共用一个矢量瓦片服务(缓存)
+    """
+    global _mvt_service
+    if _mvt_service is None:
+        _mvt_service = FloodMvtService()
+    return _mvt_service
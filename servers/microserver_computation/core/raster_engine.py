@@ -0,0 +1,108 @@
+"""
+    增水场 nc -> geotiff 并行转换
+    每个集合成员(及每个变量)的转换相互独立，使用进程池并行执行；GDAL 的线程数与块缓存在每个任务内通过 rasterio.Env 设置
+    返回结果的顺序与提交顺序一致(按 coverage_files 顺序，同一文件内按 var_names 顺序)
+"""
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import rasterio
+
+from common.default import NONE_ID
+from common.enums import RasterLayoutEnum
+from config.settings import SURGE_RASTER_CONVERT_OPTIONS
+from core.transformers import SurgeTransformer
+from models.mid_models import ForecastSurgeRasterFile
+
+
+def _convert_one(coverage_file: ForecastSurgeRasterFile, var_name: str, task_id: int,
+                 gdal_env: Dict[str, Any], layout: RasterLayoutEnum = RasterLayoutEnum.STRIPED,
+                 cog_options: Optional[dict] = None) -> Optional[ForecastSurgeRasterFile]:
+    """
+        转换单个 nc 文件中的指定变量(在子进程中执行，参数与返回值均需可序列化)
+    @param coverage_file: nc 文件
+    @param var_name: 变量名
+    @param task_id:
+    @param gdal_env: GDAL 配置项
+    @param layout: 输出布局
+    @param cog_options: COG 参数
+    @return: 输出的 geotiff 文件
+    """
+    with rasterio.Env(**gdal_env):
+        transformer = SurgeTransformer(coverage_file, task_id)
+        transformer.read_data(var_name)
+        return transformer.out_put(layout=layout, cog_options=cog_options)
+
+
+class SurgeRasterConvertEngine:
+    """
+        增水场栅格并行转换引擎
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, gdal_num_threads: Optional[str] = None,
+                 gdal_cachemax: Optional[int] = None, var_names: Optional[List[str]] = None,
+                 mp_context: Optional[str] = None, layout: Optional[RasterLayoutEnum] = None):
+        """
+            未指定的参数从 SURGE_RASTER_CONVERT_OPTIONS 中读取
+        @param max_workers: 并行进程数，<=1 时串行
+        @param gdal_num_threads: 每个进程内 GDAL 的线程数
+        @param gdal_cachemax: 每个进程 GDAL 块缓存(MB)
+        @param var_names: 需要转换的变量
+        @param mp_context: 进程启动方式 spawn|fork|forkserver
+        @param layout: 输出的 geotiff 布局
+        """
+        self.max_workers: int = max_workers if max_workers is not None else SURGE_RASTER_CONVERT_OPTIONS.get(
+            'max_workers', 1)
+        self.gdal_num_threads: str = str(gdal_num_threads if gdal_num_threads is not None else
+                                         SURGE_RASTER_CONVERT_OPTIONS.get('gdal_num_threads', '1'))
+        self.gdal_cachemax: int = gdal_cachemax if gdal_cachemax is not None else SURGE_RASTER_CONVERT_OPTIONS.get(
+            'gdal_cachemax', 256)
+        self.var_names: List[str] = var_names if var_names else SURGE_RASTER_CONVERT_OPTIONS.get(
+            'var_names', [SurgeTransformer.DEFAULT_VAR_NAME])
+        self.mp_context: str = mp_context if mp_context is not None else SURGE_RASTER_CONVERT_OPTIONS.get(
+            'mp_context', 'spawn')
+        self.layout: RasterLayoutEnum = layout if layout is not None else (
+            RasterLayoutEnum.COG if SURGE_RASTER_CONVERT_OPTIONS.get('layout') == 'cog' else RasterLayoutEnum.STRIPED)
+        self.cog_options: dict = SURGE_RASTER_CONVERT_OPTIONS.get('cog', {})
+
+    @property
+    def gdal_env(self) -> Dict[str, Any]:
+        return {'GDAL_NUM_THREADS': self.gdal_num_threads, 'GDAL_CACHEMAX': self.gdal_cachemax}
+
+    def _create_executor(self, count_jobs: int) -> Executor:
+        """
+            创建进程池
+            celery prefork 的 worker 为守护进程，不允许再创建子进程，此时回退为线程池
+            (netcdf 读取与 GDAL 写入时会释放 GIL，线程池同样可以并行)
+        """
+        workers: int = min(self.max_workers, count_jobs)
+        if multiprocessing.current_process().daemon:
+            return ThreadPoolExecutor(max_workers=workers)
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(self.mp_context))
+
+    def convert(self, coverage_files: List[ForecastSurgeRasterFile],
+                task_id: int = NONE_ID) -> List[ForecastSurgeRasterFile]:
+        """
+            批量将 nc 转换为 geotiff
+            任一文件转换失败时抛出对应的异常(FileReadError|FileTransformError|FileDontExists)
+        @param coverage_files: nc 文件集合
+        @param task_id:
+        @return: 转换后的 geotiff 文件集合(与提交顺序一致，跳过没有输出的文件)
+        """
+        jobs: List[Tuple[ForecastSurgeRasterFile, str]] = [(temp_file, var_name) for temp_file in coverage_files
+                                                            for var_name in self.var_names]
+        start: float = time.perf_counter()
+        results: List[Optional[ForecastSurgeRasterFile]]
+        if self.max_workers <= 1 or len(jobs) <= 1:
+            results = [_convert_one(temp_file, var_name, task_id, self.gdal_env, self.layout, self.cog_options) for
+                       temp_file, var_name in jobs]
+        else:
+            with self._create_executor(len(jobs)) as executor:
+                futures = [executor.submit(_convert_one, temp_file, var_name, task_id, self.gdal_env, self.layout,
+                                           self.cog_options) for temp_file, var_name in jobs]
+                # 按提交顺序收集结果，保证输出顺序确定
+                results = [future.result() for future in futures]
+        print(f"[-] nc->geotiff 转换完成:{len(jobs)}个，耗时:{time.perf_counter() - start:.2f}s")
+        return [temp for temp in results if temp is not None]
@@ -0,0 +1,191 @@
+"""
+    增水场批量点位采样
+    - 每个栅格文件只完整读取一次，读取后的数组缓存在进程内(按文件数 LRU 淘汰)
+      TODO:[-] 26-10-18 增水场 geotiff 会被新一次预报原地覆盖，按 (路径, 修改时间, 字节数) 缓存
+    - 点位 -> 像素行列号使用 numpy 向量化计算，并按 (网格定义, 点位集合) 缓存，
+      同一批次集合成员的网格一致，站点行列号只需计算一次
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.warp import transform as transform_coords
+
+from config.settings import SURGE_SAMPLE_OPTIONS
+from util.tile_cache import file_version
+
+GridKey = Tuple[Tuple[float, ...], int, int, str]
+"""网格定义: (affine 前 6 个系数, 宽, 高, crs)"""
+
+LONLAT_CRS: str = 'EPSG:4326'
+
+
+class SampleIndex:
+    """
+        点位在某一网格上的像素行列号
+    """
+    __slots__ = ('rows', 'cols', 'inside')
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, inside: np.ndarray):
+        self.rows: np.ndarray = rows
+        self.cols: np.ndarray = cols
+        self.inside: np.ndarray = inside
+        """是否落在网格范围内"""
+
+
+class RasterGrid:
+    """
+        缓存的栅格数组(nodata 已替换为 nan)
+    """
+    __slots__ = ('grid_key', 'values')
+
+    def __init__(self, grid_key: GridKey, values: np.ndarray):
+        self.grid_key: GridKey = grid_key
+        self.values: np.ndarray = values
+        """float32 (行, 列)"""
+
+
+def points_key(lons: np.ndarray, lats: np.ndarray) -> str:
+    """
+        点位集合的 hash(用于缓存行列号)
+    """
+    coords: np.ndarray = np.ascontiguousarray(np.stack([lons, lats]), dtype=np.float64)
+    return hashlib.sha1(coords.tobytes()).hexdigest()
+
+
+def compute_sample_index(grid_key: GridKey, lons: np.ndarray, lats: np.ndarray) -> SampleIndex:
+    """
+        向量化计算点位所在的像素行列号
+    @param grid_key:
+    @param lons: 经度
+    @param lats: 纬度
+    @return:
+    """
+    (a, b, c, d, e, f), width, height, crs = grid_key
+    xs, ys = lons, lats
+    if crs and crs != LONLAT_CRS:
+        xs, ys = (np.asarray(temp) for temp in transform_coords(LONLAT_CRS, crs, lons.tolist(), lats.tolist()))
+    # 仿射变换求逆: x = a*col + b*row + c ; y = d*col + e*row + f
+    det: float = a * e - b * d
+    dx: np.ndarray = xs - c
+    dy: np.ndarray = ys - f
+    cols: np.ndarray = np.floor((e * dx - b * dy) / det).astype(np.int64)
+    rows: np.ndarray = np.floor((a * dy - d * dx) / det).astype(np.int64)
+    inside: np.ndarray = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+    return SampleIndex(np.where(inside, rows, 0), np.where(inside, cols, 0), inside)
+
+
+class SurgeRasterSampler:
+    """
+        增水场采样器(线程安全)
+    """
+
+    def __init__(self, max_files: int = 32, max_indexes: int = 64):
+        """
+        @param max_files: 最多缓存的栅格文件数
+        @param max_indexes: 最多缓存的行列号集合数
+        """
+        self.max_files = max_files
+        self.max_indexes = max_indexes
+        self._grids: 'OrderedDict[Tuple[str, int, int], RasterGrid]' = OrderedDict()
+        self._indexes: 'OrderedDict[Tuple[GridKey, str], SampleIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_grid(file_path: str) -> RasterGrid:
+        with rasterio.open(file_path) as dataset:
+            values: np.ndarray = dataset.read(1, out_dtype='float32')
+            if dataset.nodata is not None:
+                values[values == dataset.nodata] = np.nan
+            grid_key: GridKey = (tuple(dataset.transform)[:6], dataset.width, dataset.height,
+                                 dataset.crs.to_string() if dataset.crs else '')
+        return RasterGrid(grid_key, values)
+
+    def get_grid(self, file_path: str) -> RasterGrid:
+        """
+            获取栅格数组(按文件路径及版本缓存，文件被覆盖后重新读取)
+        """
+        cache_key: Tuple[str, int, int] = (file_path, *file_version(file_path))
+        with self._lock:
+            grid: Optional[RasterGrid] = self._grids.get(cache_key)
+            if grid is not None:
+                self._grids.move_to_end(cache_key)
+                return grid
+        grid = self._read_grid(file_path)
+        with self._lock:
+            self._grids[cache_key] = grid
+            while len(self._grids) > self.max_files:
+                self._grids.popitem(last=False)
+        return grid
+
+    def get_index(self, grid_key: GridKey, lons: np.ndarray, lats: np.ndarray) -> SampleIndex:
+        """
+            获取点位行列号(按网格定义及点位集合缓存)
+        @param grid_key:
+        @param lons:
+        @param lats:
+        @return:
+        """
+        cache_key = (grid_key, points_key(lons, lats))
+        with self._lock:
+            index: Optional[SampleIndex] = self._indexes.get(cache_key)
+            if index is not None:
+                self._indexes.move_to_end(cache_key)
+                return index
+        index = compute_sample_index(grid_key, lons, lats)
+        with self._lock:
+            self._indexes[cache_key] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def sample(self, file_path: str, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """
+            采样单个栅格文件
+        @param file_path:
+        @param lons:
+        @param lats:
+        @return: float32 数组，范围外或无效值为 nan
+        """
+        grid: RasterGrid = self.get_grid(file_path)
+        index: SampleIndex = self.get_index(grid.grid_key, lons, lats)
+        values: np.ndarray = grid.values[index.rows, index.cols]
+        values[~index.inside] = np.nan
+        return values
+
+    def sample_files(self, file_paths: Dict[int, str], lons: np.ndarray, lats: np.ndarray) -> Dict[int, np.ndarray]:
+        """
+            对多个集合成员的栅格文件进行采样
+        @param file_paths: group_type -> 文件路径
+        @param lons:
+        @param lats:
+        @return: group_type -> 采样值
+        """
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        return {group_type: self.sample(file_path, lons, lats) for group_type, file_path in file_paths.items()}
+
+
+def to_json_values(values: np.ndarray, decimals: int = 3) -> List[Optional[float]]:
+    """
+        nan -> None
+    """
+    rounded: np.ndarray = np.round(values.astype(np.float64), decimals)
+    return [None if np.isnan(temp) else temp for temp in rounded.tolist()]
+
+
+_sampler: Optional[SurgeRasterSampler] = None
+
+
+def get_sampler() -> SurgeRasterSampler:
+    """
+        每个进程共用一个采样器(缓存)
+    """
+    global _sampler
+    if _sampler is None:
+        _sampler = SurgeRasterSampler(SURGE_SAMPLE_OPTIONS.get('max_files', 32),
+                                      SURGE_SAMPLE_OPTIONS.get('max_indexes', 64))
+    return _sampler
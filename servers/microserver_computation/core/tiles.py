@@ -0,0 +1,189 @@
+"""
+    增水场 XYZ 瓦片渲染
+    从已生成的 zmax geotiff 中按瓦片范围窗口读取(优先使用 COG 内部金字塔)，重投影至 Web-Mercator 后按色标渲染为 png|webp
+"""
+import math
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.io import MemoryFile
+from rasterio.transform import from_bounds
+from rasterio.warp import reproject, transform_bounds
+from rasterio.windows import Window, from_bounds as window_from_bounds
+
+from config.settings import SURGE_TILE_OPTIONS
+from util.tile_cache import TileLRUCache, file_version
+
+WEB_MERCATOR_CRS: str = 'EPSG:3857'
+WEB_MERCATOR_HALF: float = 20037508.342789244
+"""Web-Mercator 半周长(m)"""
+
+TILE_IMAGE_DRIVERS: Dict[str, str] = {'png': 'PNG', 'webp': 'WEBP'}
+"""瓦片格式 -> GDAL 驱动"""
+
+SURGE_COLORMAPS: Dict[str, List[Tuple[float, Tuple[int, int, int, int]]]] = {
+    # 增水(m): 负增水为蓝色，正增水由黄至深红
+    'surge': [(-1.0, (49, 54, 149, 255)), (-0.3, (116, 173, 209, 255)), (0.3, (255, 255, 191, 255)),
+              (1.0, (253, 174, 97, 255)), (2.0, (244, 109, 67, 255)), (3.0, (165, 0, 38, 255))],
+    'blues': [(0.0, (222, 235, 247, 255)), (1.0, (107, 174, 214, 255)), (3.0, (8, 48, 107, 255))],
+    # 集合超阈值概率(0~1)
+    'probability': [(0.0, (255, 255, 255, 0)), (0.2, (254, 217, 118, 255)), (0.6, (253, 141, 60, 255)),
+                    (1.0, (189, 0, 38, 255))],
+}
+"""色标: [(阈值, (r, g, b, a))]，阈值之间线性插值，超出范围取两端颜色"""
+
+
+def tile_bounds_mercator(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """
+        XYZ 瓦片对应的 Web-Mercator 范围
+    @return: (left, bottom, right, top)
+    """
+    tile_span: float = 2 * WEB_MERCATOR_HALF / (1 << z)
+    left: float = -WEB_MERCATOR_HALF + x * tile_span
+    top: float = WEB_MERCATOR_HALF - y * tile_span
+    return left, top - tile_span, left + tile_span, top
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 24 and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def apply_colormap(values: np.ndarray, colormap: str) -> np.ndarray:
+    """
+        按色标将数值渲染为 rgba，nan 为透明
+    @param values: float (h, w)
+    @param colormap: SURGE_COLORMAPS 中的名称
+    @return: uint8 (4, h, w)
+    """
+    stops = SURGE_COLORMAPS[colormap]
+    levels: np.ndarray = np.array([temp[0] for temp in stops], dtype=np.float64)
+    colors: np.ndarray = np.array([temp[1] for temp in stops], dtype=np.float64)
+    valid: np.ndarray = np.isfinite(values)
+    filled: np.ndarray = np.where(valid, values, levels[0])
+    rgba: np.ndarray = np.empty((4,) + values.shape, dtype=np.uint8)
+    for band in range(4):
+        rgba[band] = np.interp(filled, levels, colors[:, band]).round().astype(np.uint8)
+    rgba[3][~valid] = 0
+    return rgba
+
+
+def encode_tile(rgba: np.ndarray, img_format: str) -> bytes:
+    """
+        使用 GDAL PNG|WEBP 驱动编码 rgba 瓦片
+    """
+    driver: str = TILE_IMAGE_DRIVERS[img_format]
+    options: dict = {'lossless': 'TRUE'} if driver == 'WEBP' else {}
+    with warnings.catch_warnings(), MemoryFile() as mem_file:
+        # 瓦片图片不需要地理参考
+        warnings.simplefilter('ignore', NotGeoreferencedWarning)
+        with mem_file.open(driver=driver, width=rgba.shape[2], height=rgba.shape[1], count=4, dtype='uint8',
+                           **options) as dataset:
+            dataset.write(rgba)
+        return mem_file.read()
+
+
+class SurgeTileRenderer:
+    """
+        增水场瓦片渲染器
+    """
+
+    def __init__(self, tile_size: int = 256, resampling: str = 'bilinear'):
+        self.tile_size = tile_size
+        self.resampling: Resampling = Resampling[resampling]
+
+    @staticmethod
+    def _select_overview_level(dataset, tile_res: float) -> int:
+        """
+            选择分辨率不高于瓦片分辨率的最粗一级金字塔
+        @param dataset: 原始分辨率的 dataset
+        @param tile_res: 瓦片像素在源坐标系下的分辨率
+        @return: 金字塔序号(-1 为原始分辨率)，用于 rasterio.open(overview_level=)
+        """
+        decimation: float = tile_res / dataset.res[0]
+        level: int = -1
+        for index, factor in enumerate(dataset.overviews(1)):
+            if factor <= decimation:
+                level = index
+        return level
+
+    def render_array(self, file_path: str, z: int, x: int, y: int) -> Optional[np.ndarray]:
+        """
+            读取瓦片范围内的增水并重投影至 Web-Mercator
+        @param file_path: geotiff 全路径
+        @return: float32 (tile_size, tile_size)，nan 为无效值；瓦片与栅格不相交时返回 None
+        """
+        mercator_bounds = tile_bounds_mercator(z, x, y)
+        with rasterio.open(file_path) as dataset:
+            src_crs = dataset.crs
+            tile_bounds = transform_bounds(WEB_MERCATOR_CRS, src_crs, *mercator_bounds)
+            if (tile_bounds[0] >= dataset.bounds.right or tile_bounds[2] <= dataset.bounds.left or
+                    tile_bounds[1] >= dataset.bounds.top or tile_bounds[3] <= dataset.bounds.bottom):
+                return None
+            level: int = self._select_overview_level(dataset,
+                                                     (tile_bounds[2] - tile_bounds[0]) / self.tile_size)
+        open_kwargs: dict = {'overview_level': level} if level >= 0 else {}
+        with rasterio.open(file_path, **open_kwargs) as dataset:
+            # 只读取瓦片范围(外扩 1 个像素供插值)对应的窗口
+            window: Window = window_from_bounds(*tile_bounds, transform=dataset.transform)
+            window = Window(math.floor(window.col_off) - 1, math.floor(window.row_off) - 1,
+                            math.ceil(window.width) + 3, math.ceil(window.height) + 3)
+            window = window.intersection(Window(0, 0, dataset.width, dataset.height))
+            source: np.ndarray = dataset.read(1, window=window, out_dtype='float32')
+            src_nodata = dataset.nodata
+            src_transform = dataset.window_transform(window)
+        destination: np.ndarray = np.full((self.tile_size, self.tile_size), np.nan, dtype=np.float32)
+        reproject(source, destination, src_transform=src_transform, src_crs=src_crs, src_nodata=src_nodata,
+                  dst_transform=from_bounds(*mercator_bounds, self.tile_size, self.tile_size),
+                  dst_crs=WEB_MERCATOR_CRS, dst_nodata=np.nan, resampling=self.resampling)
+        return destination
+
+    def render(self, file_path: str, z: int, x: int, y: int, colormap: str, img_format: str) -> bytes:
+        """
+            渲染瓦片
+        @return: 编码后的图片，瓦片与栅格不相交时返回 b''
+        """
+        values: Optional[np.ndarray] = self.render_array(file_path, z, x, y)
+        if values is None or not np.isfinite(values).any():
+            return b''
+        return encode_tile(apply_colormap(values, colormap), img_format)
+
+
+class SurgeTileService:
+    """
+        瓦片渲染 + 缓存
+        key: (file, 修改时间, 字节数, z, x, y, colormap, format)
+        TODO:[-] 26-10-18 加入源文件版本，同一路径的 geotiff 被新一次预报覆盖后不再命中旧瓦片
+    """
+
+    def __init__(self):
+        self.renderer = SurgeTileRenderer(SURGE_TILE_OPTIONS.get('tile_size', 256),
+                                          SURGE_TILE_OPTIONS.get('resampling', 'bilinear'))
+        self.cache = TileLRUCache(memory_max_items=SURGE_TILE_OPTIONS.get('cache_memory_items', 4096),
+                                  memory_max_bytes=SURGE_TILE_OPTIONS.get('cache_memory_mb', 256) * 1024 * 1024,
+                                  disk_dir=SURGE_TILE_OPTIONS.get('cache_disk_dir'),
+                                  disk_max_bytes=SURGE_TILE_OPTIONS.get('cache_disk_mb', 4096) * 1024 * 1024)
+
+    def get_tile(self, file_path: str, z: int, x: int, y: int, colormap: str, img_format: str) -> bytes:
+        key = (file_path, *file_version(file_path), z, x, y, colormap, img_format)
+        data: Optional[bytes] = self.cache.get(key)
+        if data is None:
+            data = self.renderer.render(file_path, z, x, y, colormap, img_format)
+            self.cache.put(key, data)
+        return data
+
+
+_tile_service: Optional[SurgeTileService] = None
+
+
+def get_tile_service() -> SurgeTileService:
+    """
+        每个进程共用一个瓦片服务(缓存)
+    """
+    global _tile_service
+    if _tile_service is None:
+        _tile_service = SurgeTileService()
+    return _tile_service
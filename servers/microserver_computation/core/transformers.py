@@ -1,15 +1,19 @@
 import pathlib
 import os
-from typing import Optional
+from typing import Optional, List
 
 import pandas as pd
 import numpy as np
 import pathlib
 import xarray as xr
 import rioxarray
+import rasterio
+import rasterio.shutil
+from rasterio.enums import Resampling
+from rasterio.io import MemoryFile
 
 from common.default import NONE_ID
-from common.enums import ElementTypeEnum, RasterFileType, TyphoonGroupEnum
+from common.enums import ElementTypeEnum, RasterFileType, TyphoonGroupEnum, RasterLayoutEnum
 from common.exceptions import FileDontExists, FileReadError, FileTransformError
 from common.util import get_ty_group_enum
 from models.mid_models import IForecastProductFile, ForecastSurgeRasterFile
@@ -21,13 +25,21 @@ class SurgeTransformer:
         提取nc文件中的 zmax -> geotiff
     """
 
+    DEFAULT_VAR_NAME: str = 'zmax'
+
+    DEFAULT_COG_OPTIONS: dict = {'blocksize': 512, 'predictor': 3, 'overview_levels': [2, 4, 8, 16, 32],
+                                 'overview_resampling': 'average', 'nodata': -9999.0}
+    """COG 默认参数"""
+
     def __init__(self, file: IForecastProductFile, task_id: int = NONE_ID):
         self.task_id = task_id
         self.file = file
         self._ds: Optional[xr.Dataset] = None
         """标准化后的 dataset """
+        self._var_name: str = self.DEFAULT_VAR_NAME
+        """读取的变量名"""
 
-    def read_data(self, var_name: str = "zmax"):
+    def read_data(self, var_name: str = DEFAULT_VAR_NAME):
         """
             根据 self.file 读取文件并将ds 写入 self._ds
             若异常则不写入 ds
@@ -52,18 +64,52 @@ class SurgeTransformer:
                 first_ds.rio.set_spatial_dims(x_dim="lon", y_dim="lat", inplace=True)
                 first_ds.rio.write_crs("EPSG:4326", inplace=True)
                 self._ds = first_ds
+                self._var_name = var_name
             except Exception as e:
                 raise FileReadError
             pass
         else:
             raise FileDontExists()
 
-    def out_put(self, compress="deflate", diver: str = 'GTiff') -> Optional[
+    def _write_cog(self, out_put_file_path: str, compress: str, cog_options: Optional[dict] = None) -> None:
+        """
+            + 26-10-18 以 Cloud-Optimized GeoTIFF 布局输出
+            先在内存中写出分块 geotiff 并生成金字塔，再带金字塔复制为目标文件(金字塔与分块均在文件内部，元数据位于文件头)
+            前端可通过 http range 只请求所需层级与范围的分块
+        :param out_put_file_path: 输出文件路径
+        :param compress: 压缩方法
+        :param cog_options: 参考 DEFAULT_COG_OPTIONS
+        :return:
+        """
+        options: dict = {**self.DEFAULT_COG_OPTIONS, **(cog_options or {})}
+        blocksize: int = options['blocksize']
+        nodata: float = options['nodata']
+        creation_options: dict = dict(tiled=True, blockxsize=blocksize, blockysize=blocksize, compress=compress,
+                                      predictor=options['predictor'])
+        # 被过滤掉的区域为 nan，统一写为 nodata
+        data_array: xr.DataArray = self._ds.fillna(nodata).rio.set_spatial_dims(x_dim='lon', y_dim='lat')
+        data_array = data_array.rio.write_nodata(nodata, encoded=False)
+        height, width = data_array.shape[-2:]
+        overview_levels: List[int] = [level for level in options['overview_levels'] if
+                                      min(height, width) // level >= 1]
+        with MemoryFile(ext='.tif') as mem_file:
+            data_array.rio.to_raster(mem_file.name, driver='GTiff', **creation_options)
+            with rasterio.open(mem_file.name, 'r+') as dataset:
+                if overview_levels:
+                    dataset.build_overviews(overview_levels, Resampling[options['overview_resampling']])
+                    dataset.update_tags(ns='rio_overview', resampling=options['overview_resampling'])
+            rasterio.shutil.copy(mem_file.name, out_put_file_path, driver='GTiff', copy_src_overviews=True,
+                                 **creation_options)
+
+    def out_put(self, compress="deflate", diver: str = 'GTiff',
+                layout: RasterLayoutEnum = RasterLayoutEnum.STRIPED, cog_options: Optional[dict] = None) -> Optional[
         ForecastSurgeRasterFile]:
         """
             输出并转换为 geotiff
         :param compress: 压缩方法
         :param diver:   输出文件类型
+        :param layout:  + 26-10-18 输出布局 普通 geotiff | COG
+        :param cog_options: COG 参数(layout 为 COG 时生效)
         :return:
         """
         raster_file: Optional[ForecastSurgeRasterFile] = None
@@ -76,14 +122,20 @@ class SurgeTransformer:
                 temp_group_type_str: str = self.file.file_name.split('.')[0].split('_')[1]
                 temp_group_type: TyphoonGroupEnum = get_ty_group_enum(temp_group_type_str)
                 """当前文件的 集合路径类型枚举"""
+                # + 26-10-18 非默认变量在文件名中加入变量名，避免同一 nc 的多个变量输出文件重名
+                if self._var_name != self.DEFAULT_VAR_NAME:
+                    file_splits.append(self._var_name)
                 file_splits.append('tif')
                 transformer_file_name: str = '.'.join(file_splits)
                 out_put_file_path: str = str(pathlib.Path(
                     self.file.local_root_path) / self.file.relative_path / transformer_file_name)
-                self._ds.rio.to_raster(out_put_file_path, diver=diver, compress=compress)
+                if layout == RasterLayoutEnum.COG:
+                    self._write_cog(out_put_file_path, compress, cog_options)
+                else:
+                    self._ds.rio.to_raster(out_put_file_path, diver=diver, compress=compress)
                 raster_file = ForecastSurgeRasterFile(raster_type, self.file.issue_ts, transformer_file_name,
                                                       self.file.relative_path,
-                                                      self.file.local_root_path, temp_group_type)
+                                                      self.file.local_root_path, temp_group_type, layout)
             except Exception as e:
                 raise FileTransformError()
         return raster_file
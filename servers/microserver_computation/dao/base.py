@@ -1,7 +1,9 @@
 # 一些常用的用户代理
+from contextlib import nullcontext
 from random import randint
+from typing import Optional
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import scoped_session, Session
 
 from db.db import session_yield_scope
 from db.db_factory import DBFactory
@@ -37,8 +39,21 @@ def get_agent() -> str:
 class BaseDao:
     """
         + 25-04-23
+        + 26-10-18 支持注入请求级 session(fastapi Depends(get_db_session))
     """
 
-    def __init__(self):
-        self.session: scoped_session = session_yield_scope()
-        pass
+    def __init__(self, session: Optional[Session] = None):
+        self._session: Optional[Session] = session
+        """注入的请求级 session,由依赖项负责提交及关闭"""
+
+    @property
+    def session(self):
+        """
+            获取 session 上下文
+            TODO:[-] 26-10-18 原先在 __init__ 中保存的 session_yield_scope() 只能 with 一次，
+             同一个 dao 调用第二个方法时会报错，此处改为每次访问返回新的上下文
+        @return:
+        """
+        if self._session is not None:
+            return nullcontext(self._session)
+        return session_yield_scope()
@@ -1,10 +1,12 @@
-from typing import List, Optional, Any, Union
+import pathlib
+from typing import Dict, List, Optional, Any, Union
 
 from sqlalchemy import distinct, select
 
-from common.default import MS_UNIT
-from common.enums import RasterFileType, TyphoonGroupEnum
+from common.default import DEFAULT_ENUM, MS_UNIT
+from common.enums import RasterFileType, TyphoonGroupEnum, TY_GROUP_MEMBER_ENUMS
 from common.util import get_remote_url
+from config.store_config import STORE_CONFIG
 from core.jobs import JobGenerateTyphoonPathFile, JobGenerateSurgeRasterPathFile
 from dao.base import BaseDao
 from models.models import TyphoonForecastGrouppath, TyphoonForecastRealdata, GeoCoverageFiles
@@ -19,6 +21,7 @@ class BaseCoverageDao(BaseDao):
                                   **kwargs) -> Optional[CoverageFileInfoSchema]:
         """
             根据 预报 | 发布 时间戳 获取对应的 nc | tif 文件信息
+            TODO:[-] 26-10-18 重新入库时之前的记录标记为删除，此处只取未删除的最新一条
         @param raster_type: 栅格图层种类 nc|tif
         @param area:        预报区域
         @param issue_ts:    发布时间戳
@@ -31,13 +34,15 @@ class BaseCoverageDao(BaseDao):
                     GeoCoverageFiles.ty_code == ty_code,
                     GeoCoverageFiles.issue_ts == issue_ts,
                     GeoCoverageFiles.coverage_type == raster_type.value,
-                    GeoCoverageFiles.group_type == group_type.value
-                )
+                    GeoCoverageFiles.group_type == group_type.value,
+                    GeoCoverageFiles.is_del == False
+                ).order_by(GeoCoverageFiles.id.desc()).limit(1)
                 res = session.execute(stmt).scalar_one_or_none()
+                if res is None:
+                    return None
                 coverage_file_schema = CoverageFileInfoSchema.from_orm(res)
                 return coverage_file_schema
         except Exception as ex:
-            # Multiple rows were found when one or none was required
             print(ex)
             return None
 
@@ -63,4 +68,82 @@ class CoverageDao(BaseCoverageDao):
 
         return full_url
 
+    def get_tif_local_path(self, ty_code: str, issue_ts: int, group_type: TyphoonGroupEnum,
+                           coverage_type: RasterFileType = RasterFileType.GEOTIFF, **kwargs) -> Optional[str]:
+        """
+            + 26-10-18 获取对应 tiff 文件在本地存储中的全路径(用于服务端渲染瓦片)
+            若不存在则返回 None
+        @param ty_code:
+        @param issue_ts:
+        @param group_type:
+        @param coverage_type:
+        @param kwargs:
+        @return:
+        """
+        file_info: Optional[CoverageFileInfoSchema] = self.get_coveage_file_byparams(ty_code, issue_ts, coverage_type,
+                                                                                     group_type)
+        if file_info is None:
+            return None
+        return str(pathlib.Path(STORE_CONFIG.get('STORE_ROOT_PATH')) / file_info.relative_path / file_info.file_name)
+
+    def get_tif_local_paths(self, ty_code: str, issue_ts: int,
+                            coverage_type: RasterFileType = RasterFileType.GEOTIFF,
+                            group_types: Optional[List[TyphoonGroupEnum]] = None) -> Dict[int, str]:
+        """
+            + 26-10-18 一次查询获取所有集合成员的 tiff 文件本地全路径
+        @param ty_code:
+        @param issue_ts:
+        @param coverage_type:
+        @param group_types: 默认只包含集合成员(TY_GROUP_MEMBER_ENUMS)，不包含集合统计产品
+        @return: group_type -> 本地全路径(按 group_type 排序)
+        """
+        group_types = group_types or TY_GROUP_MEMBER_ENUMS
+        paths: Dict[int, str] = {}
+        root_path: pathlib.Path = pathlib.Path(STORE_CONFIG.get('STORE_ROOT_PATH'))
+        try:
+            with self.session as session:
+                stmt = select(GeoCoverageFiles.group_type, GeoCoverageFiles.relative_path,
+                              GeoCoverageFiles.file_name).where(
+                    GeoCoverageFiles.ty_code == ty_code,
+                    GeoCoverageFiles.issue_ts == issue_ts,
+                    GeoCoverageFiles.coverage_type == coverage_type.value,
+                    GeoCoverageFiles.group_type.in_([temp.value for temp in group_types]),
+                    GeoCoverageFiles.is_del == False
+                ).order_by(GeoCoverageFiles.group_type, GeoCoverageFiles.id)
+                for group_type, relative_path, file_name in session.execute(stmt).all():
+                    # 同一成员存在多条记录时取最新的一条
+                    paths[group_type] = str(root_path / relative_path / file_name)
+        except Exception as ex:
+            print(ex)
+        return paths
+
+    def get_flood_file_url(self, ty_code: str, issue_ts: int, coverage_type: RasterFileType,
+                           group_type: int = DEFAULT_ENUM) -> str:
+        """
+            + 26-10-18 获取淹没产品(由 celery 淹没产品流水线登记)的 url
+            重新生成时旧记录会被标记为删除，此处取最新的一条有效记录
+            若不存在则返回 ''
+        @param ty_code:
+        @param issue_ts:
+        @param coverage_type: FLOOD_DEPTH | FLOOD_LEVEL
+        @param group_type: 淹没等级枚举的 value(FLOOD_DEPTH 为 DEFAULT_ENUM)
+        @return:
+        """
+        try:
+            with self.session as session:
+                stmt = select(GeoCoverageFiles).where(
+                    GeoCoverageFiles.ty_code == ty_code,
+                    GeoCoverageFiles.issue_ts == issue_ts,
+                    GeoCoverageFiles.coverage_type == coverage_type.value,
+                    GeoCoverageFiles.group_type == group_type,
+                    GeoCoverageFiles.is_del == False
+                ).order_by(GeoCoverageFiles.id.desc()).limit(1)
+                res = session.execute(stmt).scalar_one_or_none()
+                if res is None:
+                    return ''
+                return get_remote_url(CoverageFileInfoSchema.from_orm(res))
+        except Exception as ex:
+            print(ex)
+            return ''
+
     pass
@@ -1,4 +1,4 @@
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 
 from sqlalchemy import distinct, select, text
 
@@ -10,7 +10,8 @@ from models.models import TyphoonForecastGrouppath, TyphoonForecastRealdata, Geo
 from schema.geo import GeoJSONPolygon, GeoPolygonSchema, GeoFloodPolygonSchema
 from schema.task import TyGroupTaskSchema
 from schema.typhoon import TyphoonPathComplexSchema, TyphoonDistGroupSchema, TyphoonPointSchema
-from util.geo_util import convert_coordinate_order
+from util.geo_util import bbox_to_wkt, wkt_polygon_to_geojson
+from util.geojson_cache import loads
 
 
 class FloodPlainDao(BaseDao):
@@ -37,7 +38,7 @@ class FloodPlainDao(BaseDao):
                 # 使用原始 SQL 查询
                 sql = text("""
                         SELECT id, value, ty_code, name, description, properties, 
-                               ST_AsText(geom) as geom_wkt, 
+                               ST_AsText(geom, 'axis-order=long-lat') as geom_wkt, 
                                gmt_create_time, gmt_update_time, issue_time
                         FROM geo_polygons
                         WHERE ty_code = :ty_code AND issue_time = :issue_ts
@@ -65,6 +66,7 @@ class FloodPlainDao(BaseDao):
                     from geoalchemy2.elements import WKTElement
                     # 'POLYGON((29.969271 122.081828,29.969271 122.082908,29.968191 122.082908,29.968191 122.081828,29.969271 122.081828))'
                     # 注意此处为 (lat,lng), 标准geo格式应为(lng,lat)，此处需要进行转换
+                    # TODO:[-] 26-10-18 查询时通过 'axis-order=long-lat' 直接输出 (lng,lat)，不再逐行交换
                     # TODO:[*] 25-06-04
                     """
                         2 validation errors for GeoPolygonSchema
@@ -73,7 +75,7 @@ class FloodPlainDao(BaseDao):
                         geom
                           不支持的几何数据类型: <class 'geoalchemy2.elements.WKTElement'> (type=value_error)
                     """
-                    source_geom_wkt = convert_coordinate_order(row.geom_wkt)
+                    source_geom_wkt = wkt_polygon_to_geojson(row.geom_wkt, swap_axes=False)
                     # {'coordinates': (((122.081828, 29.969271), (122.082908, 29.969271), (122.082908, 29.968191), (122.081828, 29.968191), (122.081828, 29.969271)),), 'type': 'Polygon'}
                     polygon.geom = WKTElement(source_geom_wkt, srid=4326)
                     polygons.append(polygon)
@@ -100,7 +102,7 @@ class FloodPlainDao(BaseDao):
                 # 使用原始 SQL 查询
                 sql = text("""
                         SELECT id, value, ty_code, name, description, properties, 
-                               ST_AsText(geom) as geom_wkt, 
+                               ST_AsText(geom, 'axis-order=long-lat') as geom_wkt, 
                                gmt_create_time, gmt_update_time, issue_time,flood_level
                         FROM geo_floodlevel_polygon
                         WHERE ty_code = :ty_code AND issue_time = :issue_ts AND flood_level = :flood_level
@@ -130,6 +132,7 @@ class FloodPlainDao(BaseDao):
                     from geoalchemy2.elements import WKTElement
                     # 'POLYGON((29.969271 122.081828,29.969271 122.082908,29.968191 122.082908,29.968191 122.081828,29.969271 122.081828))'
                     # 注意此处为 (lat,lng), 标准geo格式应为(lng,lat)，此处需要进行转换
+                    # TODO:[-] 26-10-18 查询时通过 'axis-order=long-lat' 直接输出 (lng,lat)，不再逐行交换
                     # TODO:[*] 25-06-04
                     """
                         2 validation errors for GeoPolygonSchema
@@ -138,7 +141,7 @@ class FloodPlainDao(BaseDao):
                         geom
                           不支持的几何数据类型: <class 'geoalchemy2.elements.WKTElement'> (type=value_error)
                     """
-                    source_geom_wkt = convert_coordinate_order(row.geom_wkt)
+                    source_geom_wkt = wkt_polygon_to_geojson(row.geom_wkt, swap_axes=False)
                     # {'coordinates': (((122.081828, 29.969271), (122.082908, 29.969271), (122.082908, 29.968191), (122.081828, 29.968191), (122.081828, 29.969271)),), 'type': 'Polygon'}
                     polygon.geom = WKTElement(source_geom_wkt, srid=4326)
                     polygons.append(polygon)
@@ -155,3 +158,107 @@ class FloodPlainDao(BaseDao):
         except Exception as ex:
             print(ex)
         pass
+
+    @staticmethod
+    def _row_to_feature(row) -> dict:
+        """
+            + 26-10-18 将查询结果直接转换为与 GeoPolygonSchema 字段一致的字典(不经过 ORM 对象及 pydantic 校验)
+        """
+        properties = row.properties
+        if isinstance(properties, (str, bytes)):
+            properties = loads(properties)
+        return {'value': row.value, 'ty_code': row.ty_code, 'name': row.name, 'description': row.description,
+                'properties': properties if properties is not None else {},
+                'geom': wkt_polygon_to_geojson(row.geom_wkt, swap_axes=False), 'issue_time': row.issue_time}
+
+    @staticmethod
+    def _bbox_condition(bbox: Optional[Tuple[float, float, float, float]], params: dict) -> str:
+        """
+            + 26-10-18 bbox 过滤条件(MBRIntersects 可使用 geom 的空间索引)
+            geom 的 srid 为 4326(mysql 中轴序为 lat-long)，bbox 以 'axis-order=long-lat' 构造
+        @param bbox: (min_lng, min_lat, max_lng, max_lat)
+        @param params: 查询参数，会写入 bbox_wkt
+        @return: 追加至 WHERE 的条件，bbox 为空时返回 ''
+        """
+        if bbox is None:
+            return ''
+        params['bbox_wkt'] = bbox_to_wkt(bbox)
+        return " AND MBRIntersects(geom, ST_GeomFromText(:bbox_wkt, 4326, 'axis-order=long-lat'))"
+
+    def _polygons_version(self, table_name: str, params: dict, condition: str = '') -> Tuple[int, int]:
+        sql = text(f"""
+                SELECT COUNT(*) AS count, COALESCE(MAX(id), 0) AS max_id
+                FROM {table_name}
+                WHERE ty_code = :ty_code AND issue_time = :issue_ts{condition}
+            """)
+        with self.session as session:
+            row = session.execute(sql, params).one()
+        return int(row.count), int(row.max_id)
+
+    def get_polygons_version(self, ty_code: str, issue_ts: int) -> Tuple[int, int]:
+        """
+            + 26-10-18 淹没深度分级多边形的版本(用于响应缓存的 key)
+            重新生成时先删除再写入，自增 id 随之变化，只读取 (ty_code, issue_time) 索引
+        @param ty_code:
+        @param issue_ts:
+        @return: (多边形数, 最大 id)，不存在时为 (0, 0)
+        """
+        return self._polygons_version('geo_polygons', {"ty_code": ty_code, "issue_ts": issue_ts})
+
+    def get_floodlevel_polygons_version(self, ty_code: str, issue_ts: int,
+                                        flood_level: FloodAreaLevelEnum) -> Tuple[int, int]:
+        """
+            + 26-10-18 指定淹没等级多边形的版本(用于响应缓存及矢量瓦片缓存的 key)
+        @param ty_code:
+        @param issue_ts:
+        @param flood_level:
+        @return: (多边形数, 最大 id)，不存在时为 (0, 0)
+        """
+        return self._polygons_version('geo_floodlevel_polygon',
+                                      {"ty_code": ty_code, "issue_ts": issue_ts, "flood_level": flood_level.value},
+                                      ' AND flood_level = :flood_level')
+
+    def get_polygon_features_by_typhoon(self, ty_code: str, issue_ts: int,
+                                        bbox: Optional[Tuple[float, float, float, float]] = None) -> List[dict]:
+        """
+            + 26-10-18 获取台风对应的多边形(字典形式，用于直接序列化)
+        @param ty_code:
+        @param issue_ts:
+        @param bbox: 只返回与该范围相交的多边形
+        @return:
+        """
+        params: dict = {"ty_code": ty_code, "issue_ts": issue_ts}
+        sql = text("""
+                SELECT value, ty_code, name, description, properties, ST_AsText(geom, 'axis-order=long-lat') as geom_wkt, issue_time
+                FROM geo_polygons
+                WHERE ty_code = :ty_code AND issue_time = :issue_ts
+            """ + self._bbox_condition(bbox, params))
+        with self.session as session:
+            result = session.execute(sql, params).all()
+        return [self._row_to_feature(row) for row in result]
+
+    def get_floodlevel_polygon_features(self, ty_code: str, issue_ts: int,
+                                        flood_level: FloodAreaLevelEnum,
+                                        bbox: Optional[Tuple[float, float, float, float]] = None) -> List[dict]:
+        """
+            + 26-10-18 获取指定淹没等级的多边形(字典形式，字段与 GeoFloodPolygonSchema 一致，用于直接序列化)
+        @param ty_code:
+        @param issue_ts:
+        @param flood_level:
+        @param bbox: 只返回与该范围相交的多边形
+        @return:
+        """
+        params: dict = {"ty_code": ty_code, "issue_ts": issue_ts, "flood_level": flood_level.value}
+        sql = text("""
+                SELECT value, ty_code, name, description, properties, ST_AsText(geom, 'axis-order=long-lat') as geom_wkt, issue_time
+                FROM geo_floodlevel_polygon
+                WHERE ty_code = :ty_code AND issue_time = :issue_ts AND flood_level = :flood_level
+            """ + self._bbox_condition(bbox, params))
+        with self.session as session:
+            result = session.execute(sql, params).all()
+        features: List[dict] = []
+        for row in result:
+            feature: dict = self._row_to_feature(row)
+            feature['flood_level'] = flood_level.value
+            features.append(feature)
+        return features
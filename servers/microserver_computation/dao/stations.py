@@ -1,4 +1,5 @@
-from typing import List
+from itertools import groupby
+from typing import Dict, List, Optional
 
 from sqlalchemy import select
 
@@ -6,6 +7,11 @@ from common.enums import TyphoonGroupEnum
 from dao.base import BaseDao
 from models.models import StationInfo, StationForecastRealdataModel, StationAstronomicTide
 from schema.stations import StionInfoSchema, StationSurgeSchema, StationGroupSurgeSchema, StationTideSchema
+from util.series_codec import SeriesFrame
+
+GROUP_SURGE_DTYPES: Dict[str, str] = {'ts': '<i8', 'surge': '<f4'}
+"""+ 26-10-18 集合增水列式编码的列(forecast_ts | surge)"""
+TIDE_DTYPES: Dict[str, str] = {'ts': '<i8', 'tide': '<f4'}
 
 
 class StationDao(BaseDao):
@@ -33,42 +39,97 @@ class StationDao(BaseDao):
                 StationGroupSurgeSchema]:
         """
             根据参数获取对应的集合
+        TODO:[-] 26-10-18 由 distinct + 每个 group path 一次查询改为一次有序查询后在内存中分组
         @param station_code:
         @param ty_code:
-        @param grouppath:
+        @param issue_ts: 发布时间(s)
+        @param grouppath: 未使用，返回全部集合路径
         @return:
         """
-        # step1: 获取查询参数对应结果的 distinct group path
-        # step2: 根据每个 group path 查询对应的增水，并按照降序排列，生成数组
-        # step3: 创建返回schema集合
-        # step4: 返回
         try:
             with self.session as session:
-                group_stmt = select(StationForecastRealdataModel.grouppath_type).where(
-                    StationForecastRealdataModel.is_del == False,
-                    StationForecastRealdataModel.station_code == station_code,
-                    StationForecastRealdataModel.ty_code == ty_code,
-                    StationForecastRealdataModel.issue_time == issue_ts).distinct(
-                    StationForecastRealdataModel.grouppath_type)
-                grouppath: List[int] = session.execute(group_stmt).scalars().all()
-                # 尝试使用 group by grouppath 进行分组查询
-                res_schema: List[StationGroupSurgeSchema] = []
-                for temp_group in grouppath:
-                    stmt = select(StationForecastRealdataModel).where(
-                        StationForecastRealdataModel.is_del == False,
-                        StationForecastRealdataModel.station_code == station_code,
-                        StationForecastRealdataModel.ty_code == ty_code,
-                        StationForecastRealdataModel.issue_time == issue_ts,
-                        StationForecastRealdataModel.grouppath_type == temp_group).order_by(
-                        StationForecastRealdataModel.forecast_ts)
-                    query: List[StationForecastRealdataModel] = session.execute(stmt).scalars().all()
-                    temp_surge_res = [StationSurgeSchema.model_validate(temp) for temp in query]
-                    temp_res = StationGroupSurgeSchema(group_type=temp_group, surge_list=temp_surge_res)
-                    res_schema.append(temp_res)
-                return res_schema
+                res: Dict[str, List[StationGroupSurgeSchema]] = self._query_group_surges(session, ty_code, issue_ts,
+                                                                                       [station_code])
+                return res.get(station_code, [])
         except Exception as ex:
             print(ex)
-        pass
+        return []
+
+    def get_stations_groupsurge(self, ty_code: str, issue_ts: int, station_codes: Optional[List[str]] = None) -> \
+            Dict[str, List[StationGroupSurgeSchema]]:
+        """
+            + 26-10-18 批量获取多个站点(或全部站点)的集合增水
+        @param ty_code:
+        @param issue_ts: 发布时间(s)
+        @param station_codes: 为 None 时返回该批次的全部站点
+        @return: 站点代码 -> 集合增水(与 get_station_groupsurge 一致)，不存在预报结果的站点不返回
+        """
+        res: Dict[str, List[StationGroupSurgeSchema]] = {}
+        if station_codes is not None and len(station_codes) == 0:
+            return res
+        try:
+            with self.session as session:
+                res = self._query_group_surges(session, ty_code, issue_ts, station_codes)
+        except Exception as ex:
+            print(ex)
+        return res
+
+    def get_stations_groupsurge_frame(self, ty_code: str, issue_ts: int,
+                                      station_codes: Optional[List[str]] = None) -> SeriesFrame:
+        """
+            + 26-10-18 批量获取集合增水的列式数据(不创建逐点的 schema)
+        @param ty_code:
+        @param issue_ts: 发布时间(s)
+        @param station_codes: 为 None 时返回该批次的全部站点
+        @return: 每条序列为 (station_code, group_type)，列: ts | surge
+        """
+        meta: dict = {'ty_code': ty_code, 'issue_time': issue_ts}
+        rows: list = []
+        if station_codes is None or len(station_codes) > 0:
+            try:
+                with self.session as session:
+                    rows = session.execute(self._group_surge_stmt(ty_code, issue_ts, station_codes)).all()
+            except Exception as ex:
+                print(ex)
+        return SeriesFrame.from_rows(rows, ['station_code', 'group_type'], GROUP_SURGE_DTYPES, meta)
+
+    @staticmethod
+    def _group_surge_stmt(ty_code: str, issue_ts: int, station_codes: Optional[List[str]] = None):
+        """
+            + 26-10-18 只查询所需的列，按 (station_code, grouppath_type, forecast_ts) 排序
+        @param ty_code:
+        @param issue_ts:
+        @param station_codes: 为 None 时不按站点过滤
+        @return: 每行为 (station_code, grouppath_type, forecast_ts, surge)
+        """
+        stmt = select(StationForecastRealdataModel.station_code, StationForecastRealdataModel.grouppath_type,
+                      StationForecastRealdataModel.forecast_ts, StationForecastRealdataModel.surge).where(
+            StationForecastRealdataModel.is_del == False,
+            StationForecastRealdataModel.ty_code == ty_code,
+            StationForecastRealdataModel.issue_time == issue_ts)
+        if station_codes is not None:
+            stmt = stmt.where(StationForecastRealdataModel.station_code.in_(station_codes))
+        return stmt.order_by(StationForecastRealdataModel.station_code, StationForecastRealdataModel.grouppath_type,
+                             StationForecastRealdataModel.forecast_ts)
+
+    @classmethod
+    def _query_group_surges(cls, session, ty_code: str, issue_ts: int, station_codes: Optional[List[str]] = None) -> \
+            Dict[str, List[StationGroupSurgeSchema]]:
+        """
+            + 26-10-18 一次有序查询后在内存中分组
+        @param session:
+        @param ty_code:
+        @param issue_ts:
+        @param station_codes: 为 None 时不按站点过滤
+        @return: 站点代码 -> 按 grouppath_type 升序的集合增水
+        """
+        stmt = cls._group_surge_stmt(ty_code, issue_ts, station_codes)
+        res: Dict[str, List[StationGroupSurgeSchema]] = {}
+        for station_code, station_rows in groupby(session.execute(stmt), key=lambda temp: temp[0]):
+            res[station_code] = [StationGroupSurgeSchema(group_type=group_type, surge_list=[
+                StationSurgeSchema(station_code=temp[0], forecast_ts=temp[2], issue_time=issue_ts, surge=temp[3])
+                for temp in group_rows]) for group_type, group_rows in groupby(station_rows, key=lambda temp: temp[1])]
+        return res
 
     def get_tide_list(self, station_code: str, start_ts: int, end_ts: int) -> List[StationTideSchema]:
         """
@@ -93,3 +154,23 @@ class StationDao(BaseDao):
         except Exception as ex:
             print(ex)
         return res
+
+    def get_tide_frame(self, station_code: str, start_ts: int, end_ts: int) -> SeriesFrame:
+        """
+            + 26-10-18 获取指定站点天文潮的列式数据
+        @param station_code:
+        @param start_ts:
+        @param end_ts:
+        @return: 单条序列，列: ts | tide
+        """
+        rows: list = []
+        try:
+            with self.session as session:
+                stmt = select(StationAstronomicTide.ts, StationAstronomicTide.tide).where(
+                    StationAstronomicTide.station_code == station_code,
+                    StationAstronomicTide.ts >= start_ts,
+                    StationAstronomicTide.ts <= end_ts).order_by(StationAstronomicTide.ts)
+                rows = session.execute(stmt).all()
+        except Exception as ex:
+            print(ex)
+        return SeriesFrame.from_rows(rows, [], TIDE_DTYPES, {'station_code': station_code})
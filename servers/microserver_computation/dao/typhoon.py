@@ -1,4 +1,5 @@
-from typing import List, Optional, Any
+from itertools import groupby
+from typing import Dict, List, Optional, Any
 
 from sqlalchemy import distinct, select
 
@@ -9,6 +10,10 @@ from dao.base import BaseDao
 from models.models import TyphoonForecastGrouppath, TyphoonForecastRealdata
 from schema.task import TyGroupTaskSchema
 from schema.typhoon import TyphoonPathComplexSchema, TyphoonDistGroupSchema, TyphoonPointSchema
+from util.series_codec import SeriesFrame
+
+GROUP_PATH_DTYPES: Dict[str, str] = {'ts': '<i8', 'lat': '<f4', 'lon': '<f4', 'bp': '<f4'}
+"""+ 26-10-18 集合路径列式编码的列(forecast_dt 转换为时间戳(s))"""
 
 
 class TyphoonDao(BaseDao):
@@ -39,47 +44,71 @@ class TyphoonDao(BaseDao):
     def get_grouppath_list(self, ty_code: str, issue_ts: int) -> List[
         TyphoonPathComplexSchema]:
         """
-            step1: code,issue_ts -> grouppath 集合
-            step2: foreach grouppath -> 对应 ty_realdata 集合
+            step1: code,issue_ts -> grouppath join ty_realdata，按 (gp_id, forecast_index) 排序(一次查询)
+            step2: 按 gp_id 分组
             step3: 组合成 schema 返回
+            TODO:[-] 26-10-18 原先每个 grouppath 查询一次 ty_realdata，且路径点未按 forecast_index 排序
         @param ty_code:
         @param issue_ts:
         @return:
         """
         try:
             with self.session as session:
-                # step1:
-                groups_stmt = select(TyphoonForecastGrouppath).where(TyphoonForecastGrouppath.ty_code == ty_code,
-                                                                     TyphoonForecastGrouppath.timestamp == issue_ts)
-                group_query: List[TyphoonForecastGrouppath] = session.execute(groups_stmt).scalars().all()
+                # step1: 左连接，不存在路径点的 grouppath 也返回(tyPathList 为空)
+                rows = session.execute(self._grouppath_points_stmt(ty_code, issue_ts, isouter=True)).all()
                 list_group_schema: List[TyphoonPathComplexSchema] = []
                 # step2:
-                for temp_group in group_query:
-                    temp_group_type = temp_group.ty_path_type
-                    temp_group_id: int = temp_group.id
-                    temp_group_path_list: List[TyphoonPointSchema] = []
-                    temp_path_stmt = select(TyphoonForecastRealdata).where(
-                        TyphoonForecastRealdata.gp_id == temp_group_id)
-                    temp_path_query: List[TyphoonForecastRealdata] = session.execute(temp_path_stmt).scalars().all()
-                    for temp_path in temp_path_query:
-                        temp_path_schema: TyphoonPointSchema = TyphoonPointSchema(lat=temp_path.lat, lon=temp_path.lon,
-                                                                                  bp=temp_path.bp,
-                                                                                  forecastDt=temp_path.forecast_dt,
-                                                                                  isForecast=True,
-                                                                                  tyType=temp_group.ty_path_type)
-                        temp_group_path_list.append(temp_path_schema)
-                    temp_group_schema: TyphoonPathComplexSchema = TyphoonPathComplexSchema(tyCode=ty_code,
-                                                                                           issueTs=temp_group.timestamp,
-                                                                                           groupType=temp_group.ty_path_type,
-                                                                                           tyPathList=temp_group_path_list)
-                    list_group_schema.append(temp_group_schema)
+                for (temp_group_id, temp_group_type, temp_issue_ts), temp_rows in groupby(
+                        rows, key=lambda temp: (temp[0], temp[1], temp[2])):
+                    temp_group_path_list: List[TyphoonPointSchema] = [
+                        TyphoonPointSchema(forecastDt=temp[3], lat=temp[4], lon=temp[5], bp=temp[6], isForecast=True,
+                                           tyType=temp_group_type) for temp in temp_rows if temp[4] is not None]
+                    # step3:
+                    list_group_schema.append(TyphoonPathComplexSchema(tyCode=ty_code, issueTs=temp_issue_ts,
+                                                                      groupType=temp_group_type,
+                                                                      tyPathList=temp_group_path_list))
                 return list_group_schema
-                pass
-            pass
         except Exception as ex:
             print(ex)
         pass
 
+    @staticmethod
+    def _grouppath_points_stmt(ty_code: str, issue_ts: int, isouter: bool = False):
+        """
+            + 26-10-18 集合路径及其路径点(一次 join)，按 (gp_id, forecast_index) 排序
+            使用 typhoon_forecast_grouppath(ty_code, timestamp) 及 typhoon_forecast_realdata(gp_id, forecast_index) 索引
+        @param ty_code:
+        @param issue_ts:
+        @param isouter: 是否返回不存在路径点的 grouppath(路径点的列为空)
+        @return: 每行为 (gp_id, ty_path_type, timestamp, forecast_dt, lat, lon, bp)
+        """
+        return select(TyphoonForecastGrouppath.id, TyphoonForecastGrouppath.ty_path_type,
+                      TyphoonForecastGrouppath.timestamp, TyphoonForecastRealdata.forecast_dt,
+                      TyphoonForecastRealdata.lat, TyphoonForecastRealdata.lon, TyphoonForecastRealdata.bp).join(
+            TyphoonForecastRealdata, TyphoonForecastRealdata.gp_id == TyphoonForecastGrouppath.id,
+            isouter=isouter).where(
+            TyphoonForecastGrouppath.ty_code == ty_code,
+            TyphoonForecastGrouppath.timestamp == issue_ts).order_by(
+            TyphoonForecastGrouppath.id, TyphoonForecastRealdata.forecast_index)
+
+    def get_grouppath_frame(self, ty_code: str, issue_ts: int) -> SeriesFrame:
+        """
+            + 26-10-18 获取指定任务创建的所有集合路径的列式数据(一次 join 查询，不创建逐点的 schema)
+        @param ty_code:
+        @param issue_ts:
+        @return: 每条序列为 (gpId, groupType)，列: ts | lat | lon | bp
+        """
+        rows: list = []
+        try:
+            with self.session as session:
+                # 列式数据不需要 timestamp 列(即 meta 中的 issueTs)
+                rows = [temp[:2] + temp[3:] for temp in
+                        session.execute(self._grouppath_points_stmt(ty_code, issue_ts)).all()]
+        except Exception as ex:
+            print(ex)
+        return SeriesFrame.from_rows(rows, ['gpId', 'groupType'], GROUP_PATH_DTYPES,
+                                     {'tyCode': ty_code, 'issueTs': issue_ts})
+
     def get_dist_grouppath_list(self, ty_code: str, issue_ts: int) -> List[TyphoonPathComplexSchema]:
         """
             获取指定台风案例创建的5个集合路径
@@ -35,7 +35,8 @@ class TaskJobs(Base):
 
 class ICoverageFileModel(Base):
     __abstract__ = True
-    relative_path: Mapped[str] = mapped_column(String(50), default=DEFAULT_PATH)
+    # TODO:[-] 26-10-18 relative_path 由 50 加长为 200(与 celery_job_sys 中的 models 一致)
+    relative_path: Mapped[str] = mapped_column(String(200), default=DEFAULT_PATH)
     file_name: Mapped[str] = mapped_column(String(100), default=DEFAULT_NAME)
 
 
@@ -50,6 +51,8 @@ class GeoCoverageFiles(IDel, IIdIntModel, ICoverageFileModel, IForecastTime, IIs
 
     group_type: Mapped[int] = mapped_column(default=DEFAULT_ENUM)
     """group path 路径枚举对应的value"""
+    raster_layout: Mapped[int] = mapped_column(default=DEFAULT_ENUM)
+    """+ 26-10-18 geotiff 内部布局 RasterLayoutEnum(普通|COG)，nc 文件为 DEFAULT_ENUM(已存在的表见 background/13)"""
     # group_id: Mapped[int] = mapped_column(default=NONE_ID)
     # """对应grouppath表的id"""
     task_id: Mapped[int] = mapped_column(default=NONE_ID)
@@ -150,7 +153,11 @@ class TyphoonForecastDetailinfo(Base):
 class TyphoonForecastGrouppath(Base):
     """台风预报路径组表"""
     __tablename__ = 'typhoon_forecast_grouppath'
-    __table_args__ = {'schema': 'sys_flood_nationaldebt'}
+    # + 26-10-18 按 (台风, 发布时间) 查询集合路径的联合索引
+    __table_args__ = (
+        Index("idx_typhoon_grouppath_ty_ts", "ty_code", "timestamp"),
+        {'schema': 'sys_flood_nationaldebt'}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     is_del = Column(Boolean, nullable=False, default=False)
@@ -173,7 +180,11 @@ class TyphoonForecastGrouppath(Base):
 class TyphoonForecastRealdata(Base):
     """台风预报实际数据表"""
     __tablename__ = 'typhoon_forecast_realdata'
-    __table_args__ = {'schema': 'sys_flood_nationaldebt'}
+    # + 26-10-18 按集合路径有序读取路径点的联合索引
+    __table_args__ = (
+        Index("idx_typhoon_realdata_gp_index", "gp_id", "forecast_index"),
+        {'schema': 'sys_flood_nationaldebt'}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     is_del = Column(Boolean, nullable=False, default=False)
@@ -218,7 +229,12 @@ class StationForecastRealdataModel(Base):
         站点预报增水——需要加入用户名——按用户名分表存储
     """
     __tablename__ = "station_forecast_realdata_user1"
-    __table_args__ = {"schema": "sys_flood_nationaldebt"}
+    # + 26-10-18 按批次查询站点集合增水(有序读取，不需要再排序)的联合索引
+    __table_args__ = (
+        Index("idx_station_forecast_ty_issue_station", "ty_code", "issue_time", "station_code", "grouppath_type",
+              "forecast_ts"),
+        {"schema": "sys_flood_nationaldebt"}
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     is_del: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
@@ -250,12 +266,9 @@ class GeoPolygon(Base):
     name: Mapped[Optional[str]] = mapped_column(String(100), comment="多边形名称")
     description: Mapped[Optional[str]] = mapped_column(Text, comment="描述信息")
     properties: Mapped[Optional[str]] = mapped_column(Text, comment="GeoJSON properties 的 JSON 字符串")
-    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, comment="多边形几何数据")
-    # geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True,
-    #                                            from_text='ST_GeomFromText',
-    #                                            name='mysql'),
-    #                                   nullable=False,
-    #                                   comment="多边形几何数据")
+    # TODO:[-] 26-10-18 启用空间索引(mysql 要求 geom 为 NOT NULL 且指定 SRID)，用于 bbox 过滤
+    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True), nullable=False,
+                                      comment="多边形几何数据")
     gmt_create_time: Mapped[datetime] = mapped_column(
         default=datetime.utcnow(),
         comment="创建时间"
@@ -273,6 +286,7 @@ class GeoPolygon(Base):
     __table_args__ = (
         Index("idx_created_at", "gmt_create_time"),
         Index("idx_updated_at", "gmt_update_time"),
+        Index("idx_geo_polygons_ty_issue", "ty_code", "issue_time"),
         {"mysql_engine": "InnoDB", "mysql_charset": "utf8mb4", "mysql_collate": "utf8mb4_unicode_ci"}
     )
 
@@ -292,7 +306,8 @@ class GeoFloodLevelPolygon(Base):
     name: Mapped[Optional[str]] = mapped_column(String(100), comment="多边形名称")
     description: Mapped[Optional[str]] = mapped_column(Text, comment="描述信息")
     properties: Mapped[Optional[str]] = mapped_column(Text, comment="GeoJSON properties 的 JSON 字符串")
-    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326), nullable=False, comment="多边形几何数据")
+    geom: Mapped[Any] = mapped_column(Geometry("POLYGON", srid=4326, spatial_index=True), nullable=False,
+                                      comment="多边形几何数据")
     flood_level: Mapped[int] = mapped_column(Integer, comment="淹没等级——枚举", default=FloodAreaLevelEnum.GTE100.value)
     gmt_create_time: Mapped[datetime] = mapped_column(
         default=datetime.utcnow(),
@@ -307,6 +322,11 @@ class GeoFloodLevelPolygon(Base):
     issue_time: Mapped[int] = mapped_column(default=Arrow.utcnow().int_timestamp,
                                             comment="发布时间")
 
+    # + 26-10-18 按批次及淹没等级查询的联合索引
+    __table_args__ = (
+        Index("idx_floodlevel_ty_issue_level", "ty_code", "issue_time", "flood_level"),
+    )
+
     def __repr__(self) -> str:
         return f"<GeoFloodLevelPolygon(id={self.id}, ty_code='{self.ty_code}', gp_id='{self.gp_id}')>"
 
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -10,9 +11,50 @@ class CoverageFileInfoSchema(BaseModel):
     relative_path: str
     file_name: str
     group_type: int
+    raster_layout: Optional[int] = None
+    """geotiff 内部布局 RasterLayoutEnum"""
     task_id: int
     ty_code: str
 
     class Config:
         orm_mode = True
         from_attributes = True
+
+
+class SamplePointSchema(BaseModel):
+    """
+        + 26-10-18 采样点
+    """
+    lon: float
+    lat: float
+    code: Optional[str] = None
+    """点位标识(可选，如站点代码)"""
+
+
+class SurgeSampleParamsSchema(BaseModel):
+    """
+        + 26-10-18 增水场批量采样参数
+    """
+    ty_code: str
+    issue_ts: int
+    points: List[SamplePointSchema] = []
+    all_stations: bool = False
+    """为 True 时采样 station_info 中的所有站点(忽略 points)"""
+
+
+class SurgeMemberSampleSchema(BaseModel):
+    """
+        单个集合成员的采样值(与点位顺序一致，范围外或无效值为 null)
+    """
+    group_type: int
+    values: List[Optional[float]]
+
+
+class SurgeSampleResultSchema(BaseModel):
+    """
+        增水场批量采样结果(按列存储)
+    """
+    codes: List[Optional[str]]
+    lons: List[float]
+    lats: List[float]
+    members: List[SurgeMemberSampleSchema]
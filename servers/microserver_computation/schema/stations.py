@@ -41,3 +41,23 @@ class StationTideSchema(BaseModel):
 class StationGroupSurgeSchema(BaseModel):
     group_type: TyphoonGroupEnum
     surge_list: List[StationSurgeSchema]
+
+
+class StationGroupSurgeBatchParamsSchema(BaseModel):
+    """
+        + 26-10-18 批量获取站点集合增水的参数
+    """
+    ty_code: str
+    issue_ts: int
+    """发布时间(ms，与 /surge/group/ 一致)"""
+    station_codes: List[str] = []
+    all_stations: bool = False
+    """为 True 时返回该批次的全部站点(忽略 station_codes)"""
+
+
+class StationGroupSurgeBatchSchema(BaseModel):
+    """
+        + 26-10-18 单个站点的集合增水
+    """
+    station_code: str
+    groups: List[StationGroupSurgeSchema]
@@ -1,19 +1,77 @@
-from shapely import wkt
-from shapely.geometry import mapping
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 
 def convert_coordinate_order(wkt_string):
     """
         修正 WKT 字符串中的坐标顺haixi序
         (lat,lng) => (lng,lat)
+        TODO:[-] 26-10-18 原实现只保留了外环(内环及 MultiPolygon 被丢弃)，改为 wkt_polygon_to_geojson
     @param wkt_string:
     @return:
     """
-    # 解析 WKT 字符串
-    shape_obj = wkt.loads(wkt_string)
+    return wkt_polygon_to_geojson(wkt_string, swap_axes=True)
+
+
+def _parse_wkt_rings(rings_text: str, swap_axes: bool) -> List[List[List[float]]]:
+    """
+        解析多边形的环: '(x y,x y,...),(x y,...)'
+    """
+    rings: List[List[List[float]]] = []
+    for ring_text in rings_text.strip().strip('()').split('),'):
+        coords: np.ndarray = np.array(ring_text.strip().strip('()').replace(',', ' ').split(), dtype=np.float64)
+        coords = coords.reshape(-1, 2)
+        if swap_axes:
+            coords = coords[:, ::-1]
+        rings.append(coords.tolist())
+    return rings
+
 
-    # 获取坐标并交换顺序
-    corrected_shape = type(shape_obj)([(y, x) for x, y in shape_obj.exterior.coords])
+def wkt_polygon_to_geojson(wkt_string: str, swap_axes: bool = True) -> dict:
+    """
+        + 26-10-18 直接将 POLYGON | MULTIPOLYGON 的 WKT 转换为 GeoJSON 字典(保留内环)
+        不经过 shapely 对象，用于批量序列化
+        mysql 中 srid=4326 的 ST_AsText 输出为 (lat,lng)，swap_axes 为 True 时转换为 (lng,lat)
+    @param wkt_string: eg: 'POLYGON((29.969271 122.081828,29.969271 122.082908,...))'
+    @param swap_axes:
+    @return: {'type': 'Polygon', 'coordinates': [[[lng, lat], ...]]}
+    """
+    geom_type, _, body = wkt_string.strip().partition('(')
+    geom_type = geom_type.strip().upper()
+    body = '(' + body
+    if geom_type == 'MULTIPOLYGON':
+        # '((ring),(ring)),((ring))'
+        polygons_text: List[str] = body.strip()[1:-1].split(')),((')
+        return {'type': 'MultiPolygon',
+                'coordinates': [_parse_wkt_rings(temp, swap_axes) for temp in polygons_text]}
+    if geom_type == 'POLYGON':
+        return {'type': 'Polygon', 'coordinates': _parse_wkt_rings(body.strip()[1:-1], swap_axes)}
+    raise ValueError(f'不支持的几何类型:{geom_type}')
 
-    # 返回修正后的 GeoJSON
-    return mapping(corrected_shape)
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """
+        + 26-10-18 解析 bbox 参数
+    @param bbox: 'min_lng,min_lat,max_lng,max_lat'
+    @return: (min_lng, min_lat, max_lng, max_lat)，bbox 为空时返回 None
+    """
+    if bbox is None or bbox.strip() == '':
+        return None
+    values: List[float] = [float(temp) for temp in bbox.split(',')]
+    if len(values) != 4:
+        raise ValueError(f'bbox 应为 min_lng,min_lat,max_lng,max_lat:{bbox}')
+    min_lng, min_lat, max_lng, max_lat = values
+    if min_lng > max_lng or min_lat > max_lat or not (-90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise ValueError(f'无效的 bbox:{bbox}')
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def bbox_to_wkt(bbox: Tuple[float, float, float, float]) -> str:
+    """
+        bbox -> (lng lat) 顺序的 POLYGON WKT
+        注意: 传入 mysql 时需指定 'axis-order=long-lat'
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (f'POLYGON(({min_lng} {min_lat},{max_lng} {min_lat},{max_lng} {max_lat},{min_lng} {max_lat},'
+            f'{min_lng} {min_lat}))')
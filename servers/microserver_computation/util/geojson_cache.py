@@ -0,0 +1,88 @@
+"""
+    预序列化的 GeoJSON 响应缓存
+    同一 (台风, 发布时间, 淹没等级) 的多边形在模式产品生成后不再变化，
+    首次请求时序列化为 json bytes 并 gzip 压缩后缓存，之后的请求直接返回缓存的 bytes，不再查询及校验
+"""
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """
+        序列化为 json bytes(优先使用 orjson)
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(val: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(val)
+    return json.loads(val)
+
+
+class CompressedBytesCache:
+    """
+        gzip 压缩后的 bytes LRU 缓存(按条数及压缩后的总字节数限制，线程安全)
+    """
+
+    def __init__(self, max_items: int = 256, max_bytes: int = 128 * 1024 * 1024, compress_level: int = 6):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self._items: 'OrderedDict[Tuple[Hashable, ...], bytes]' = OrderedDict()
+        self._bytes: int = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[bytes]:
+        """
+        @return: 压缩后的 bytes，未命中时返回 None
+        """
+        with self._lock:
+            data: Optional[bytes] = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key: Tuple[Hashable, ...], raw: bytes) -> bytes:
+        """
+            压缩并写入缓存
+        @param key:
+        @param raw: 未压缩的 json bytes
+        @return: 压缩后的 bytes
+        """
+        data: bytes = gzip.compress(raw, compresslevel=self.compress_level, mtime=0)
+        if len(data) > self.max_bytes:
+            return data
+        with self._lock:
+            old: Optional[bytes] = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while len(self._items) > self.max_items or self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+        return data
+
+
+def json_response(request: Request, compressed: bytes) -> Response:
+    """
+        客户端支持 gzip 时直接返回压缩后的 bytes，否则解压后返回
+    """
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        return Response(content=compressed, media_type='application/json',
+                        headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return Response(content=gzip.decompress(compressed), media_type='application/json',
+                    headers={'Vary': 'Accept-Encoding'})
@@ -0,0 +1,204 @@
+"""
+    + 26-10-18 站点增水、天文潮及台风路径等时间序列的列式编码
+    原先每个点为一个 pydantic 对象(每个元素重复 station_code/issue_time 等字段，并逐个校验)，此处:
+    - 由查询结果(已按序列排序)直接构造 numpy 列，不创建逐点对象
+    - 每条序列(如 站点 + 集合路径)只记录一次标识及其在列中的起止位置(offsets)
+    - 按请求头 Accept 返回 列式 json | msgpack | arrow ipc，未指定时接口仍返回原先的 json
+    列式 json:
+        {"meta": {...}, "segments": {"group_type": [...], "offsets": [0, n1, n1 + n2, ...]},
+         "columns": {"ts": [...], "surge": [...]}}
+    msgpack: 结构同上，columns 中每列为小端的原始字节(dtype 见 "dtypes"，浮点为 float32)
+    arrow ipc(stream): 每列一个字段，meta 及 segments 以 json 存储在 schema metadata 中
+    空值(如 forecast_dt 为 NULL): json 中为 null；msgpack 中该列为 '<f8'(dtypes 中给出)，空值为 nan；arrow 中为 null
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi import Request, Response
+
+from util.geojson_cache import dumps
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+COLUMNAR_JSON_MEDIA_TYPE: str = 'application/vnd.series+json'
+MSGPACK_MEDIA_TYPE: str = 'application/x-msgpack'
+ARROW_MEDIA_TYPE: str = 'application/vnd.apache.arrow.stream'
+
+
+def supported_media_types() -> List[str]:
+    """
+        当前环境支持的列式格式(未安装 msgpack | pyarrow 时不提供对应格式)
+    """
+    media_types: List[str] = [COLUMNAR_JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if pyarrow is not None:
+        media_types.append(ARROW_MEDIA_TYPE)
+    return media_types
+
+
+def negotiate_media_type(request: Request) -> Optional[str]:
+    """
+        按 Accept 中的先后顺序选择第一个支持的列式格式
+    @param request:
+    @return: 为 None 时返回原先的 json
+    """
+    supported: List[str] = supported_media_types()
+    for item in request.headers.get('accept', '').split(','):
+        media_type, *params = [temp.strip() for temp in item.split(';')]
+        if media_type.lower() in supported and 'q=0' not in params:
+            return media_type.lower()
+    return None
+
+
+def to_array(values: Sequence[Any], dtype: str) -> np.ndarray:
+    """
+        查询结果中的一列 -> numpy 数组
+        datetime 转换为时间戳(s)，浮点列保持 float64(json 中的值与原先一致)
+        空值(None)为 nan，存在空值的整型列(包括时间戳)为 float64
+    @param values:
+    @param dtype: 编码为二进制时的类型
+    @return:
+    """
+    nulls: np.ndarray = np.fromiter((temp is None for temp in values), dtype=bool, count=len(values))
+    present: Sequence[Any] = [temp for temp in values if temp is not None] if nulls.any() else values
+    if len(present) > 0 and isinstance(present[0], datetime):
+        arr: np.ndarray = np.asarray(present, dtype='datetime64[s]').astype(np.int64)
+    else:
+        arr = np.asarray(present, dtype=np.float64 if np.dtype(dtype).kind == 'f' else np.int64)
+    if not nulls.any():
+        return arr
+    result: np.ndarray = np.full(len(values), np.nan, dtype=np.float64)
+    result[~nulls] = arr
+    return result
+
+
+def binary_dtype(arr: np.ndarray, dtype: str) -> str:
+    """
+        二进制编码时的类型，整型列存在空值(已转换为 float64)时为 '<f8'
+    """
+    if np.dtype(dtype).kind in 'iu' and arr.dtype.kind == 'f':
+        return '<f8'
+    return dtype
+
+
+def arrow_array(arr: np.ndarray, dtype: str):
+    """
+        numpy 数组 -> arrow 数组，nan 为 null(整型列保持整型)
+    """
+    if arr.dtype.kind != 'f':
+        return pyarrow.array(arr.astype(dtype))
+    nulls: np.ndarray = np.isnan(arr)
+    if not nulls.any():
+        return pyarrow.array(arr.astype(dtype))
+    return pyarrow.array(np.where(nulls, 0, arr).astype(dtype), mask=nulls)
+
+
+def json_list(arr: np.ndarray, dtype: Optional[str] = None) -> list:
+    """
+        numpy 数组 -> list，nan -> None
+    @param arr:
+    @param dtype: 为整型时其余的值仍输出为整数(如存在空值的时间戳)
+    @return:
+    """
+    if arr.dtype.kind == 'f' and np.isnan(arr).any():
+        nulls: np.ndarray = np.isnan(arr)
+        if dtype is not None and np.dtype(dtype).kind in 'iu':
+            arr = np.where(nulls, 0, arr).astype(np.int64)
+        return [None if null else value for null, value in zip(nulls.tolist(), arr.tolist())]
+    return arr.tolist()
+
+
+class SeriesFrame:
+    """
+        按序列分段的列式数据
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], dtypes: Dict[str, str], segments: Dict[str, list],
+                 offsets: np.ndarray, meta: Optional[dict] = None):
+        """
+        @param columns: 列名 -> 逐点的值(各列等长)
+        @param dtypes: 列名 -> 二进制编码时的类型(如 '<f4' | '<i8')
+        @param segments: 序列标识名 -> 每条序列的标识
+        @param offsets: 第 k 条序列为 [offsets[k], offsets[k + 1])
+        @param meta: 所有序列共有的字段(如 ty_code | issue_time)
+        """
+        self.columns: Dict[str, np.ndarray] = columns
+        self.dtypes: Dict[str, str] = dtypes
+        self.segments: Dict[str, list] = segments
+        self.offsets: np.ndarray = offsets
+        self.meta: dict = meta or {}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]], keys: List[str], dtypes: Dict[str, str],
+                  meta: Optional[dict] = None) -> 'SeriesFrame':
+        """
+            由查询结果构造
+        @param rows: 每行依次为 keys 及 dtypes 中的字段，须已按 keys 排序
+        @param keys: 序列标识名，为空时所有行为一条序列
+        @param dtypes: 列名 -> 二进制编码时的类型
+        @param meta:
+        @return:
+        """
+        count: int = len(rows)
+        fields: List[tuple] = list(zip(*rows)) if count > 0 else [()] * (len(keys) + len(dtypes))
+        columns: Dict[str, np.ndarray] = {name: to_array(field, dtype) for (name, dtype), field in
+                                          zip(dtypes.items(), fields[len(keys):])}
+        if count == 0:
+            return cls(columns, dtypes, {name: [] for name in keys}, np.zeros(1, dtype=np.int64), meta)
+        # 任一标识与上一行不同处为新序列的起点
+        key_arrays: List[np.ndarray] = [np.asarray(field) for field in fields[:len(keys)]]
+        changed: np.ndarray = np.zeros(count - 1, dtype=bool)
+        for arr in key_arrays:
+            changed |= arr[1:] != arr[:-1]
+        starts: np.ndarray = np.concatenate([[0], np.flatnonzero(changed) + 1])
+        segments: Dict[str, list] = {name: [field[index] for index in starts] for name, field in
+                                     zip(keys, fields[:len(keys)])}
+        return cls(columns, dtypes, segments, np.append(starts, count), meta)
+
+    def _header(self) -> dict:
+        return {'meta': self.meta, 'segments': {**self.segments, 'offsets': self.offsets.tolist()}}
+
+    def to_json(self) -> bytes:
+        columns: Dict[str, list] = {name: json_list(arr, self.dtypes[name]) for name, arr in self.columns.items()}
+        return dumps({**self._header(), 'columns': columns})
+
+    def to_msgpack(self) -> bytes:
+        dtypes: Dict[str, str] = {name: binary_dtype(arr, self.dtypes[name]) for name, arr in self.columns.items()}
+        return msgpack.packb({**self._header(), 'dtypes': dtypes,
+                              'columns': {name: arr.astype(dtypes[name]).tobytes() for name, arr in
+                                          self.columns.items()}}, use_bin_type=True)
+
+    def to_arrow(self) -> bytes:
+        arrays = [arrow_array(arr, self.dtypes[name]) for name, arr in self.columns.items()]
+        batch = pyarrow.RecordBatch.from_arrays(arrays, names=list(self.columns.keys()))
+        schema = batch.schema.with_metadata({key: json.dumps(val, ensure_ascii=False) for key, val in
+                                             self._header().items()})
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, schema) as writer:
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+        return sink.getvalue().to_pybytes()
+
+    def encode(self, media_type: str) -> bytes:
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return self.to_msgpack()
+        if media_type == ARROW_MEDIA_TYPE:
+            return self.to_arrow()
+        return self.to_json()
+
+
+def series_response(frame: SeriesFrame, media_type: str) -> Response:
+    """
+        按协商的格式返回(响应随 Accept 变化)
+    """
+    return Response(content=frame.encode(media_type), media_type=media_type, headers={'Vary': 'Accept'})
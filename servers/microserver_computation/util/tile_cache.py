@@ -0,0 +1,144 @@
+"""
+    瓦片 LRU 缓存(内存 + 磁盘两级)
+    同一 key 的瓦片渲染结果可以永久缓存，只按容量淘汰最久未访问的瓦片
+    TODO:[-] 26-10-18 增水场 geotiff 每次运行都会在 user_out/<user> 下原地覆盖，key 中需包含源文件的版本(见 file_version)
+    - 内存: OrderedDict，按条数与总字节数限制
+    - 磁盘: 以 key 的 sha1 作为文件名分目录存储，按总字节数限制，进程启动时按修改时间重建访问顺序
+"""
+import hashlib
+import os
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+def file_version(file_path: str) -> Tuple[int, int]:
+    """
+        + 26-10-18 源文件的版本(修改时间 ns, 字节数)，文件被覆盖后随之变化，用于缓存 key
+    """
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class TileLRUCache:
+    """
+        内存 + 磁盘 LRU 瓦片缓存(线程安全)
+    """
+
+    def __init__(self, memory_max_items: int = 4096, memory_max_bytes: int = 256 * 1024 * 1024,
+                 disk_dir: Optional[str] = None, disk_max_bytes: int = 4 * 1024 * 1024 * 1024):
+        """
+        @param memory_max_items: 内存中最多缓存的瓦片数
+        @param memory_max_bytes: 内存中缓存瓦片的总字节数上限
+        @param disk_dir: 磁盘缓存目录，为空时不使用磁盘缓存
+        @param disk_max_bytes: 磁盘缓存总字节数上限
+        """
+        self.memory_max_items = memory_max_items
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir: Optional[pathlib.Path] = pathlib.Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_bytes: int = 0
+        self._disk: 'OrderedDict[str, int]' = OrderedDict()
+        """磁盘中的瓦片 hash -> 字节数(按访问顺序)"""
+        self._disk_bytes: int = 0
+        self._lock = threading.Lock()
+        if self.disk_dir is not None:
+            self._load_disk_index()
+
+    @staticmethod
+    def hash_key(key: Tuple[Hashable, ...]) -> str:
+        return hashlib.sha1('|'.join(str(temp) for temp in key).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key_hash: str) -> pathlib.Path:
+        return self.disk_dir / key_hash[:2] / key_hash
+
+    def _load_disk_index(self) -> None:
+        """
+            扫描磁盘缓存目录，按修改时间(最近一次访问)由旧到新重建索引
+        """
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for temp_file in self.disk_dir.glob('*/*'):
+            if temp_file.is_file() and not temp_file.name.endswith('.tmp'):
+                stat = temp_file.stat()
+                files.append((stat.st_mtime, temp_file.name, stat.st_size))
+        for _, key_hash, size in sorted(files):
+            self._disk[key_hash] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _put_memory(self, key_hash: str, data: bytes) -> None:
+        if key_hash in self._memory:
+            self._memory.move_to_end(key_hash)
+            return
+        self._memory[key_hash] = data
+        self._memory_bytes += len(data)
+        while self._memory and (
+                len(self._memory) > self.memory_max_items or self._memory_bytes > self.memory_max_bytes):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_bytes > self.disk_max_bytes:
+            key_hash, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._disk_path(key_hash))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[bytes]:
+        """
+            依次从内存、磁盘中读取，磁盘命中时回填内存
+        @param key: eg: (file, z, x, y, colormap, format)
+        @return: 未命中时返回 None
+        """
+        key_hash: str = self.hash_key(key)
+        with self._lock:
+            data: Optional[bytes] = self._memory.get(key_hash)
+            if data is not None:
+                self._memory.move_to_end(key_hash)
+                return data
+            if self.disk_dir is None or key_hash not in self._disk:
+                return None
+            self._disk.move_to_end(key_hash)
+        disk_path: pathlib.Path = self._disk_path(key_hash)
+        try:
+            data = disk_path.read_bytes()
+            # 更新修改时间，重启后仍可按访问顺序淘汰
+            os.utime(disk_path)
+        except FileNotFoundError:
+            with self._lock:
+                size: Optional[int] = self._disk.pop(key_hash, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            return None
+        with self._lock:
+            self._put_memory(key_hash, data)
+        return data
+
+    def put(self, key: Tuple[Hashable, ...], data: bytes) -> None:
+        """
+            写入内存及磁盘缓存
+        @param key:
+        @param data:
+        @return:
+        """
+        key_hash: str = self.hash_key(key)
+        with self._lock:
+            self._put_memory(key_hash, data)
+            if self.disk_dir is None or key_hash in self._disk:
+                return
+        disk_path: pathlib.Path = self._disk_path(key_hash)
+        disk_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: pathlib.Path = disk_path.with_name(f'{key_hash}.{threading.get_ident()}.tmp')
+        # 先写临时文件再替换，避免并发读取到不完整的瓦片
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, disk_path)
+        with self._lock:
+            if key_hash not in self._disk:
+                self._disk[key_hash] = len(data)
+                self._disk_bytes += len(data)
+            self._evict_disk()